@@ -2,11 +2,14 @@
 import streamlit as st
 import pandas as pd
 import pydeck as pdk
-import re 
 from streamlit_folium import st_folium
 import folium
 import plotly.express as px
 from folium.plugins import MousePosition
+from sound_map_data import read_survey, data_version, start_background_refresh
+from sound_map_filters import build_filter_index, NUMERIC_FIELDS
+from sound_map_spatial import build_spatial_index
+from sound_map_tiles import build_tile_pyramid
 
 # Set up Streamlit page
 st.set_page_config(page_title="Musical Events Map", layout="wide")
@@ -20,83 +23,91 @@ st.markdown('By Logan Griffin, Luke Sheppard, Reed Solomon, and Jade Yu')
 CENTER_LAT = 40.0209
 CENTER_LON = -75.3137
 
-# Load data
+# Load data from the copy bundled with the app; its content hash is the cache key
 @st.cache_data
-def load_data():
-#!!!!!this is where I put in my updated CSV!!!!!!
-    return pd.read_csv("https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/refs/heads/main/06_SoundMap/bicomap.csv")
-
-df = load_data()
+def load_data(version):
+    return read_survey()
+
+# Optionally pull newer survey data in the background (set SOUNDMAP_REMOTE_URL)
+@st.cache_resource
+def start_data_refresh():
+    return start_background_refresh()
+
+start_data_refresh()
+version = data_version()
+
+# Preprocess once: purpose multi-hot matrix and typed numeric columns
+@st.cache_resource
+def load_filter_index(version):
+    return build_filter_index(load_data(version))
+
+# Spatial index over the same rows, for click-to-record lookup
+@st.cache_resource
+def load_spatial_index(version):
+    return build_spatial_index(load_filter_index(version).df)
+
+# Tile aggregates per zoom level, so large surveys only send what is in view
+@st.cache_resource
+def load_tile_pyramid(version):
+    return build_tile_pyramid(load_filter_index(version))
+
+filter_index = load_filter_index(version)
+spatial_index = load_spatial_index(version)
+tile_pyramid = load_tile_pyramid(version)
+df = filter_index.df
+
+# How far (in metres) a click may land from a marker and still select it
+CLICK_TOLERANCE = 30
+# Radius (in metres) for the "sounds near here" list
+NEARBY_RADIUS = 100
+# Above this many recordings the map shows tile summaries instead of every point
+TILE_THRESHOLD = 500
 
 # Sidebar filters
 st.sidebar.header("Filter Events by Category")
 
-# Initialize filtered dataframe
-filtered_df = df.copy()
+# Start with every row selected and AND in each active filter
+row_mask = filter_index.all_rows()
 active_filters = []
 
 # Purpose filter (multiselect)
-if 'purpose' in df.columns:
+purpose_options = filter_index.purposes
+if len(purpose_options) > 0:
     st.sidebar.subheader("📝 Purpose")
-    
-    # Split all purpose strings and collect unique substrings
-    all_purposes = set()
-    for purpose_string in df['purpose'].dropna():
-        # Split by semicolon and add each cleaned substring to the set
-        purposes = [p.strip() for p in purpose_string.split(';') if p.strip()]
-        all_purposes.update(purposes)
-    
-    # Convert to sorted list for the multiselect
-    purpose_options = sorted(all_purposes)
-    
-    if len(purpose_options) > 0:
-        selected_purposes = st.sidebar.multiselect(
-            "Select purposes:",
-            options=purpose_options,
-            default=purpose_options,
-            key="purpose_filter"
-        )
-        
-        if len(selected_purposes) < len(purpose_options):
-            # Create regex pattern to match any of the selected purposes
-            pattern = '|'.join([re.escape(purpose) for purpose in selected_purposes])
-            filtered_df = filtered_df[filtered_df['purpose'].str.contains(pattern, na=False, regex=True)]
-            active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
+    selected_purposes = st.sidebar.multiselect(
+        "Select purposes:",
+        options=purpose_options,
+        default=purpose_options,
+        key="purpose_filter"
+    )
+
+    if len(selected_purposes) < len(purpose_options):
+        row_mask &= filter_index.purpose_mask(selected_purposes)
+        active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
 
 # Numeric fields section
 st.sidebar.subheader("Numeric Attributes")
 
-numeric_fields = ['volume', 'pitch', 'distractability', 'rowdiness', 'multiplicity', 'repetition', 'persistence']
+numeric_fields = NUMERIC_FIELDS
+
+for field, (min_val, max_val) in filter_index.ranges.items():
+    if min_val < max_val:  # Only create slider if there's a range
+        selected_range = st.sidebar.slider(
+            f"{field.title()}:",
+            min_value=min_val,
+            max_value=max_val,
+            value=(min_val, max_val),
+            step=1,
+            key=f"{field}_slider",
+            help=f"Filter events by {field} level (range: {min_val}-{max_val})"
+        )
+
+        # Check if filter is active (not full range)
+        if selected_range != (min_val, max_val):
+            row_mask &= filter_index.range_mask(field, selected_range[0], selected_range[1])
+            active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
 
-for field in numeric_fields:
-    if field in df.columns:
-        # Convert to numeric and get valid values
-        numeric_values = pd.to_numeric(df[field], errors='coerce').dropna()
-        
-        if len(numeric_values) > 0:
-            min_val = int(numeric_values.min())
-            max_val = int(numeric_values.max())
-            
-            if min_val < max_val:  # Only create slider if there's a range
-                selected_range = st.sidebar.slider(
-                    f"{field.title()}:",
-                    min_value=min_val,
-                    max_value=max_val,
-                    value=(min_val, max_val),
-                    step=1,
-                    key=f"{field}_slider",
-                    help=f"Filter events by {field} level (range: {min_val}-{max_val})"
-                )
-                
-                # Check if filter is active (not full range)
-                if selected_range != (min_val, max_val):
-                    # Filter data based on selected range
-                    numeric_col = pd.to_numeric(filtered_df[field], errors='coerce')
-                    filtered_df = filtered_df[
-                        (numeric_col >= selected_range[0]) & 
-                        (numeric_col <= selected_range[1])
-                    ]
-                    active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
+filtered_df = df[row_mask]
 
 # Marker size control
 st.sidebar.subheader("Set Marker Size")
@@ -108,6 +119,13 @@ size_field = st.sidebar.selectbox(
     help="Choose a numerical field to control marker size"
 )
 
+# Aggregate markers into map tiles for large surveys
+aggregate_tiles = st.sidebar.checkbox(
+    "Aggregate into map tiles",
+    value=len(df) > TILE_THRESHOLD,
+    help="Show one summary marker per map tile (count and mean volume) instead of every recording"
+)
+
 # Show active filters in sidebar
 if active_filters:
     st.sidebar.subheader("Active Filters")
@@ -143,22 +161,47 @@ with col1:
     # Creating the base map 
     if len(filtered_map_data) > 0:
 
-        m = folium.Map(location=[CENTER_LAT, CENTER_LON], zoom_start=16)
-
-        # Putting the markers from my data onto the map
-        for index, row in filtered_map_data.iterrows():
-            popup_html = "<br>".join([f"<b>{k}:</b> {str(v)}" for k, v in row.to_dict().items()])
-            
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=6,
-                color="blue",
-                fill=True,
-                fill_opacity=0.8,
-                tooltip=row.get("location"),
-                popup=folium.Popup(folium.Html(popup_html, script=True), max_width=250),
-                interactive=False   
-            ).add_to(m)
+        # Reopen the map where the user last left it
+        map_view = st.session_state.get("map_view")
+        if map_view is not None:
+            zoom, south, west, north, east = map_view
+            m = folium.Map(location=[(south + north) / 2, (west + east) / 2], zoom_start=zoom)
+        else:
+            m = folium.Map(location=[CENTER_LAT, CENTER_LON], zoom_start=16)
+
+        if aggregate_tiles:
+            # One marker per tile in view, sized by how many recordings it holds;
+            # without a filter the pyramid's cached unfiltered summaries are used
+            tile_mask = row_mask if active_filters else None
+            if map_view is not None:
+                tiles = tile_pyramid.tiles_in_view(zoom, south, west, north, east, mask=tile_mask)
+            else:
+                tiles = tile_pyramid.aggregate(16, mask=tile_mask)
+            for tile in tiles.itertuples():
+                folium.CircleMarker(
+                    location=[tile.latitude, tile.longitude],
+                    radius=4 + 2 * tile.count ** 0.5,
+                    color="blue",
+                    fill=True,
+                    fill_opacity=0.6,
+                    tooltip=f"{tile.count} recordings, mean volume {tile.mean_volume:.1f}, mean rowdiness {tile.mean_rowdiness:.1f}",
+                    interactive=False
+                ).add_to(m)
+        else:
+            # Putting the markers from my data onto the map
+            for index, row in filtered_map_data.iterrows():
+                popup_html = "<br>".join([f"<b>{k}:</b> {str(v)}" for k, v in row.to_dict().items()])
+
+                folium.CircleMarker(
+                    location=[row['latitude'], row['longitude']],
+                    radius=6,
+                    color="blue",
+                    fill=True,
+                    fill_opacity=0.8,
+                    tooltip=row.get("location"),
+                    popup=folium.Popup(folium.Html(popup_html, script=True), max_width=250),
+                    interactive=False
+                ).add_to(m)
 
         # This is so it can respond when I click on markers
         folium.LatLngPopup().add_to(m)
@@ -170,19 +213,28 @@ with col1:
         last = st_data.get("last_object_clicked")
         if last is not None:
             st.session_state["last_object_clicked"] = last
+
+        # Remembering the visible bounds so the next rerun only sends those tiles
+        bounds = st_data.get("bounds") or {}
+        if st_data.get("zoom") is not None and bounds.get("_southWest", {}).get("lat") is not None:
+            st.session_state["map_view"] = (
+                st_data["zoom"],
+                bounds["_southWest"]["lat"], bounds["_southWest"]["lng"],
+                bounds["_northEast"]["lat"], bounds["_northEast"]["lng"],
+            )
     
     else:
         st.warning("No events match the selected filters")
 
-    # Melting the dataframe so I can make a bar chart
+    # Columns used to melt the clicked row so I can make a bar chart
     id_vars = ['link', 'timestamp', 'campus', 'time', 'date', 'location', 'latitude', 'longitude', 'device', 'sound', 'recorder', 'purpose']
     value_vars = ['volume','pitch','distractability', 'rowdiness','multiplicity','repetition','persistence']
-    melted_df = pd.melt(filtered_df, id_vars = id_vars, value_vars = value_vars)
 
 
     # Setting lat, lon, and clicked_row_melted to be empty to avoid errors before the first click
     lat = None
     lon = None
+    clicked_row = None
     clicked_row_melted = pd.DataFrame()
 
     # Registering a click
@@ -193,13 +245,12 @@ with col1:
         lat = clicked.get("lat")
         lon = clicked.get("lng")
 
-    # Filtering the dataframe to the rows with the clicked marker
+    # Finding the nearest visible recording to the click
     if lat is not None and lon is not None:
-        clicked_row_melted = melted_df[
-            (melted_df["latitude"]==lat) &
-            (melted_df["longitude"]==lon)
-        ]
- 
+        clicked_row = spatial_index.nearest(lat, lon, max_distance=CLICK_TOLERANCE, mask=row_mask)
+        if clicked_row is not None:
+            clicked_row_melted = pd.melt(df.iloc[[clicked_row]], id_vars = id_vars, value_vars = value_vars)
+
     # Making the bar chart
     if not clicked_row_melted.empty:
         st.subheader("Feature Chart for: {}" .format(clicked_row_melted["sound"].iloc[0]))
@@ -213,6 +264,14 @@ with col1:
     else:
         st.info("No sound selected")
 
+    # Listing the other recordings around the click
+    if clicked_row is not None:
+        nearby_rows, nearby_distances = spatial_index.within_with_distances(lat, lon, NEARBY_RADIUS, mask=row_mask)
+        nearby = df.iloc[nearby_rows][['location', 'sound', 'campus', 'volume']].copy()
+        nearby['distance (m)'] = nearby_distances.round(0)
+        st.subheader("Sounds near here")
+        st.dataframe(nearby, hide_index=True)
+
 
     
 with col2:
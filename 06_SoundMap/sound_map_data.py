@@ -0,0 +1,203 @@
+"""Local, versioned data loading for the BiCo Sound Map apps.
+
+The apps used to read ``bicomap.csv`` from ``raw.githubusercontent.com`` on
+every cold start.  Here we read the copy bundled next to the apps instead
+(or a Parquet snapshot of it), with explicit dtypes, so startup only costs
+a local disk read.
+
+``data_version()`` returns a short content hash of the local CSV.  Pass it
+to the cached loader so ``st.cache_data`` is invalidated whenever the file
+changes, and never otherwise::
+
+    @st.cache_data
+    def load_data(version):
+        return read_survey()
+
+    df = load_data(data_version())
+
+``start_background_refresh()`` optionally pulls a newer CSV in a background
+thread when the ``SOUNDMAP_REMOTE_URL`` environment variable is set (for
+example to ``DEFAULT_REMOTE_URL``).  The download is kept in ``CACHE_DIR``,
+never over the bundled file, and ``survey_csv()`` prefers it from then on.
+It only takes effect on the next rerun, when its hash changes the cache key.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+from sound_map_filters import NUMERIC_FIELDS
+
+DATA_DIR = Path(__file__).resolve().parent
+LOCAL_CSV = DATA_DIR / 'bicomap.csv'
+LOCAL_PARQUET = DATA_DIR / 'bicomap.parquet'
+
+# Files the apps write at runtime (downloads, RDF exports) go here, not beside the apps
+CACHE_DIR = Path(os.environ.get('ENCODING_MUSIC_CACHE', Path.home() / '.cache' / 'encoding_music')) / 'soundmap'
+REFRESHED_CSV = CACHE_DIR / 'bicomap.csv'
+
+# Where to look for updated survey data; background refresh is off unless set
+DEFAULT_REMOTE_URL = "https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/refs/heads/main/06_SoundMap/bicomap.csv"
+REMOTE_URL = os.environ.get('SOUNDMAP_REMOTE_URL')
+
+# Explicit column types for the survey CSV
+TEXT_COLUMNS = ['link', 'timestamp', 'time', 'date', 'location', 'sound', 'purpose']
+CATEGORY_COLUMNS = ['campus', 'device', 'recorder']
+COORDINATE_COLUMNS = ['latitude', 'longitude']
+
+CSV_DTYPES = {column: 'string' for column in TEXT_COLUMNS + CATEGORY_COLUMNS}
+
+# Key under which the Parquet snapshot records the hash of its source CSV
+SOURCE_HASH_KEY = b'soundmap_source_hash'
+
+# (path, mtime, size) -> hash, so reruns do not re-read an unchanged file
+_hash_memo = {}
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Short SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def survey_csv():
+    """The survey CSV to read: the last download from the remote if any, else the bundled copy."""
+    return REFRESHED_CSV if REFRESHED_CSV.exists() else LOCAL_CSV
+
+
+def data_version(csv_path=None):
+    """Content hash of the local survey CSV (by default ``survey_csv()``), used as the cache key.
+
+    The hash is only recomputed when the file's modification time or size
+    changes, so calling this on every Streamlit rerun is cheap.
+    """
+    csv_path = csv_path or survey_csv()
+    stat = os.stat(csv_path)
+    key = (str(csv_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hash_memo:
+        _hash_memo[key] = file_hash(csv_path)
+    return _hash_memo[key]
+
+
+def apply_dtypes(df):
+    """Cast a raw survey DataFrame to the declared column types."""
+    df = df.copy()
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('string')
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            # Through 'string' so CSV and Parquet reads give the same category dtype
+            df[column] = df[column].astype('string').astype('category')
+    for column in COORDINATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    for column in NUMERIC_FIELDS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    return df
+
+
+def read_csv(csv_path=None):
+    """Read the survey CSV (by default ``survey_csv()``) with explicit dtypes."""
+    df = pd.read_csv(csv_path or survey_csv(), dtype=CSV_DTYPES)
+    return apply_dtypes(df)
+
+
+def _snapshot_source_hash(parquet_path):
+    """Source hash stored in a Parquet snapshot, or None if unreadable."""
+    try:
+        import pyarrow.parquet as pq
+        metadata = pq.read_schema(parquet_path).metadata or {}
+    except (ImportError, OSError, ValueError):
+        return None
+    value = metadata.get(SOURCE_HASH_KEY)
+    return value.decode() if value else None
+
+
+def write_parquet_snapshot(csv_path=LOCAL_CSV, parquet_path=LOCAL_PARQUET):
+    """Write a typed Parquet copy of the CSV, tagged with the CSV's hash."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(read_csv(csv_path), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SOURCE_HASH_KEY] = data_version(csv_path).encode()
+    table = table.replace_schema_metadata(metadata)
+    pq.write_table(table, parquet_path)
+    return Path(parquet_path)
+
+
+def read_survey(csv_path=None, parquet_path=LOCAL_PARQUET):
+    """Load the survey from local disk (by default ``survey_csv()``).
+
+    The Parquet snapshot is used when it was made from the current CSV (its
+    stored hash matches); otherwise the CSV is read with explicit dtypes.
+    """
+    csv_path = csv_path or survey_csv()
+    parquet_path = Path(parquet_path)
+    if parquet_path.exists() and _snapshot_source_hash(parquet_path) == data_version(csv_path):
+        return apply_dtypes(pd.read_parquet(parquet_path))
+    return read_csv(csv_path)
+
+
+def refresh_from_remote(url=DEFAULT_REMOTE_URL, csv_path=REFRESHED_CSV, timeout=10):
+    """Download ``url`` to ``csv_path`` if it differs from the survey in use.
+
+    Returns True when the file was updated.  The bundled ``bicomap.csv`` is
+    never written, and the download goes to a temporary file first, so a
+    failed or partial fetch never clobbers the previous one.
+    """
+    csv_path = Path(csv_path)
+    current = csv_path if csv_path.exists() else LOCAL_CSV
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(suffix='.csv', dir=csv_path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as tmp, urllib.request.urlopen(url, timeout=timeout) as response:
+            shutil.copyfileobj(response, tmp)
+        # Make sure the download is a readable survey before swapping it in
+        pd.read_csv(tmp_name, nrows=5)
+        if current.exists() and file_hash(tmp_name) == file_hash(current):
+            return False
+        os.replace(tmp_name, csv_path)
+        return True
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def start_background_refresh(url=REMOTE_URL, csv_path=REFRESHED_CSV):
+    """Run :func:`refresh_from_remote` in a daemon thread; errors are logged as warnings.
+
+    Returns the thread, or None when no remote is configured.
+    """
+    if not url:
+        return None
+
+    def refresh():
+        try:
+            refresh_from_remote(url, csv_path)
+        except Exception:
+            # The app keeps running on the data it has, but say why it is not updating
+            logger.warning('Could not refresh the survey from %s', url, exc_info=True)
+
+    thread = threading.Thread(target=refresh, name='soundmap-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    # python sound_map_data.py  ->  refresh bicomap.parquet from bicomap.csv
+    print(f"Wrote {write_parquet_snapshot()} ({data_version()})")
@@ -0,0 +1,139 @@
+"""Precomputed filter index for the BiCo Sound Map apps.
+
+The Streamlit apps rerun top to bottom on every widget change.  Rather than
+re-splitting the semicolon separated ``purpose`` strings and re-casting the
+numeric survey columns on each rerun, we do that work once here:
+
+* ``purpose`` becomes a boolean multi-hot matrix (one column per purpose)
+* each numeric attribute becomes a typed float32 array (NaN where missing)
+
+A filter is then just a handful of boolean mask ANDs over NumPy arrays.
+
+Typical use in an app::
+
+    @st.cache_resource
+    def load_filter_index():
+        return build_filter_index(load_data())
+
+    index = load_filter_index()
+    mask = index.purpose_mask(selected_purposes) & index.range_mask("volume", 2, 6)
+    filtered_df = index.df[mask]
+"""
+
+import numpy as np
+import pandas as pd
+
+# Survey attributes recorded on a numeric scale
+NUMERIC_FIELDS = ['volume', 'pitch', 'distractability', 'rowdiness', 'multiplicity', 'repetition', 'persistence']
+
+
+def purpose_label(purpose):
+    """One purpose in its canonical form: trimmed, with only the first letter capitalised.
+
+    Survey answers vary in case ('incidental', 'Incidental'), so both
+    backends (this index and the RDF in ``sound_map_rdf``) label purposes
+    with this function and show the same sidebar options.
+    """
+    return ' '.join(purpose.split()).capitalize()
+
+
+def split_purposes(purpose_series):
+    """Return a list of cleaned purpose labels for each row of ``purpose_series``."""
+    return [
+        list(dict.fromkeys(purpose_label(p) for p in purpose_string.split(';') if p.strip()))
+        if isinstance(purpose_string, str) else []
+        for purpose_string in purpose_series
+    ]
+
+
+class FilterIndex:
+    """Typed columns and a purpose multi-hot matrix for one survey DataFrame.
+
+    Attributes:
+        df: the survey DataFrame, with numeric fields cast to float32
+        purposes: sorted list of distinct purpose labels
+        purpose_matrix: bool array of shape (rows, len(purposes))
+        numeric: dict of field name -> float32 array
+        ranges: dict of field name -> (min, max) integer slider bounds
+    """
+
+    def __init__(self, df, purposes, purpose_matrix, numeric, ranges):
+        self.df = df
+        self.purposes = purposes
+        self.purpose_matrix = purpose_matrix
+        self.numeric = numeric
+        self.ranges = ranges
+        self._purpose_columns = {purpose: i for i, purpose in enumerate(purposes)}
+
+    def __len__(self):
+        return len(self.df)
+
+    def all_rows(self):
+        """Mask that keeps every row."""
+        return np.ones(len(self.df), dtype=bool)
+
+    def purpose_mask(self, selected_purposes):
+        """Rows tagged with at least one of ``selected_purposes``.
+
+        Selecting every purpose (or passing ``None``) keeps all rows, matching
+        the behaviour of the sidebar multiselect when nothing is deselected.
+        """
+        if selected_purposes is None or len(selected_purposes) == len(self.purposes):
+            return self.all_rows()
+        columns = [self._purpose_columns[p] for p in selected_purposes if p in self._purpose_columns]
+        if not columns:
+            return np.zeros(len(self.df), dtype=bool)
+        return self.purpose_matrix[:, columns].any(axis=1)
+
+    def range_mask(self, field, low, high):
+        """Rows whose ``field`` value lies within [low, high]; missing values never match."""
+        values = self.numeric[field]
+        return (values >= low) & (values <= high)
+
+    def mask(self, selected_purposes=None, ranges=None):
+        """Combine a purpose selection and {field: (low, high)} ranges into one mask.
+
+        Ranges that cover the full slider span are skipped, so an untouched
+        slider does not drop rows with missing values.
+        """
+        mask = self.purpose_mask(selected_purposes)
+        for field, (low, high) in (ranges or {}).items():
+            if (low, high) == self.ranges.get(field):
+                continue
+            mask &= self.range_mask(field, low, high)
+        return mask
+
+    def filter(self, selected_purposes=None, ranges=None):
+        """Return the rows of ``df`` kept by :meth:`mask`."""
+        return self.df[self.mask(selected_purposes, ranges)]
+
+
+def build_filter_index(df, numeric_fields=NUMERIC_FIELDS):
+    """Preprocess a survey DataFrame into a :class:`FilterIndex`."""
+    df = df.reset_index(drop=True).copy()
+
+    # Purposes: split once and one-hot encode into a boolean matrix
+    if 'purpose' in df.columns:
+        row_purposes = split_purposes(df['purpose'])
+    else:
+        row_purposes = [[] for _ in range(len(df))]
+    purposes = sorted({p for row in row_purposes for p in row})
+    columns = {purpose: i for i, purpose in enumerate(purposes)}
+    purpose_matrix = np.zeros((len(df), len(purposes)), dtype=bool)
+    for row_number, row in enumerate(row_purposes):
+        purpose_matrix[row_number, [columns[p] for p in row]] = True
+
+    # Numeric attributes: cast once to float32, keeping NaN for blanks
+    numeric = {}
+    ranges = {}
+    for field in numeric_fields:
+        if field not in df.columns:
+            continue
+        values = pd.to_numeric(df[field], errors='coerce').astype('float32')
+        df[field] = values
+        numeric[field] = values.to_numpy()
+        valid = values.dropna()
+        if len(valid) > 0:
+            ranges[field] = (int(valid.min()), int(valid.max()))
+
+    return FilterIndex(df, purposes, purpose_matrix, numeric, ranges)
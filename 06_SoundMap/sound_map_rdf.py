@@ -0,0 +1,355 @@
+"""Bulk converter from the BiCo sound survey CSV to RDF.
+
+``new_rdf_triple_dev.ttl`` shows how one survey row is modelled: a
+``:sound_event`` (what was heard, where and when), the ``:recording_event``
+that captured it, the ``:sound_data`` ratings, and shared ``:building``,
+``:campus``, ``:recorder_device``, ``:person`` and ``:sound_type`` resources.
+Writing those by hand does not scale past a few rows, so this script
+generates them for every row of ``bicomap.csv``.
+
+The CSV is read in chunks and triples are written as they are produced, so
+memory use does not grow with the survey.  Shared resources (buildings,
+campuses, devices, people, sound types) are emitted once.
+
+Runs are incremental: a small JSON state file next to the output records
+which rows (keyed by a hash of the whole row) and which shared resources
+were already written.  Re-running after new survey responses arrive only
+appends the new triples.  If a row written before was edited or deleted,
+its old triples cannot be taken back out of the file, so the output is
+rebuilt instead.
+
+Usage::
+
+    python sound_map_rdf.py bicomap.csv bicomap.ttl        # Turtle
+    python sound_map_rdf.py bicomap.csv bicomap.nt         # N-Triples
+    python sound_map_rdf.py bicomap.csv bicomap.ttl --full # rebuild from scratch
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from sound_map_filters import purpose_label
+
+BASE = 'https://www.bico-sound-map-2.edu/'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF_TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+RDFS_SEE_ALSO = 'http://www.w3.org/2000/01/rdf-schema#seeAlso'
+
+PREFIXES = """@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>.
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>.
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#>.
+@prefix : <https://www.bico-sound-map-2.edu/>.
+
+"""
+
+# Survey rating columns and the ontology properties they map to
+RATING_PROPERTIES = {
+    'volume': 'has_volume',
+    'pitch': 'has_pitch',
+    'distractability': 'has_distractability',
+    'rowdiness': 'has_rowdiness',
+    'multiplicity': 'has_multiplicity',
+    'repetition': 'has_repetition',
+    'persistence': 'has_persistence',
+}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+@lru_cache(maxsize=4096)
+def local_name(text):
+    """CamelCase identifier usable as a local name, e.g. 'Bryn Mawr' -> 'BrynMawr'."""
+    words = re.findall(r'[A-Za-z0-9]+', str(text))
+    return ''.join(w[:1].upper() + w[1:] for w in words) or 'Unknown'
+
+
+def row_key(row):
+    """Hash of every cell of a survey response: editing any of them gives a new key."""
+    parts = [f'{column}={row[column]}' for column in sorted(row)]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def present(value):
+    """True for a real value; False for None and NaN (missing CSV cells)."""
+    return value is not None and value == value
+
+
+def escape_literal(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Survey dates are written like 12/17/23; return ISO 8601 or None."""
+    for fmt in ('%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_time(value):
+    """Survey times are written like 16:18; return HH:MM:SS or None."""
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime('%H:%M:%S')
+        except ValueError:
+            continue
+    return None
+
+
+class TripleWriter:
+    """Write triples as N-Triples or Turtle, one subject block at a time.
+
+    Terms are rendered to strings up front; names in the sound map namespace
+    (types, properties, shared resources) repeat constantly, so their
+    rendering is cached.
+    """
+
+    def __init__(self, f, turtle):
+        self.f = f
+        self.turtle = turtle
+        self.a = 'a' if turtle else f'<{RDF_TYPE}>'
+        self._names = {}
+
+    def name(self, local):
+        """Term for ``:local`` in the sound map namespace."""
+        term = self._names.get(local)
+        if term is None:
+            term = self._names[local] = f':{local}' if self.turtle else f'<{BASE}{local}>'
+        return term
+
+    def iri(self, value):
+        """Term for any full IRI."""
+        return f'<{value}>'
+
+    def literal(self, value, datatype):
+        if self.turtle:
+            return f'"{escape_literal(value)}"^^xsd:{datatype}'
+        return f'"{escape_literal(value)}"^^<{XSD}{datatype}>'
+
+    def subject(self, subject, predicates):
+        """Write all (predicate, object) pairs of one subject term."""
+        if self.turtle:
+            self.f.write(subject + ' ' + ';\n'.join([f'{p} {o}' for p, o in predicates]) + '.\n\n')
+        else:
+            self.f.write(''.join([f'{subject} {p} {o} .\n' for p, o in predicates]))
+
+
+class SoundMapConverter:
+    """Convert survey rows to triples, remembering what was already written."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.rows = state.get('rows', {})
+        self.next_row = state.get('next_row', 1)
+        self.seen = {kind: set(names) for kind, names in state.get('seen', {}).items()}
+
+    def state(self):
+        return {
+            'rows': self.rows,
+            'next_row': self.next_row,
+            'seen': {kind: sorted(names) for kind, names in self.seen.items()},
+        }
+
+    def _first_time(self, kind, name):
+        names = self.seen.setdefault(kind, set())
+        if name in names:
+            return False
+        names.add(name)
+        return True
+
+    def convert_row(self, row, writer):
+        """Write the triples for one row; return False if it was already converted."""
+        key = row_key(row)
+        if key in self.rows:
+            return False
+        n = self.next_row
+        self.rows[key] = n
+        self.next_row += 1
+
+        event = f'r{n}'
+        recording = f'r{n}_recording'
+        sound_data = f'sound_data{n}'
+        date = parse_date(row.get('date', ''))
+        time = parse_time(row.get('time', ''))
+
+        # Shared resources, each written the first time it appears
+        campus = local_name(row['campus']) if present(row.get('campus')) else None
+        if campus and self._first_time('campus', campus):
+            writer.subject(writer.name(campus), [
+                (writer.a, writer.name('campus')),
+                (writer.name('has_description'), writer.literal(f"{row['campus']} College Campus", 'string')),
+            ])
+
+        building = f"building_{local_name(row['location'])}" if present(row.get('location')) else None
+        if building and self._first_time('building', building):
+            predicates = [
+                (writer.a, writer.name('building')),
+                (writer.name('has_description'), writer.literal(row['location'], 'string')),
+            ]
+            if campus:
+                predicates.append((writer.name('included_in'), writer.name(campus)))
+            if present(row.get('latitude')) and present(row.get('longitude')):
+                predicates.append((writer.name('has_latitude'), writer.literal(row['latitude'], 'decimal')))
+                predicates.append((writer.name('has_longitude'), writer.literal(row['longitude'], 'decimal')))
+            writer.subject(writer.name(building), predicates)
+
+        device = local_name(row['device']) if present(row.get('device')) else None
+        if device and self._first_time('device', device):
+            writer.subject(writer.name(device), [
+                (writer.a, writer.name('recorder_device')),
+                (writer.name('has_description'), writer.literal(row['device'], 'string')),
+            ])
+
+        person = local_name(row['recorder']) if present(row.get('recorder')) else None
+        if person and self._first_time('person', person):
+            writer.subject(writer.name(person), [
+                (writer.a, writer.name('person')),
+                (writer.name('has_description'), writer.literal(row['recorder'], 'string')),
+            ])
+
+        sound_types = []
+        if isinstance(row.get('purpose'), str):
+            for purpose in row['purpose'].split(';'):
+                if not purpose.strip():
+                    continue
+                # 'Incidental' and 'incidental' are the same sound type
+                purpose = purpose_label(purpose)
+                sound_type = f'{local_name(purpose).lower()}_sound'
+                sound_types.append(sound_type)
+                if self._first_time('sound_type', sound_type):
+                    writer.subject(writer.name(sound_type), [
+                        (writer.a, writer.name('sound_type')),
+                        (writer.name('has_description'), writer.literal(purpose, 'string')),
+                    ])
+
+        # The sound event itself
+        predicates = [(writer.a, writer.name('sound_event'))]
+        if campus:
+            predicates.append((writer.name('took_place_in_campus'), writer.name(campus)))
+        if building:
+            predicates.append((writer.name('took_place_in'), writer.name(building)))
+        if present(row.get('sound')):
+            predicates.append((writer.name('has_description'), writer.literal(row['sound'], 'string')))
+        predicates += [(writer.name('has_sound_type'), writer.name(t)) for t in dict.fromkeys(sound_types)]
+        if date:
+            predicates.append((writer.name('has_date'), writer.literal(date, 'date')))
+        writer.subject(writer.name(event), predicates)
+
+        # The recording of it
+        predicates = [(writer.a, writer.name('recording_event')), (writer.name('recorded'), writer.name(event))]
+        if person:
+            predicates.append((writer.name('performed_by'), writer.name(person)))
+        if device:
+            predicates.append((writer.name('recorded_on'), writer.name(device)))
+        predicates.append((writer.name('has_sound_data'), writer.name(sound_data)))
+        if time:
+            predicates.append((writer.name('time_recorded_at'), writer.literal(time, 'time')))
+        if date:
+            predicates.append((writer.name('has_date'), writer.literal(date, 'date')))
+        if isinstance(row.get('link'), str) and row['link'].startswith('http'):
+            predicates.append((writer.iri(RDFS_SEE_ALSO), writer.iri(row['link'])))
+        writer.subject(writer.name(recording), predicates)
+
+        # The ratings
+        predicates = [(writer.a, writer.name('sound_data'))]
+        if person:
+            predicates.append((writer.name('measured_by'), writer.name(person)))
+        for column, property_name in RATING_PROPERTIES.items():
+            value = row.get(column)
+            if present(value):
+                predicates.append((writer.name(property_name), writer.literal(value, 'integer')))
+        writer.subject(writer.name(sound_data), predicates)
+        return True
+
+
+def prepare_chunk(chunk):
+    """Turn a chunk of raw CSV rows into a list of row dicts.
+
+    Ratings are converted column-wise to integer strings (None when blank
+    or non-numeric) so the per-row code only has to format them.
+    """
+    columns = {column: chunk[column].tolist() for column in chunk.columns}
+    for column in RATING_PROPERTIES:
+        if column in columns:
+            values = pd.to_numeric(chunk[column], errors='coerce').round().tolist()
+            columns[column] = [str(int(v)) if v == v else None for v in values]
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def iter_rows(csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Prepared row dicts of the survey CSV, read in chunks."""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=str):
+        yield from prepare_chunk(chunk)
+
+
+def state_path_for(output_path):
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + '.state.json')
+
+
+def convert(csv_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, full=False):
+    """Convert ``csv_path`` to RDF at ``output_path``; return the number of new rows.
+
+    The format follows the output extension (``.nt`` for N-Triples, anything
+    else for Turtle).  Unless ``full`` is set, rows converted by a previous
+    run are skipped and new triples are appended; but if any of those rows
+    is no longer in the CSV (deleted, or edited so its key changed), the
+    output is rebuilt.
+    """
+    output_path = Path(output_path)
+    state_path = state_path_for(output_path)
+    turtle = output_path.suffix != '.nt'
+
+    state = None
+    if not full and output_path.exists() and state_path.exists():
+        with open(state_path) as f:
+            state = json.load(f)
+        current = {row_key(row) for row in iter_rows(csv_path, chunk_size)}
+        if not current.issuperset(state.get('rows', {})):
+            state = None
+    converter = SoundMapConverter(state)
+
+    new_rows = 0
+    with open(output_path, 'a' if state else 'w', encoding='utf-8') as out:
+        if turtle and not state:
+            out.write(PREFIXES)
+        writer = TripleWriter(out, turtle)
+        for row in iter_rows(csv_path, chunk_size):
+            if converter.convert_row(row, writer):
+                new_rows += 1
+
+    # Write the state atomically so an interrupted run can be redone safely
+    tmp_path = state_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(converter.state(), f)
+    os.replace(tmp_path, state_path)
+    return new_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the BiCo sound survey CSV to RDF')
+    parser.add_argument('csv', help='survey CSV, e.g. bicomap.csv')
+    parser.add_argument('output', help='output file (.ttl for Turtle, .nt for N-Triples)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--full', action='store_true', help='ignore previous runs and rebuild the output')
+    args = parser.parse_args()
+    new_rows = convert(args.csv, args.output, chunk_size=args.chunk_size, full=args.full)
+    print(f'Converted {new_rows} new rows to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
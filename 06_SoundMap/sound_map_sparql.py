@@ -0,0 +1,264 @@
+"""SPARQL-backed data layer for the BiCo Sound Map apps.
+
+The survey exists both as CSV and as RDF (see ``sound_map_rdf.py``).  This
+module lets the apps read the RDF instead: the Turtle graph is loaded once
+into rdflib's in-memory store (which keeps subject/predicate/object
+indexes), and the sidebar filters run as SPARQL queries that are compiled
+once with ``prepareQuery`` and parameterised through ``initBindings``.
+
+Results are cached per parameter value (one purpose, one slider range), and
+combined as NumPy masks aligned with ``store.df``, so after the first
+use of a given slider position the RDF path costs about the same as the
+pandas one.
+
+Typical use in an app::
+
+    @st.cache_resource
+    def load_store(version):
+        return SoundMapStore.from_survey()
+
+    store = load_store(version)
+    mask = store.mask(selected_purposes, {'volume': (2, 6)})
+    filtered_df = store.df[mask]
+"""
+
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql import prepareQuery
+
+from sound_map_data import CACHE_DIR, survey_csv
+from sound_map_filters import NUMERIC_FIELDS, purpose_label
+from sound_map_rdf import BASE, RATING_PROPERTIES, SoundMapConverter, TripleWriter, PREFIXES, convert, prepare_chunk
+
+NAMESPACES = {'': BASE, 'xsd': str(XSD)}
+
+# One row per sound event, with its building, campus, recording and ratings
+EVENTS_QUERY = """
+SELECT ?event ?sound ?date ?time ?location ?latitude ?longitude ?campus ?device ?recorder
+       ?volume ?pitch ?distractability ?rowdiness ?multiplicity ?repetition ?persistence
+WHERE {
+    ?event a :sound_event .
+    OPTIONAL { ?event :has_description ?sound }
+    OPTIONAL { ?event :has_date ?date }
+    OPTIONAL {
+        ?event :took_place_in ?building .
+        OPTIONAL { ?building :has_description ?location }
+        OPTIONAL { ?building :has_latitude ?latitude ; :has_longitude ?longitude }
+    }
+    OPTIONAL { ?event :took_place_in_campus ?campus_node . ?campus_node :has_description ?campus }
+    OPTIONAL {
+        ?recording :recorded ?event .
+        OPTIONAL { ?recording :time_recorded_at ?time }
+        OPTIONAL { ?recording :recorded_on ?device_node . ?device_node :has_description ?device }
+        OPTIONAL { ?recording :performed_by ?person . ?person :has_description ?recorder }
+        OPTIONAL {
+            ?recording :has_sound_data ?data .
+            OPTIONAL { ?data :has_volume ?volume }
+            OPTIONAL { ?data :has_pitch ?pitch }
+            OPTIONAL { ?data :has_distractability ?distractability }
+            OPTIONAL { ?data :has_rowdiness ?rowdiness }
+            OPTIONAL { ?data :has_multiplicity ?multiplicity }
+            OPTIONAL { ?data :has_repetition ?repetition }
+            OPTIONAL { ?data :has_persistence ?persistence }
+        }
+    }
+}
+"""
+
+# Every (event, purpose) pair
+PURPOSES_QUERY = """
+SELECT ?event ?purpose
+WHERE {
+    ?event a :sound_event ;
+           :has_sound_type ?type .
+    ?type :has_description ?purpose .
+}
+"""
+
+# Events tagged with one purpose (bound through ?purpose)
+PURPOSE_FILTER_QUERY = """
+SELECT DISTINCT ?event
+WHERE {
+    ?event :has_sound_type ?type .
+    ?type :has_description ?purpose .
+}
+"""
+
+# Events whose rating ?property lies in [?low, ?high]
+RANGE_FILTER_QUERY = """
+SELECT DISTINCT ?event
+WHERE {
+    ?recording :recorded ?event ;
+               :has_sound_data ?data .
+    ?data ?property ?value .
+    FILTER (?value >= ?low && ?value <= ?high)
+}
+"""
+
+_prepared = {}
+
+
+def prepared(query):
+    """Compile a query once per process."""
+    if query not in _prepared:
+        _prepared[query] = prepareQuery(query, initNs=NAMESPACES)
+    return _prepared[query]
+
+
+def _python_value(node):
+    return None if node is None else node.toPython()
+
+
+class SoundMapStore:
+    """An rdflib graph of the survey plus cached, parameterised filter queries.
+
+    It offers the same filtering interface as ``sound_map_filters.FilterIndex``
+    (``df``, ``purposes``, ``ranges``, ``all_rows``, ``purpose_mask``,
+    ``range_mask``), so an app can switch backends without other changes.
+
+    Attributes:
+        graph: the rdflib Graph
+        df: one row per sound event, with the columns of bicomap.csv except
+            ``link`` and ``timestamp`` (not in the graph), plus ``event``,
+            the event's IRI
+        purposes: sorted list of purpose labels
+        ranges: dict of field name -> (min, max) integer slider bounds
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._results = {}
+
+        # Materialise the events table once; filters return masks over it
+        rows = []
+        for result in graph.query(prepared(EVENTS_QUERY)):
+            rows.append({name: _python_value(result[name]) for name in result.labels})
+        columns = ['event', 'sound', 'date', 'time', 'location', 'latitude', 'longitude',
+                   'campus', 'device', 'recorder'] + NUMERIC_FIELDS
+        frame = pd.DataFrame(rows, columns=columns)
+        # OPTIONAL patterns can repeat an event (e.g. two descriptions); keep the first
+        frame = frame.drop_duplicates('event').reset_index(drop=True)
+        frame['event'] = frame['event'].astype(str)
+        frame['campus'] = frame['campus'].str.replace(r' College Campus$', '', regex=True)
+        for column in ['latitude', 'longitude']:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+        for column in NUMERIC_FIELDS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float32')
+
+        # Purposes, labelled as FilterIndex labels them and joined back into
+        # the CSV's "A; B" form; graphs written before labels were normalised
+        # may hold several descriptions for one label
+        self._purpose_nodes = {}
+        purposes_by_event = {}
+        for event, purpose in graph.query(prepared(PURPOSES_QUERY)):
+            label = purpose_label(str(purpose))
+            self._purpose_nodes.setdefault(label, []).append(purpose)
+            labels = purposes_by_event.setdefault(str(event), [])
+            if label not in labels:
+                labels.append(label)
+        frame['purpose'] = frame['event'].map(lambda e: '; '.join(purposes_by_event.get(e, [])) or None)
+
+        self.df = frame
+        self.purposes = sorted(self._purpose_nodes)
+        self.ranges = {field: (int(frame[field].min()), int(frame[field].max()))
+                       for field in NUMERIC_FIELDS if frame[field].notna().any()}
+        self._positions = {event: i for i, event in enumerate(frame['event'])}
+
+    @classmethod
+    def from_turtle(cls, path):
+        """Load a Turtle (or N-Triples, by extension) file."""
+        graph = Graph()
+        graph.parse(str(path), format='nt' if Path(path).suffix == '.nt' else 'turtle')
+        return cls(graph)
+
+    @classmethod
+    def from_survey(cls, csv_path=None, turtle_path=None):
+        """Load the survey's Turtle export, first bringing it up to date with ``csv_path``.
+
+        ``csv_path`` defaults to ``survey_csv()``.  The export (``bicomap.ttl``
+        in ``CACHE_DIR`` by default) is written by ``sound_map_rdf.convert``,
+        which appends rows added since the last run and rebuilds the file
+        when rows were edited or deleted.
+        """
+        csv_path = csv_path or survey_csv()
+        turtle_path = Path(turtle_path) if turtle_path else CACHE_DIR / Path(csv_path).with_suffix('.ttl').name
+        turtle_path.parent.mkdir(parents=True, exist_ok=True)
+        convert(csv_path, turtle_path)
+        return cls.from_turtle(turtle_path)
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Convert the survey CSV with ``sound_map_rdf`` in memory and load it."""
+        buffer = io.StringIO()
+        buffer.write(PREFIXES)
+        writer = TripleWriter(buffer, turtle=True)
+        converter = SoundMapConverter()
+        for row in prepare_chunk(pd.read_csv(csv_path, dtype=str)):
+            converter.convert_row(row, writer)
+        graph = Graph()
+        graph.parse(data=buffer.getvalue(), format='turtle')
+        return cls(graph)
+
+    def __len__(self):
+        return len(self.df)
+
+    def all_rows(self):
+        """Mask that keeps every event."""
+        return np.ones(len(self.df), dtype=bool)
+
+    def _event_mask(self, key, query, bindings):
+        """Run a prepared query once per binding set and cache the matches as a mask."""
+        if key not in self._results:
+            positions = [self._positions[str(row[0])]
+                         for row in self.graph.query(prepared(query), initBindings=bindings)
+                         if str(row[0]) in self._positions]
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[positions] = True
+            self._results[key] = mask
+        # Callers may combine masks in place, so never hand out the cached array
+        return self._results[key].copy()
+
+    def purpose_mask(self, selected_purposes):
+        """Events tagged with at least one of ``selected_purposes``.
+
+        As in ``FilterIndex``, selecting every purpose (or passing ``None``)
+        keeps all events.
+        """
+        if selected_purposes is None or len(selected_purposes) == len(self.purposes):
+            return self.all_rows()
+        mask = np.zeros(len(self.df), dtype=bool)
+        for purpose in selected_purposes:
+            for node in self._purpose_nodes.get(purpose, ()):
+                mask |= self._event_mask(('purpose', str(node)), PURPOSE_FILTER_QUERY, {'purpose': node})
+        return mask
+
+    def range_mask(self, field, low, high):
+        """Events whose ``field`` rating lies within [low, high]."""
+        bindings = {
+            'property': URIRef(BASE + RATING_PROPERTIES[field]),
+            'low': Literal(int(low), datatype=XSD.integer),
+            'high': Literal(int(high), datatype=XSD.integer),
+        }
+        return self._event_mask(('range', field, int(low), int(high)), RANGE_FILTER_QUERY, bindings)
+
+    def mask(self, selected_purposes=None, ranges=None):
+        """Combine a purpose selection and {field: (low, high)} ranges into one mask.
+
+        Like ``FilterIndex.mask``, selecting every purpose (or ``None``) keeps
+        all events, and ranges covering the full slider span are skipped.
+        """
+        mask = self.purpose_mask(selected_purposes)
+        for field, (low, high) in (ranges or {}).items():
+            if (low, high) == self.ranges.get(field):
+                continue
+            mask = mask & self.range_mask(field, low, high)
+        return mask
+
+    def filter(self, selected_purposes=None, ranges=None):
+        """Return the rows of ``df`` kept by :meth:`mask`."""
+        return self.df[self.mask(selected_purposes, ranges)]
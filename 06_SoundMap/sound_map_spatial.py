@@ -0,0 +1,196 @@
+"""Grid-hash spatial index for the BiCo Sound Map apps.
+
+Map clicks come back from folium as a ``lat``/``lng`` pair that rarely
+matches a recording's coordinates exactly, so looking rows up with
+``df["latitude"] == lat`` misses most clicks and scans the whole table.
+
+``build_spatial_index`` projects every recording onto a local plane in
+metres and buckets the points into square grid cells.  Queries only visit
+the cells around the click, so they stay fast as the survey grows, and
+they answer "which recording is nearest" or "which recordings are within
+R metres" instead of relying on float equality.
+
+Typical use in an app::
+
+    @st.cache_resource
+    def load_spatial_index():
+        return build_spatial_index(load_filter_index().df)
+
+    row = load_spatial_index().nearest(lat, lon, max_distance=30)
+    if row is not None:
+        clicked_row = df.iloc[[row]]
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Mean Earth radius in metres
+EARTH_RADIUS = 6371008.8
+
+# Default cell edge in metres: roughly one campus building
+DEFAULT_CELL_SIZE = 50.0
+
+
+class SpatialIndex:
+    """Bucket recordings by grid cell on an equirectangular projection.
+
+    Row numbers returned by the queries are positions in the DataFrame the
+    index was built from (use ``df.iloc``).  Rows without coordinates are
+    left out of the index.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_size=DEFAULT_CELL_SIZE):
+        latitudes = np.asarray(latitudes, dtype='float64')
+        longitudes = np.asarray(longitudes, dtype='float64')
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+
+        self.cell_size = float(cell_size)
+        # Project around the centre of the survey so distances are in metres
+        self.origin_lat = float(np.mean(latitudes[valid])) if valid.any() else 0.0
+        self.origin_lon = float(np.mean(longitudes[valid])) if valid.any() else 0.0
+        self._lon_scale = math.cos(math.radians(self.origin_lat))
+
+        self.rows = np.flatnonzero(valid)
+        self.x, self.y = self.project(latitudes[valid], longitudes[valid])
+
+        # Group row positions by cell so each cell holds a small index array
+        self._cells = {}
+        cell_x = np.floor(self.x / self.cell_size).astype('int64')
+        cell_y = np.floor(self.y / self.cell_size).astype('int64')
+        order = np.lexsort((cell_y, cell_x))
+        keys = np.stack([cell_x[order], cell_y[order]], axis=1)
+        if len(keys):
+            breaks = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            for chunk in np.split(order, breaks):
+                self._cells[(int(cell_x[chunk[0]]), int(cell_y[chunk[0]]))] = chunk
+            self._bounds = (int(cell_x.min()), int(cell_y.min()), int(cell_x.max()), int(cell_y.max()))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def project(self, latitudes, longitudes):
+        """Project degrees onto the local plane, returning (x, y) in metres."""
+        x = np.radians(np.asarray(longitudes, dtype='float64') - self.origin_lon) * EARTH_RADIUS * self._lon_scale
+        y = np.radians(np.asarray(latitudes, dtype='float64') - self.origin_lat) * EARTH_RADIUS
+        return x, y
+
+    def _cell_of(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _ring_sides(self, cx, cy, k):
+        """The cells of the square ring at Chebyshev distance ``k``, as (x range, y range) pairs.
+
+        Only the part of the ring inside the occupied bounds is kept, so a
+        query far from the survey does not probe thousands of empty cells.
+        """
+        if k == 0:
+            return [(range(cx, cx + 1), range(cy, cy + 1))]
+        low_x, low_y, high_x, high_y = self._bounds
+        xs = range(max(cx - k, low_x), min(cx + k, high_x) + 1)
+        ys = range(max(cy - k + 1, low_y), min(cy + k - 1, high_y) + 1)
+        sides = [(xs, range(y, y + 1)) for y in (cy - k, cy + k) if low_y <= y <= high_y]
+        sides += [(range(x, x + 1), ys) for x in (cx - k, cx + k) if low_x <= x <= high_x]
+        return [(side_x, side_y) for side_x, side_y in sides if len(side_x) and len(side_y)]
+
+    def _ring(self, sides):
+        """Points in the cells of ``_ring_sides``."""
+        found = [self._cells[(i, j)] for side_x, side_y in sides for i in side_x for j in side_y
+                 if (i, j) in self._cells]
+        return np.concatenate(found) if found else np.empty(0, dtype='int64')
+
+    def _distances(self, points, x, y):
+        return np.hypot(self.x[points] - x, self.y[points] - y)
+
+    def nearest(self, lat, lon, max_distance=None, mask=None):
+        """Row position of the recording closest to (lat, lon), or None.
+
+        ``max_distance`` (metres) bounds how far a click may land from a
+        marker.  ``mask`` is an optional boolean array over the DataFrame rows,
+        e.g. the sidebar filter mask, so hidden recordings are never picked.
+        """
+        if not len(self.rows):
+            return None
+        x, y = self.project(lat, lon)
+        x, y = float(x), float(y)
+        cx, cy = self._cell_of(x, y)
+
+        # Rings closer than the occupied bounds are empty; every occupied cell
+        # lies within max_ring rings of the query point
+        low_x, low_y, high_x, high_y = self._bounds
+        min_ring = max(low_x - cx, cx - high_x, low_y - cy, cy - high_y, 0)
+        max_ring = max(abs(low_x - cx), abs(high_x - cx), abs(low_y - cy), abs(high_y - cy))
+        if max_distance is not None:
+            max_ring = min(max_ring, int(math.ceil(max_distance / self.cell_size)) + 1)
+
+        best_point, best_distance = None, math.inf
+        visited = 0
+        for k in range(min_ring, max_ring + 1):
+            # Points in ring k are at least (k - 1) cells away
+            if (k - 1) * self.cell_size > best_distance:
+                break
+            sides = self._ring_sides(cx, cy, k)
+            visited += sum(len(side_x) * len(side_y) for side_x, side_y in sides)
+            if visited > len(self._cells):
+                # Probing the rings would cost more than measuring every point at once
+                best_point, best_distance = self._scan(x, y, mask, best_point, best_distance)
+                break
+            points = self._ring(sides)
+            if mask is not None and len(points):
+                points = points[np.asarray(mask)[self.rows[points]]]
+            if not len(points):
+                continue
+            distances = self._distances(points, x, y)
+            i = int(np.argmin(distances))
+            if distances[i] < best_distance:
+                best_point, best_distance = points[i], float(distances[i])
+
+        if best_point is None or (max_distance is not None and best_distance > max_distance):
+            return None
+        return int(self.rows[best_point])
+
+    def _scan(self, x, y, mask=None, best_point=None, best_distance=math.inf):
+        """Closest point to (x, y) among all indexed points, as (point, distance)."""
+        points = np.arange(len(self.rows))
+        if mask is not None:
+            points = points[np.asarray(mask)[self.rows]]
+        if not len(points):
+            return best_point, best_distance
+        distances = self._distances(points, x, y)
+        i = int(np.argmin(distances))
+        if distances[i] < best_distance:
+            return points[i], float(distances[i])
+        return best_point, best_distance
+
+    def within(self, lat, lon, radius, mask=None):
+        """Row positions of recordings within ``radius`` metres, nearest first."""
+        rows, _ = self.within_with_distances(lat, lon, radius, mask=mask)
+        return rows
+
+    def within_with_distances(self, lat, lon, radius, mask=None):
+        """Like :meth:`within`, also returning the distances in metres."""
+        x, y = self.project(lat, lon)
+        x, y = float(x), float(y)
+        low_x, low_y = self._cell_of(x - radius, y - radius)
+        high_x, high_y = self._cell_of(x + radius, y + radius)
+        found = [self._cells[(i, j)]
+                 for i in range(low_x, high_x + 1)
+                 for j in range(low_y, high_y + 1)
+                 if (i, j) in self._cells]
+        if not found:
+            return np.empty(0, dtype='int64'), np.empty(0)
+        points = np.concatenate(found)
+        if mask is not None:
+            points = points[np.asarray(mask)[self.rows[points]]]
+        distances = self._distances(points, x, y)
+        keep = distances <= radius
+        order = np.argsort(distances[keep], kind='stable')
+        return self.rows[points[keep][order]], distances[keep][order]
+
+
+def build_spatial_index(df, cell_size=DEFAULT_CELL_SIZE):
+    """Build a :class:`SpatialIndex` over the ``latitude``/``longitude`` columns of ``df``."""
+    latitudes = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype='float64')
+    longitudes = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype='float64')
+    return SpatialIndex(latitudes, longitudes, cell_size=cell_size)
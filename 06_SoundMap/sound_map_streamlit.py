@@ -1,16 +1,11 @@
 import streamlit as st
 import pandas as pd
+from sound_map_data import read_survey, data_version
 
-# Force browser cache refresh [2]
-st.markdown("""
-<meta http-equiv="Cache-Control" content="no-cache, no-store, must-revalidate">
-<meta http-equiv="Pragma" content="no-cache">
-<meta http-equiv="Expires" content="0">
-""", unsafe_allow_html=True)
-
+# Load the bundled survey; the content hash invalidates the cache when the file changes
 @st.cache_data
-def load_data():
-    df = pd.read_csv('https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/main/06_SoundMap/bicomap.csv')
+def load_data(version):
+    df = read_survey()
     if 'time' in df.columns:
         df = df.drop('time', axis=1)
     return df.dropna(subset=['latitude', 'longitude'])
@@ -20,7 +15,7 @@ st.markdown('By Logan Griffin, Luke Sheppard, Reed Solomon, and Jade Yu')
 st.markdown('Sounds of Silence: A Sound Survey of the Bi-Co During Finals Week')
 
 # Load data
-full_data = load_data()
+full_data = load_data(data_version())
 
 # Sidebar
 st.sidebar.write("Filter Data")
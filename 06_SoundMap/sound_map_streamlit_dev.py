@@ -2,7 +2,9 @@
 import streamlit as st
 import pandas as pd
 import pydeck as pdk
-import re 
+from sound_map_data import read_survey, data_version, start_background_refresh
+from sound_map_filters import build_filter_index, NUMERIC_FIELDS
+from sound_map_sparql import SoundMapStore
 
 # Set up Streamlit page
 st.set_page_config(page_title="Musical Events Map", layout="wide")
@@ -16,82 +18,83 @@ st.markdown('By Logan Griffin, Luke Sheppard, Reed Solomon, and Jade Yu')
 CENTER_LAT = 40.0209
 CENTER_LON = -75.3137
 
-# Load data
+# Load data from the copy bundled with the app; its content hash is the cache key
 @st.cache_data
-def load_data():
-    return pd.read_csv("https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/refs/heads/main/06_SoundMap/bicomap.csv")
+def load_data(version):
+    return read_survey()
 
-df = load_data()
+# Optionally pull newer survey data in the background (set SOUNDMAP_REMOTE_URL)
+@st.cache_resource
+def start_data_refresh():
+    return start_background_refresh()
+
+start_data_refresh()
+version = data_version()
+
+# Preprocess once: purpose multi-hot matrix and typed numeric columns
+@st.cache_resource
+def load_filter_index(version):
+    return build_filter_index(load_data(version))
+
+# The same survey as an RDF graph (the sound_map_rdf Turtle export), filtered
+# with precompiled SPARQL queries
+@st.cache_resource
+def load_sparql_store(version):
+    return SoundMapStore.from_survey()
 
 # Sidebar filters
 st.sidebar.header("Filter Events by Category")
 
-# Initialize filtered dataframe
-filtered_df = df.copy()
+# Both backends offer the same filtering interface
+backend = st.sidebar.radio("Data backend", ["CSV (pandas)", "RDF (SPARQL)"], horizontal=True)
+if backend == "RDF (SPARQL)":
+    filter_index = load_sparql_store(version)
+else:
+    filter_index = load_filter_index(version)
+df = filter_index.df
+
+# Start with every row selected and AND in each active filter
+row_mask = filter_index.all_rows()
 active_filters = []
 
 # Purpose filter (multiselect)
-if 'purpose' in df.columns:
+purpose_options = filter_index.purposes
+if len(purpose_options) > 0:
     st.sidebar.subheader("📝 Purpose")
-    
-    # Split all purpose strings and collect unique substrings
-    all_purposes = set()
-    for purpose_string in df['purpose'].dropna():
-        # Split by semicolon and add each cleaned substring to the set
-        purposes = [p.strip() for p in purpose_string.split(';') if p.strip()]
-        all_purposes.update(purposes)
-    
-    # Convert to sorted list for the multiselect
-    purpose_options = sorted(all_purposes)
-    
-    if len(purpose_options) > 0:
-        selected_purposes = st.sidebar.multiselect(
-            "Select purposes:",
-            options=purpose_options,
-            default=purpose_options,
-            key="purpose_filter"
-        )
-        
-        if len(selected_purposes) < len(purpose_options):
-            # Create regex pattern to match any of the selected purposes
-            pattern = '|'.join([re.escape(purpose) for purpose in selected_purposes])
-            filtered_df = filtered_df[filtered_df['purpose'].str.contains(pattern, na=False, regex=True)]
-            active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
+    selected_purposes = st.sidebar.multiselect(
+        "Select purposes:",
+        options=purpose_options,
+        default=purpose_options,
+        key="purpose_filter"
+    )
+
+    if len(selected_purposes) < len(purpose_options):
+        row_mask &= filter_index.purpose_mask(selected_purposes)
+        active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
 
 # Numeric fields section
 st.sidebar.subheader("Numeric Attributes")
 
-numeric_fields = ['volume', 'pitch', 'distractability', 'rowdiness', 'multiplicity', 'repetition', 'persistence']
+numeric_fields = NUMERIC_FIELDS
+
+for field, (min_val, max_val) in filter_index.ranges.items():
+    if min_val < max_val:  # Only create slider if there's a range
+        selected_range = st.sidebar.slider(
+            f"{field.title()}:",
+            min_value=min_val,
+            max_value=max_val,
+            value=(min_val, max_val),
+            step=1,
+            key=f"{field}_slider",
+            help=f"Filter events by {field} level (range: {min_val}-{max_val})"
+        )
 
-for field in numeric_fields:
-    if field in df.columns:
-        # Convert to numeric and get valid values
-        numeric_values = pd.to_numeric(df[field], errors='coerce').dropna()
-        
-        if len(numeric_values) > 0:
-            min_val = int(numeric_values.min())
-            max_val = int(numeric_values.max())
-            
-            if min_val < max_val:  # Only create slider if there's a range
-                selected_range = st.sidebar.slider(
-                    f"{field.title()}:",
-                    min_value=min_val,
-                    max_value=max_val,
-                    value=(min_val, max_val),
-                    step=1,
-                    key=f"{field}_slider",
-                    help=f"Filter events by {field} level (range: {min_val}-{max_val})"
-                )
-                
-                # Check if filter is active (not full range)
-                if selected_range != (min_val, max_val):
-                    # Filter data based on selected range
-                    numeric_col = pd.to_numeric(filtered_df[field], errors='coerce')
-                    filtered_df = filtered_df[
-                        (numeric_col >= selected_range[0]) & 
-                        (numeric_col <= selected_range[1])
-                    ]
-                    active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
+        # Check if filter is active (not full range)
+        if selected_range != (min_val, max_val):
+            row_mask &= filter_index.range_mask(field, selected_range[0], selected_range[1])
+            active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
+
+filtered_df = df[row_mask]
 
 # Marker size control
 st.sidebar.subheader("Set Marker Size")
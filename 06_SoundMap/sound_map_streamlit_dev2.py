@@ -2,8 +2,11 @@
 import streamlit as st
 import pandas as pd
 import pydeck as pdk
-import re 
 import folium
+from streamlit_folium import st_folium
+from sound_map_data import read_survey, data_version, start_background_refresh
+from sound_map_filters import build_filter_index, NUMERIC_FIELDS
+from sound_map_spatial import build_spatial_index
 
 # Set up Streamlit page
 st.set_page_config(page_title="Musical Events Map", layout="wide")
@@ -17,83 +20,83 @@ st.markdown('By Logan Griffin, Luke Sheppard, Reed Solomon, and Jade Yu')
 CENTER_LAT = 40.0209
 CENTER_LON = -75.3137
 
-# Load data
+# Load data from the copy bundled with the app; its content hash is the cache key
 @st.cache_data
-def load_data():
-    return pd.read_csv("https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/refs/heads/main/06_SoundMap/bicomap.csv")
+def load_data(version):
+    return read_survey()
 
-df = load_data()
+# Optionally pull newer survey data in the background (set SOUNDMAP_REMOTE_URL)
+@st.cache_resource
+def start_data_refresh():
+    return start_background_refresh()
+
+start_data_refresh()
+version = data_version()
+
+# Preprocess once: purpose multi-hot matrix and typed numeric columns
+@st.cache_resource
+def load_filter_index(version):
+    return build_filter_index(load_data(version))
+
+# Spatial index over the same rows, for click-to-record lookup
+@st.cache_resource
+def load_spatial_index(version):
+    return build_spatial_index(load_filter_index(version).df)
+
+filter_index = load_filter_index(version)
+spatial_index = load_spatial_index(version)
+df = filter_index.df
+
+# How far (in metres) a click may land from a marker and still select it
+CLICK_TOLERANCE = 30
 
 # Sidebar filters
 st.sidebar.header("Filter Events by Category")
 
-# Initialize filtered dataframe
-filtered_df = df.copy()
-st.dataframe(filtered_df)
+st.dataframe(df)
+
+# Start with every row selected and AND in each active filter
+row_mask = filter_index.all_rows()
 active_filters = []
 
 # Purpose filter (multiselect)
-if 'purpose' in df.columns:
+purpose_options = filter_index.purposes
+if len(purpose_options) > 0:
     st.sidebar.subheader("📝 Purpose")
-    
-    # Split all purpose strings and collect unique substrings
-    all_purposes = set()
-    for purpose_string in df['purpose'].dropna():
-        # Split by semicolon and add each cleaned substring to the set
-        purposes = [p.strip() for p in purpose_string.split(';') if p.strip()]
-        all_purposes.update(purposes)
-    
-    # Convert to sorted list for the multiselect
-    purpose_options = sorted(all_purposes)
-    
-    if len(purpose_options) > 0:
-        selected_purposes = st.sidebar.multiselect(
-            "Select purposes:",
-            options=purpose_options,
-            default=purpose_options,
-            key="purpose_filter"
-        )
-        
-        if len(selected_purposes) < len(purpose_options):
-            # Create regex pattern to match any of the selected purposes
-            pattern = '|'.join([re.escape(purpose) for purpose in selected_purposes])
-            filtered_df = filtered_df[filtered_df['purpose'].str.contains(pattern, na=False, regex=True)]
-            active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
+    selected_purposes = st.sidebar.multiselect(
+        "Select purposes:",
+        options=purpose_options,
+        default=purpose_options,
+        key="purpose_filter"
+    )
+
+    if len(selected_purposes) < len(purpose_options):
+        row_mask &= filter_index.purpose_mask(selected_purposes)
+        active_filters.append(f"Purpose: {len(selected_purposes)}/{len(purpose_options)}")
 
 # Numeric fields section
 st.sidebar.subheader("Numeric Attributes")
 
-numeric_fields = ['volume', 'pitch', 'distractability', 'rowdiness', 'multiplicity', 'repetition', 'persistence']
+numeric_fields = NUMERIC_FIELDS
+
+for field, (min_val, max_val) in filter_index.ranges.items():
+    if min_val < max_val:  # Only create slider if there's a range
+        selected_range = st.sidebar.slider(
+            f"{field.title()}:",
+            min_value=min_val,
+            max_value=max_val,
+            value=(min_val, max_val),
+            step=1,
+            key=f"{field}_slider",
+            help=f"Filter events by {field} level (range: {min_val}-{max_val})"
+        )
+
+        # Check if filter is active (not full range)
+        if selected_range != (min_val, max_val):
+            row_mask &= filter_index.range_mask(field, selected_range[0], selected_range[1])
+            active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
 
-for field in numeric_fields:
-    if field in df.columns:
-        # Convert to numeric and get valid values
-        numeric_values = pd.to_numeric(df[field], errors='coerce').dropna()
-        
-        if len(numeric_values) > 0:
-            min_val = int(numeric_values.min())
-            max_val = int(numeric_values.max())
-            
-            if min_val < max_val:  # Only create slider if there's a range
-                selected_range = st.sidebar.slider(
-                    f"{field.title()}:",
-                    min_value=min_val,
-                    max_value=max_val,
-                    value=(min_val, max_val),
-                    step=1,
-                    key=f"{field}_slider",
-                    help=f"Filter events by {field} level (range: {min_val}-{max_val})"
-                )
-                
-                # Check if filter is active (not full range)
-                if selected_range != (min_val, max_val):
-                    # Filter data based on selected range
-                    numeric_col = pd.to_numeric(filtered_df[field], errors='coerce')
-                    filtered_df = filtered_df[
-                        (numeric_col >= selected_range[0]) & 
-                        (numeric_col <= selected_range[1])
-                    ]
-                    active_filters.append(f"{field.title()}: {selected_range[0]}-{selected_range[1]}")
+filtered_df = df[row_mask]
 
 # Marker size control
 st.sidebar.subheader("Set Marker Size")
@@ -341,7 +344,7 @@ if len(filtered_map_data) > 0:
 	folium.LatLngPopup().add_to(m)
 
 	# Getting the map to load
-	st_data = st.folium(m, width = 725, key = "main_map")
+	st_data = st_folium(m, width = 725, key = "main_map")
 
 	# Setting up last object clicked so I can reference what I click
 	last = st_data.get("last_object_clicked")
@@ -351,10 +354,10 @@ if len(filtered_map_data) > 0:
 else:
 	st.warning("No events match the selected filters")
 
-# Setting lat, lon, and clicked_row_melted to be empty to avoid errors before the first click
+# Setting lat, lon, and clicked_row to be empty to avoid errors before the first click
 lat = None
 lon = None
-clicked_row_melted = pd.DataFrame()
+clicked_row = None
 
 # Registering a click
 clicked = st.session_state.get("last_object_clicked")
@@ -364,9 +367,12 @@ if clicked is not None:
 	lat = clicked.get("lat")
 	lon = clicked.get("lng")
 
-# Filtering the dataframe to the rows with the clicked marker
+# Finding the nearest visible recording to the click
 if lat is not None and lon is not None:
-	clicked_row_melted = melted_df[
-		(melted_df["latitude"]==lat) &
-		(melted_df["longitude"]==lon)
-	]
\ No newline at end of file
+	clicked_row = spatial_index.nearest(lat, lon, max_distance=CLICK_TOLERANCE, mask=row_mask)
+
+# Display the clicked recording
+if clicked_row is not None:
+	st.dataframe(df.iloc[[clicked_row]], width='stretch')
+else:
+	st.info("No matching event found for the clicked location.")
@@ -0,0 +1,173 @@
+"""Server-side tile aggregation for the BiCo Sound Map apps.
+
+Sending every recording to the browser works for one semester's survey, but
+the payload grows with the dataset.  This module groups recordings into
+standard web map tiles (the same ``z/x/y`` quadtree scheme folium, pydeck
+and OpenStreetMap use) at each zoom level and summarises each tile:
+
+* ``count`` of recordings and their centroid ``latitude``/``longitude``
+* ``mean_<field>`` for each numeric survey attribute (volume, rowdiness, ...)
+* ``purpose_<name>`` counts for each purpose label
+
+The per-recording tile codes are computed once per dataset, so building the
+summaries (even for a filtered subset) is a handful of ``np.bincount``
+calls.  ``tiles_in_view`` returns only the tiles covering the visible map
+bounds, so what the app sends to the browser tracks the viewport rather than
+the survey size.
+
+Typical use in an app::
+
+    @st.cache_resource
+    def load_tile_pyramid(version):
+        return build_tile_pyramid(load_filter_index(version))
+
+    # mask=None while no filter is set, so the cached unfiltered summaries are reused
+    tiles = load_tile_pyramid(version).tiles_in_view(zoom, south, west, north, east,
+                                                     mask=row_mask if active_filters else None)
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Zoom levels to precompute: 10 shows the Main Line, 19 a single building
+DEFAULT_ZOOMS = range(10, 20)
+
+# Web Mercator cannot represent the poles
+MAX_LATITUDE = 85.05112878
+
+
+def tile_coordinates(latitudes, longitudes, zoom):
+    """Web map tile (x, y) integer arrays for the given points at ``zoom``."""
+    n = 2 ** zoom
+    latitudes = np.clip(np.asarray(latitudes, dtype='float64'), -MAX_LATITUDE, MAX_LATITUDE)
+    longitudes = np.asarray(longitudes, dtype='float64')
+    x = np.floor((longitudes + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(np.radians(latitudes))) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype('int64'), np.clip(y, 0, n - 1).astype('int64')
+
+
+def tile_bounds(x, y, zoom):
+    """(south, west, north, east) in degrees of tile ``zoom/x/y``."""
+    n = 2 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+class TileLevel:
+    """Tile assignment of every recording at one zoom level."""
+
+    def __init__(self, zoom, tile_x, tile_y, valid):
+        self.zoom = zoom
+        keys = tile_x[valid] * (2 ** zoom) + tile_y[valid]
+        unique_keys, codes = np.unique(keys, return_inverse=True)
+        # codes[i] is the tile number of the i-th located recording
+        self.codes = np.full(len(valid), -1, dtype='int64')
+        self.codes[valid] = codes
+        self.tile_x = unique_keys // (2 ** zoom)
+        self.tile_y = unique_keys % (2 ** zoom)
+
+    def __len__(self):
+        return len(self.tile_x)
+
+
+class TilePyramid:
+    """Per-zoom tile aggregates over one survey DataFrame."""
+
+    def __init__(self, latitudes, longitudes, numeric, purposes, purpose_matrix, zooms=DEFAULT_ZOOMS):
+        self.latitudes = np.asarray(latitudes, dtype='float64')
+        self.longitudes = np.asarray(longitudes, dtype='float64')
+        self.numeric = numeric
+        self.purposes = purposes
+        self.purpose_matrix = purpose_matrix
+        self.zooms = list(zooms)
+
+        valid = ~(np.isnan(self.latitudes) | np.isnan(self.longitudes))
+        self.levels = {}
+        for zoom in self.zooms:
+            tile_x, tile_y = tile_coordinates(np.where(valid, self.latitudes, 0.0),
+                                              np.where(valid, self.longitudes, 0.0), zoom)
+            self.levels[zoom] = TileLevel(zoom, tile_x, tile_y, valid)
+
+        # Unfiltered aggregates are reused on every rerun
+        self._cache = {}
+
+    def nearest_zoom(self, zoom):
+        """Closest precomputed zoom level to ``zoom``."""
+        return min(self.zooms, key=lambda z: abs(z - zoom))
+
+    def aggregate(self, zoom, mask=None, tiles=None):
+        """Summary DataFrame with one row per occupied tile at ``zoom``.
+
+        ``mask`` restricts the summary to the selected recordings (e.g. the
+        sidebar filters).  ``tiles`` restricts it to a subset of tile numbers.
+        """
+        zoom = self.nearest_zoom(zoom)
+        if mask is None and tiles is None and zoom in self._cache:
+            return self._cache[zoom]
+
+        level = self.levels[zoom]
+        selected = level.codes >= 0
+        if mask is not None:
+            selected &= np.asarray(mask, dtype=bool)
+        if tiles is not None:
+            in_tiles = np.zeros(len(level), dtype=bool)
+            in_tiles[tiles] = True
+            selected &= in_tiles[np.where(level.codes >= 0, level.codes, 0)]
+        rows = np.flatnonzero(selected)
+        codes = level.codes[rows]
+        size = len(level)
+
+        counts = np.bincount(codes, minlength=size)
+        summary = {
+            'zoom': zoom,
+            'tile_x': level.tile_x,
+            'tile_y': level.tile_y,
+            'count': counts,
+        }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            summary['latitude'] = np.bincount(codes, weights=self.latitudes[rows], minlength=size) / counts
+            summary['longitude'] = np.bincount(codes, weights=self.longitudes[rows], minlength=size) / counts
+            for field, values in self.numeric.items():
+                values = values[rows].astype('float64')
+                present = ~np.isnan(values)
+                totals = np.bincount(codes[present], weights=values[present], minlength=size)
+                summary[f'mean_{field}'] = totals / np.bincount(codes[present], minlength=size)
+        for column, purpose in enumerate(self.purposes):
+            summary[f'purpose_{purpose}'] = np.bincount(codes, weights=self.purpose_matrix[rows, column],
+                                                        minlength=size).astype('int64')
+
+        result = pd.DataFrame(summary)
+        result = result[result['count'] > 0].reset_index(drop=True)
+        if mask is None and tiles is None:
+            self._cache[zoom] = result
+        return result
+
+    def tiles_in_view(self, zoom, south, west, north, east, mask=None):
+        """Aggregates for just the tiles overlapping the given map bounds."""
+        zoom = self.nearest_zoom(zoom)
+        level = self.levels[zoom]
+        low_x, low_y = tile_coordinates([north], [west], zoom)
+        high_x, high_y = tile_coordinates([south], [east], zoom)
+        visible = np.flatnonzero(
+            (level.tile_x >= low_x[0]) & (level.tile_x <= high_x[0]) &
+            (level.tile_y >= low_y[0]) & (level.tile_y <= high_y[0])
+        )
+        if mask is None:
+            # Every tile of a level holds at least one recording, so the
+            # cached unfiltered summary has exactly one row per tile number
+            return self.aggregate(zoom).iloc[visible].reset_index(drop=True)
+        return self.aggregate(zoom, mask=mask, tiles=visible)
+
+
+def build_tile_pyramid(filter_index, zooms=DEFAULT_ZOOMS):
+    """Build a :class:`TilePyramid` from a ``sound_map_filters.FilterIndex``."""
+    df = filter_index.df
+    latitudes = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype='float64')
+    longitudes = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype='float64')
+    return TilePyramid(latitudes, longitudes, filter_index.numeric,
+                       filter_index.purposes, filter_index.purpose_matrix, zooms=zooms)
@@ -1 +1,21 @@
-__version__ = "1.0.0"
\ No newline at end of file
+"""Helpers for the Encoding Music guides and lab datasets.
+
+Submodules are imported the first time they are used, so ``import
+encoding_music`` loads none of pandas, plotly or music21::
+
+    import encoding_music as em
+
+    em.datasets.load_spotify()            # imports encoding_music.datasets now
+    em.similarity.similarity_frame(...)
+
+Check what a cold import costs with ``python -m encoding_music.benchmarks.import_time``.
+"""
+
+from ._lazy import lazy_attributes
+
+__version__ = "1.0.0"
+
+__getattr__, __dir__ = lazy_attributes(__name__, submodules=[
+    "benchmarks", "charts", "datasets", "maps", "mei", "networks", "rag", "rilm", "scores", "similarity", "spotify",
+    "tracing",
+])
@@ -0,0 +1,41 @@
+"""Lazy attribute loading for the package ``__init__`` modules.
+
+``import encoding_music`` (or ``encoding_music.datasets``) should not import
+every submodule and, through them, pandas, plotly or music21.  A package
+lists its submodules and the names it re-exports; each is imported the
+first time it is used (PEP 562 module ``__getattr__``)::
+
+    __getattr__, __dir__ = lazy_attributes(__name__, submodules=["datasets"],
+                                           attributes={"load_spotify": ".billboard_spotify"})
+"""
+
+import importlib
+import sys
+from typing import Iterable, Optional
+
+
+def lazy_attributes(package: str, submodules: Iterable[str] = (), attributes: Optional[dict] = None):
+    """``__getattr__`` and ``__dir__`` for ``package``.
+
+    Args:
+        package: the package's ``__name__``
+        submodules: names of submodules to import on first access
+        attributes: exported name -> (relative) module that defines it
+    """
+    submodules = set(submodules)
+    attributes = dict(attributes or {})
+
+    def __getattr__(name: str):
+        if name in submodules:
+            return importlib.import_module(f"{package}.{name}")
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package), name)
+            # Later lookups find it directly, without calling __getattr__
+            setattr(sys.modules[package], name, value)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | submodules | set(attributes))
+
+    return __getattr__, __dir__
@@ -0,0 +1,9 @@
+"""Benchmarks for the package.
+
+* ``python -m encoding_music.benchmarks`` times the guides' hot paths on the
+  lab datasets and stores the results per commit (:mod:`.runner`, :mod:`.lab`)
+* ``python -m encoding_music.benchmarks.import_time`` checks what a cold
+  ``import`` costs
+* ``python -m encoding_music.benchmarks.tracing_overhead`` checks that the
+  tracing hooks cost next to nothing while tracing is off
+"""
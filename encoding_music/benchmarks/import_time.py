@@ -0,0 +1,97 @@
+"""How long a cold ``import`` of each part of the package takes, and what it drags in.
+
+Each module is imported in a fresh interpreter with ``-X importtime``, so
+nothing is already cached in ``sys.modules``.  The report lists the import
+time and which heavy third-party packages were loaded; the run fails
+(exit status 1) if any import loads one of ``FORBIDDEN`` (music21, plotly
+and the like, which only the functions that draw or analyse need), or if
+``import encoding_music`` itself loads anything beyond the standard
+library::
+
+    python -m encoding_music.benchmarks.import_time
+    python -m encoding_music.benchmarks.import_time encoding_music.maps --repeat 5
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from typing import Iterable, Optional
+
+# Never needed at import time: imported inside the functions that use them
+FORBIDDEN = ("music21", "plotly", "pyvis", "networkx", "community", "statsmodels", "verovio", "crim_intervals",
+             "matplotlib", "seaborn", "altair", "lxml", "bs4", "requests", "sklearn", "spotipy")
+# Also kept out of the top-level package and the tracing hooks every module imports, though the
+# modules that work on frames may load them
+BARE_FORBIDDEN = FORBIDDEN + ("pandas", "numpy", "pyarrow")
+BARE_MODULES = ("encoding_music", "encoding_music.tracing")
+
+MODULES = ["encoding_music", "encoding_music.charts", "encoding_music.datasets", "encoding_music.maps",
+           "encoding_music.mei", "encoding_music.networks", "encoding_music.rag", "encoding_music.rilm",
+           "encoding_music.scores", "encoding_music.similarity", "encoding_music.spotify",
+           "encoding_music.tracing"]
+
+_PROBE = "import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+_IMPORTTIME = re.compile(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def cold_import(module: str) -> dict:
+    """Import ``module`` in a new interpreter: total microseconds and the top-level packages loaded."""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+                             capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr[-2000:]}")
+    total = 0
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        # Only the outermost imports, so nested imports are not counted twice
+        if match and len(match.group(2)) == 1 and not match.group(3).startswith(("encodings", "site")):
+            total += int(match.group(1))
+    loaded = json.loads(process.stdout.splitlines()[-1])
+    return {"module": module, "microseconds": total,
+            "packages": sorted({name.split(".")[0] for name in loaded})}
+
+
+def check(module: str, packages: Iterable[str]) -> list:
+    """The forbidden packages that importing ``module`` loaded."""
+    forbidden = BARE_FORBIDDEN if module in BARE_MODULES else FORBIDDEN
+    return sorted(set(packages) & set(forbidden))
+
+
+def run(modules: Iterable[str] = MODULES, repeat: int = 3) -> list:
+    """One result per module: median cold-import time, heavy packages loaded, and violations."""
+    results = []
+    for module in modules:
+        runs = [cold_import(module) for _ in range(repeat)]
+        packages = runs[0]["packages"]
+        results.append({"module": module,
+                        "milliseconds": statistics.median(r["microseconds"] for r in runs) / 1000,
+                        "heavy": sorted(set(packages) & set(BARE_FORBIDDEN)),
+                        "forbidden": check(module, packages)})
+    return results
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time cold imports of encoding_music and check what they load.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="imports per module; the median is reported")
+    args = parser.parse_args(argv)
+
+    results = run(args.modules, args.repeat)
+    width = max(len(r["module"]) for r in results)
+    for r in results:
+        line = f"{r['module']:<{width}}  {r['milliseconds']:8.1f} ms  {', '.join(r['heavy']) or '-'}"
+        if r["forbidden"]:
+            line += f"  FORBIDDEN: {', '.join(r['forbidden'])}"
+        print(line)
+    failed = [r["module"] for r in results if r["forbidden"]]
+    if failed:
+        print(f"{len(failed)} module(s) load packages they do not need at import time: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
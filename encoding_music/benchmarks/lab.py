@@ -0,0 +1,286 @@
+"""Benchmarks of the guides' hot paths, on the lab datasets and on copies scaled up 10x and 100x.
+
+Each class follows the asv conventions: ``params`` are the scale factors,
+``setup(scale)`` builds the inputs (not timed), and every ``time_*`` method
+is one benchmark.  A benchmark that would not fit in memory or in a
+sensible run time at some scale raises ``NotImplementedError`` for it and
+is reported as skipped.
+
+The fixtures are the files in the repository: the duos in
+``02_Lab_Data/Duos_For_Intervals``, the Billboard and Spotify CSVs, the
+Beatles pickles and ``06_SoundMap/bicomap.csv``.  The repository has no
+RILM data, so the RILM benchmarks use a seeded synthetic index with the
+API's columns.  Scaled frames are copies of the original whose numeric
+columns get a little seeded noise, so that the copies are not exact
+duplicates; see :func:`scale_frame`.
+
+Run them with ``python -m encoding_music.benchmarks run``.
+"""
+
+import importlib.util
+import os
+import tempfile
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .. import mei, networks, rilm, similarity, tracing
+from ..datasets.billboard_spotify import LAB_DATA, load_billboard, load_spotify
+from ..scores.mei import read_score
+
+REPO = LAB_DATA.parent
+DUOS = LAB_DATA / "Duos_For_Intervals"
+BEATLES = LAB_DATA / "Beatles"
+SOUNDMAP = REPO / "06_SoundMap"
+SCALES = (1, 10, 100)
+FEATURES = ["danceability", "energy", "speechiness", "liveness", "instrumentalness", "valence"]
+
+
+def scale_frame(df: pd.DataFrame, scale: int, label: Optional[str] = None, jitter: Iterable[str] = (),
+                seed: int = 0) -> pd.DataFrame:
+    """``scale`` copies of ``df``, the first unchanged.
+
+    In the other copies ``label`` gets a suffix (``"Help! #2"``) and each
+    ``jitter`` column gets normal noise with 1% of the column's standard
+    deviation.
+    """
+    if scale == 1:
+        return df.copy()
+    rng = np.random.default_rng(seed)
+    copies = [df]
+    for k in range(2, scale + 1):
+        copy = df.copy()
+        if label:
+            copy[label] = copy[label].astype(str) + f" #{k}"
+        for column in jitter:
+            values = copy[column].astype("float64")
+            copy[column] = values + rng.normal(0, 0.01 * (values.std() or 1), len(values))
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+@lru_cache(maxsize=None)
+def duo_paths() -> tuple:
+    return tuple(sorted(DUOS.glob("*.mei")))
+
+
+@lru_cache(maxsize=None)
+def duo_soups() -> dict:
+    return {path.name: mei.open_file(path) for path in duo_paths()}
+
+
+@lru_cache(maxsize=None)
+def spotify() -> pd.DataFrame:
+    return load_spotify()
+
+
+@lru_cache(maxsize=None)
+def soundmap_filters():
+    # The SoundMap apps are scripts beside their data, not part of the package
+    spec = importlib.util.spec_from_file_location("sound_map_filters", SOUNDMAP / "sound_map_filters.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@lru_cache(maxsize=None)
+def rilm_index(items: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """A synthetic RILM index query: ``items`` items, about eight Zipf-distributed terms each."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term {i:04d}" for i in range(1500)])
+    term_weights = 1 / np.arange(1, len(vocabulary) + 1)
+    authors = np.array([f"author {i:03d}" for i in range(600)])
+    author_weights = 1 / np.arange(1, len(authors) + 1)
+
+    per_item = 3 + rng.poisson(5, items)
+    rows = per_item.sum()
+    item = np.repeat(np.arange(items), per_item)
+    year = rng.integers(1967, 2024, items)[item]
+    term = rng.choice(len(vocabulary), rows, p=term_weights / term_weights.sum())
+    return pd.DataFrame({
+        "year": year, "item": item, "entry": 1, "level": 1, "term": vocabulary[term],
+        "category": [f"category {t % 12}" for t in term],
+        "author": authors[rng.choice(len(authors), items, p=author_weights / author_weights.sum())][item],
+        "full_id": [f"{y}-{i}" for y, i in zip(year, item)],
+    })
+
+
+class MEINotes:
+    """Reading the duos and listing their notes."""
+
+    params = SCALES
+
+    def setup(self, scale):
+        self.soups = list(duo_soups().values()) * scale
+        self.paths = list(duo_paths()) * scale
+
+    def time_parse_soup(self, scale):
+        # 2-3 s for the 46 duos already; the larger corpora would take minutes
+        if scale > 1:
+            raise NotImplementedError
+        for path in self.paths:
+            mei.open_file(path)
+
+    def time_extract_notes_simplified(self, scale):
+        for soup in self.soups:
+            mei.extract_notes_simplified(soup)
+
+    def time_read_score(self, scale):
+        if scale > 10:
+            raise NotImplementedError
+        for path in self.paths:
+            read_score(path)
+
+
+class FictaFactors:
+    """The Paderborn guide's ficta factors: editorial accidentals per note, per piece."""
+
+    params = SCALES
+
+    def setup(self, scale):
+        self.soups = {f"{name} #{k}": soup for k in range(scale) for name, soup in duo_soups().items()}
+
+    def time_ficta_table(self, scale):
+        mei.ficta_table(self.soups)
+
+
+class FeatureNetwork:
+    """The networks guide's feature network over the lab Spotify tracks.
+
+    The guide's threshold of 0.005 suits the Beatles alone; over all 1,956
+    lab tracks it makes 32,000 edges, so this uses 0.001 (about 6,400).  It
+    shrinks with the scale, so that each song keeps about as many neighbours
+    and the number of edges grows linearly.
+    """
+
+    params = SCALES
+
+    def setup(self, scale):
+        self.df = scale_frame(spotify(), scale, label="track_name", jitter=["danceability"])
+        self.threshold = 0.001 / scale
+        # Pyvis copies its JavaScript into the working directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+
+    def teardown(self, scale):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def time_feature_graph(self, scale):
+        networks.feature_graph(self.df, "track_name", "danceability", self.threshold, communities=False)
+
+    def time_feature_graph_communities(self, scale):
+        if scale > 10:
+            raise NotImplementedError
+        networks.feature_graph(self.df, "track_name", "danceability", self.threshold)
+
+    def time_feature_network(self, scale):
+        # Pyvis checks every new edge against all the others, so its HTML is only timed at 1x
+        if scale > 1:
+            raise NotImplementedError
+        networks.feature_network(self.df, "track_name", "danceability", self.threshold, "network.html",
+                                 communities=False)
+
+
+class Similarity:
+    """Cosine similarity and Euclidean distance between Spotify tracks.
+
+    Every track of the (scaled) catalogue is compared with 100 query
+    tracks; the guide's full track-by-track table is timed at 1x only,
+    since at 10x it would hold 380 million values.
+    """
+
+    params = SCALES
+
+    def setup(self, scale):
+        self.df = scale_frame(spotify().dropna(subset=FEATURES), scale, label="track_name", jitter=FEATURES)
+        self.catalogue = self.df[FEATURES].to_numpy()
+        self.queries = self.catalogue[:100]
+
+    def time_cosine_similarity(self, scale):
+        similarity.cosine_similarity(self.catalogue, self.queries)
+
+    def time_euclidean_distances(self, scale):
+        similarity.euclidean_distances(self.catalogue, self.queries)
+
+    def time_similarity_frame(self, scale):
+        if scale > 1:
+            raise NotImplementedError
+        similarity.similarity_frame(self.df, FEATURES, label="track_name")
+
+
+class RILMCooccurrence:
+    """Term and author co-occurrence in a RILM index query (synthetic, 2,000 items at 1x)."""
+
+    params = SCALES
+
+    def setup(self, scale):
+        self.results = rilm_index(2000 * scale)
+
+    def time_clean_query_data(self, scale):
+        rilm.clean_query_data(self.results, range(1990, 2011), None)
+
+    def time_concept_graph(self, scale):
+        rilm.concept_graph(self.results, weight_threshold=2)
+
+    def time_author_pairs(self, scale):
+        rilm._author_pairs(self.results, 0.7)
+
+
+class SoundMapFilter:
+    """The SoundMap apps' filter index over the BiCo survey."""
+
+    params = SCALES
+
+    def setup(self, scale):
+        filters = soundmap_filters()
+        self.build = filters.build_filter_index
+        self.df = scale_frame(pd.read_csv(SOUNDMAP / "bicomap.csv"), scale)
+        self.index = self.build(self.df)
+        self.purposes = self.index.purposes[::2]
+        self.ranges = {"volume": (2, 6), "rowdiness": (1, 4)}
+
+    def time_build_filter_index(self, scale):
+        self.build(self.df)
+
+    def time_filter(self, scale):
+        self.index.filter(self.purposes, self.ranges)
+
+
+class Tracing:
+    """The tracing hooks, off and on; ``tracing_overhead`` checks what they add to real work."""
+
+    params = (1,)
+
+    def setup(self, scale):
+        self.soups = list(duo_soups().values())
+        self.noop = tracing.traced("analyze", "noop")(lambda: None)
+
+    def time_hooks_disabled(self, scale):
+        for _ in range(10_000):
+            self.noop()
+            tracing.count("noop")
+
+    def time_extract_notes_traced(self, scale):
+        with tracing.tracing(memory=True):
+            for soup in self.soups:
+                mei.extract_notes_simplified(soup)
+
+
+class LabData:
+    """Loading the lab files every notebook starts from."""
+
+    params = (1,)
+
+    def time_load_spotify(self, scale):
+        load_spotify()
+
+    def time_load_billboard(self, scale):
+        load_billboard()
+
+    def time_read_beatles_pickles(self, scale):
+        for path in sorted(BEATLES.glob("*.pkl")):
+            pd.read_pickle(path)
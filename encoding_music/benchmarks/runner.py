@@ -0,0 +1,287 @@
+"""Run the benchmark suite, store the timings per commit, and compare commits.
+
+Benchmarks are the ``time_*`` methods of the classes in
+:mod:`encoding_music.benchmarks.lab` (asv style; see there).  Each one is
+named ``<class>.<method>[<scale>x]``, e.g. ``FeatureNetwork.feature_graph[10x]``.
+
+A run times every benchmark a few times, keeps the median, and writes
+the results to ``<results>/<machine>/<commit>.json``, where ``results`` is
+``.benchmarks`` at the top of the repository (or ``$ENCODING_MUSIC_BENCHMARKS``).
+A run on a tree with uncommitted changes is stored as ``<commit>+dirty.json``.
+``compare`` puts two runs side by side and exits 1 if anything became
+slower by more than ``--factor``; ``history`` lists one benchmark over the
+commits in ``git log``::
+
+    python -m encoding_music.benchmarks run                      # everything, 1x 10x 100x
+    python -m encoding_music.benchmarks run -k FeatureNetwork --scales 1 10
+    python -m encoding_music.benchmarks compare                  # this run against the last commit's
+    python -m encoding_music.benchmarks compare 3f2a9c1 HEAD --factor 1.5
+    python -m encoding_music.benchmarks history feature_graph
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+REPO = Path(__file__).resolve().parents[2]
+RESULTS_DIR = Path(os.environ.get("ENCODING_MUSIC_BENCHMARKS", REPO / ".benchmarks"))
+DIRTY = "+dirty"
+
+
+def _git(*args) -> str:
+    process = subprocess.run(["git", *args], cwd=REPO, capture_output=True, text=True)
+    return process.stdout.strip() if process.returncode == 0 else ""
+
+
+def current_commit() -> str:
+    """``HEAD``'s hash, with ``+dirty`` if tracked files have uncommitted changes ("unknown" outside git)."""
+    commit = _git("rev-parse", "HEAD")
+    if not commit:
+        return "unknown"
+    return commit + DIRTY if _git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def machine_info() -> dict:
+    return {"node": platform.node(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def measure(func: Callable, repeat: int = 5, min_sample: float = 0.01, max_time: float = 20.0) -> dict:
+    """Time ``func()``: the median of up to ``repeat`` samples, each at least ``min_sample`` seconds.
+
+    The first call is a warm-up and is not counted, unless it alone took
+    over half of ``max_time``; sampling stops once ``max_time`` is used.
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    if first > max_time / 2:
+        samples, number = [first], 1
+    else:
+        # Loop very fast benchmarks, so a sample is not just timer noise
+        number = max(1, int(min_sample / first)) if first > 0 else 1000
+        samples = []
+        budget = time.perf_counter() + max_time - first
+        while len(samples) < repeat and (not samples or time.perf_counter() < budget):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples),
+            "samples": len(samples), "number": number}
+
+
+def discover(module=None) -> list:
+    """The benchmark classes of ``module`` (default :mod:`encoding_music.benchmarks.lab`), in file order."""
+    if module is None:
+        from . import lab as module
+    classes = [obj for _, obj in inspect.getmembers(module, inspect.isclass)
+               if obj.__module__ == module.__name__ and any(name.startswith("time_") for name in dir(obj))]
+    return sorted(classes, key=lambda cls: inspect.getsourcelines(cls)[1])
+
+
+def run(pattern: Optional[str] = None, scales: Optional[Iterable[int]] = None, repeat: int = 5,
+        max_time: float = 20.0, module=None, progress: Optional[Callable] = print) -> dict:
+    """Benchmark name -> timing (or ``{"skipped": reason}``) for the benchmarks matching ``pattern``."""
+    results = {}
+    for cls in discover(module):
+        methods = [name for name, _ in inspect.getmembers(cls, inspect.isfunction) if name.startswith("time_")]
+        for scale in getattr(cls, "params", (1,)):
+            if scales is not None and scale not in scales:
+                continue
+            names = {method: f"{cls.__name__}.{method[len('time_'):]}[{scale}x]" for method in methods}
+            names = {method: name for method, name in names.items() if not pattern or re.search(pattern, name)}
+            if not names:
+                continue
+            bench = cls()
+            try:
+                if hasattr(bench, "setup"):
+                    bench.setup(scale)
+                for method, name in names.items():
+                    try:
+                        results[name] = measure(lambda: getattr(bench, method)(scale), repeat, max_time=max_time)
+                    except NotImplementedError:
+                        results[name] = {"skipped": "not run at this scale"}
+                    if progress:
+                        progress(format_result(name, results[name]))
+            finally:
+                if hasattr(bench, "teardown"):
+                    bench.teardown(scale)
+    return results
+
+
+def format_time(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, size in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= size:
+            return f"{seconds / size:.3g} {unit}"
+    return f"{seconds * 1e9:.3g} ns"
+
+
+def format_result(name: str, result: dict) -> str:
+    if "skipped" in result:
+        return f"{name:<55} skipped"
+    return f"{name:<55} {format_time(result['median']):>10}  ({result['samples']} x {result['number']})"
+
+
+def result_path(commit: str, machine: Optional[str] = None, results_dir=None) -> Path:
+    return Path(results_dir or RESULTS_DIR) / (machine or platform.node()) / f"{commit}.json"
+
+
+def save(results: dict, commit: Optional[str] = None, machine: Optional[str] = None, results_dir=None) -> Path:
+    """Store a run, merged into any earlier run of the same commit (new timings win)."""
+    commit = commit or current_commit()
+    path = result_path(commit, machine, results_dir)
+    record = load(path) if path.exists() else {"results": {}}
+    record.update(commit=commit, date=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                  machine=machine_info())
+    record["results"].update(results)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(record, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def stored_runs(machine: Optional[str] = None, results_dir=None) -> list:
+    """The stored runs of one machine, newest commit first (following ``git log``, a dirty run before its commit)."""
+    directory = Path(results_dir or RESULTS_DIR) / (machine or platform.node())
+    runs = {path.stem: path for path in directory.glob("*.json")}
+    order = []
+    for commit in _git("log", "--format=%H", "-n", "500").split():
+        order += [runs.pop(name) for name in (commit + DIRTY, commit) if name in runs]
+    # Runs of commits not in this branch's history, newest file first
+    return order + sorted(runs.values(), key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+def resolve(ref: str, machine: Optional[str] = None, results_dir=None) -> Path:
+    """The stored run for a commit-ish (``HEAD``, a branch, a short hash) or ``<hash>+dirty``."""
+    dirty = ref.endswith(DIRTY)
+    commit = _git("rev-parse", ref[:-len(DIRTY)] if dirty else ref) or ref
+    path = result_path(commit + (DIRTY if dirty else ""), machine, results_dir)
+    if not path.exists():
+        matches = [run for run in stored_runs(machine, results_dir) if run.stem.startswith(ref)]
+        if not matches:
+            raise FileNotFoundError(f"no stored benchmark run for {ref!r}")
+        path = matches[0]
+    return path
+
+
+def compare(base: dict, head: dict, factor: float = 1.2) -> list:
+    """Rows of (name, base median, head median, head / base, verdict) for the benchmarks of either run."""
+    rows = []
+    for name in sorted(set(base["results"]) | set(head["results"]), key=_name_key):
+        before = base["results"].get(name, {}).get("median")
+        after = head["results"].get(name, {}).get("median")
+        ratio = after / before if before and after else None
+        verdict = ""
+        if ratio is not None and ratio > factor:
+            verdict = "slower"
+        elif ratio is not None and ratio < 1 / factor:
+            verdict = "faster"
+        rows.append((name, before, after, ratio, verdict))
+    return rows
+
+
+def _name_key(name: str):
+    # Class.method[10x] sorts by class and method, then numerically by scale
+    match = re.match(r"(.*)\[(\d+)x\]$", name)
+    return (match.group(1), int(match.group(2))) if match else (name, 0)
+
+
+def history(pattern: str, machine: Optional[str] = None, results_dir=None, limit: int = 20) -> list:
+    """(commit, date, {name: median}) for the newest ``limit`` runs, benchmarks matching ``pattern``."""
+    rows = []
+    for path in stored_runs(machine, results_dir)[:limit]:
+        record = load(path)
+        medians = {name: result.get("median") for name, result in record["results"].items()
+                   if re.search(pattern, name)}
+        rows.append((record["commit"], record["date"], medians))
+    return rows
+
+
+def _short(commit: str) -> str:
+    return commit[:10] + (DIRTY if commit.endswith(DIRTY) else "")
+
+
+def main(argv: Optional[list] = None) -> int:
+    storage = argparse.ArgumentParser(add_help=False)
+    storage.add_argument("--machine", help="name the results are stored under (default: this host)")
+    storage.add_argument("--results", help=f"results folder (default: {RESULTS_DIR})")
+    parser = argparse.ArgumentParser(prog="python -m encoding_music.benchmarks",
+                                     description="Benchmark the guides' hot paths on the lab datasets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", parents=[storage], help="time the benchmarks and store the results")
+    run_parser.add_argument("-k", dest="pattern", help="only benchmarks whose name matches this regex")
+    run_parser.add_argument("--scales", type=int, nargs="*", help="scale factors to run (default: all)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark (the median is kept)")
+    run_parser.add_argument("--max-time", type=float, default=20.0, help="seconds per benchmark at most")
+    run_parser.add_argument("--no-save", action="store_true", help="print the timings without storing them")
+
+    compare_parser = commands.add_parser("compare", parents=[storage], help="compare two stored runs")
+    compare_parser.add_argument("base", nargs="?", help="commit of the earlier run (default: the previous run)")
+    compare_parser.add_argument("head", nargs="?", help="commit of the later run (default: the newest run)")
+    compare_parser.add_argument("--factor", type=float, default=1.2,
+                                help="report changes larger than this ratio (default 1.2)")
+
+    history_parser = commands.add_parser("history", parents=[storage], help="timings of some benchmarks across commits")
+    history_parser.add_argument("pattern", help="regex matching benchmark names")
+    history_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.pattern, args.scales, args.repeat, args.max_time)
+        if not args.no_save:
+            print(f"saved to {save(results, machine=args.machine, results_dir=args.results)}")
+        return 0
+
+    if args.command == "compare":
+        runs = stored_runs(args.machine, args.results)
+        head = resolve(args.head, args.machine, args.results) if args.head else (runs[0] if runs else None)
+        if args.base:
+            base = resolve(args.base, args.machine, args.results)
+        else:
+            base = next((run for run in runs if head is not None and run != head), None)
+        if head is None or base is None:
+            print("need two stored runs to compare; run `python -m encoding_music.benchmarks run` first")
+            return 2
+        base_record, head_record = load(base), load(head)
+        print(f"{'benchmark':<55} {_short(base_record['commit']):>16} {_short(head_record['commit']):>16}  ratio")
+        rows = compare(base_record, head_record, args.factor)
+        for name, before, after, ratio, verdict in rows:
+            ratio_text = f"{ratio:5.2f}" if ratio is not None else "    -"
+            print(f"{name:<55} {format_time(before):>16} {format_time(after):>16}  {ratio_text}  {verdict}")
+        slower = [row[0] for row in rows if row[4] == "slower"]
+        if slower:
+            print(f"{len(slower)} benchmark(s) slower by more than {args.factor}x")
+            return 1
+        return 0
+
+    rows = history(args.pattern, args.machine, args.results, args.limit)
+    names = sorted({name for _, _, medians in rows for name in medians}, key=_name_key)
+    for name in names:
+        print(name)
+        for commit, date, medians in rows:
+            if name in medians:
+                print(f"    {_short(commit):<17} {date}  {format_time(medians[name]):>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
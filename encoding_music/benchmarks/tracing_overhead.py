@@ -0,0 +1,123 @@
+"""What the tracing hooks cost while tracing is off, and while it is on.
+
+Every fetch, parse, analyze and render function carries a ``traced`` span
+and most of them a ``count``, so they have to be nearly free when nobody is
+tracing.  This times each hook on its own (nanoseconds per call, next to a
+plain function call), then runs real workloads from the lab benchmarks once
+with tracing on to count the hooks they pass through.  The disabled overhead
+of a workload is those hooks times their disabled cost, as a share of the
+workload's time; the run fails (exit status 1) if any share is over
+``--limit`` (1% by default).  The enabled overhead is estimated the same
+way, for comparison::
+
+    python -m encoding_music.benchmarks.tracing_overhead
+    python -m encoding_music.benchmarks.tracing_overhead --limit 0.1
+
+Timing the workload with and without hooks directly would not do: the
+difference is far below the run-to-run noise, even with tracing on.
+"""
+
+import argparse
+import sys
+import timeit
+from typing import Optional
+
+from .. import tracing
+from .runner import format_time, measure
+
+
+def _noop():
+    pass
+
+
+_traced_noop = tracing.traced("analyze", "noop")(_noop)
+
+
+def _span():
+    with tracing.span("noop", "analyze"):
+        pass
+
+
+def _count():
+    tracing.count("noop")
+
+
+HOOKS = {"call": _noop, "traced": _traced_noop, "span": _span, "count": _count}
+
+
+def per_call(func, number: int = 200_000, repeat: int = 5) -> float:
+    """Best of ``repeat`` loops of ``func()``, in seconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def hook_costs(number: int = 200_000) -> dict:
+    """Seconds per call of each hook, with tracing off and on."""
+    costs = {"off": {name: per_call(func, number) for name, func in HOOKS.items()}}
+    with tracing.tracing():
+        # A smaller loop: every span and count is kept
+        costs["on"] = {name: per_call(func, number // 10) for name, func in HOOKS.items()}
+    return costs
+
+
+def workloads() -> dict:
+    """Real hot paths, from the lab benchmarks' fixtures."""
+    from .. import mei, networks
+    from ..scores.mei import read_score
+    from .lab import duo_paths, duo_soups, spotify
+
+    soups = list(duo_soups().values())
+    paths = duo_paths()
+    df = spotify()
+    return {
+        "extract_notes_simplified (46 duos)": lambda: [mei.extract_notes_simplified(soup) for soup in soups],
+        "read_score (46 duos)": lambda: [read_score(path) for path in paths],
+        "ficta_table (46 duos)": lambda: mei.ficta_table(duo_soups()),
+        "feature_graph (1,956 tracks)": lambda: networks.feature_graph(df, "track_name", "danceability", 0.001,
+                                                                       communities=False),
+    }
+
+
+def run(limit: float = 0.01, number: int = 200_000) -> dict:
+    costs = hook_costs(number)
+    # What a hook adds to the call it wraps, or costs where there was no call at all
+    added = {state: {"traced": costs[state]["traced"] - costs[state]["call"], "count": costs[state]["count"]}
+             for state in costs}
+    results = []
+    for name, func in workloads().items():
+        func()
+        with tracing.tracing() as tracer:
+            func()
+        spans, counts = len(tracer.spans), len(tracer.counter_events)
+        seconds = measure(func)["median"]
+        overhead = {state: (spans * cost["traced"] + counts * cost["count"]) / seconds
+                    for state, cost in added.items()}
+        results.append({"workload": name, "spans": spans, "counts": counts, "seconds": seconds,
+                        "disabled": overhead["off"], "enabled": overhead["on"], "ok": overhead["off"] <= limit})
+    return {"hooks": costs, "workloads": results}
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that the tracing hooks cost next to nothing while off.")
+    parser.add_argument("--limit", type=float, default=1.0, help="largest disabled overhead allowed, in percent")
+    parser.add_argument("--number", type=int, default=200_000, help="calls per timing loop of each hook")
+    args = parser.parse_args(argv)
+
+    results = run(args.limit / 100, args.number)
+    print(f"{'hook':<10} {'off':>10} {'on':>10}")
+    for name in HOOKS:
+        print(f"{name:<10} {format_time(results['hooks']['off'][name]):>10} "
+              f"{format_time(results['hooks']['on'][name]):>10}")
+    print()
+    print(f"{'workload':<40} {'time':>10} {'spans':>6} {'counts':>6} {'off':>9} {'on':>9}")
+    for r in results["workloads"]:
+        print(f"{r['workload']:<40} {format_time(r['seconds']):>10} {r['spans']:>6} {r['counts']:>6} "
+              f"{r['disabled']:>9.5%} {r['enabled']:>9.3%}" + ("" if r["ok"] else "  OVER LIMIT"))
+    failed = [r["workload"] for r in results["workloads"] if not r["ok"]]
+    if failed:
+        print(f"{len(failed)} workload(s) pay over {args.limit}% for tracing while it is off: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""Chart helpers for the graphs-and-charts and Spotify guides."""
+
+from .._lazy import lazy_attributes
+
+_EXPORTS = {
+    "RadarRenderer": ".radar",
+    "audio_feature_radar": ".radar",
+    "feature_matrix": ".radar",
+    "radar_specs": ".radar",
+    "radar_template": ".radar",
+    "to_html": ".radar",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_attributes(__name__, attributes=_EXPORTS)
@@ -0,0 +1,252 @@
+"""Audio-feature radar charts, built and rendered in batches.
+
+The charts and Spotify guides define ``audio_feature_radar``, which melts a
+frame of audio features to long form and calls ``px.line_polar`` for one
+chart at a time.  Making a radar for every track or album of a catalogue
+that way means hundreds of melts, hundreds of Plotly Express figures, and
+saving each one by hand.
+
+Here the features are read once into a matrix, and each chart is a plain
+figure dict (a "spec") holding its rows of that matrix and a reference to
+one shared template with the colours, axes and fonts.  Specs are cheap to
+build, need no validation, and serialize to a few hundred bytes each.
+
+``RadarRenderer`` turns specs into PNG or SVG files with a pool of worker
+processes, each keeping its own Kaleido renderer running.  Every image is
+stored under a hash of its spec and image settings, so charts whose data
+did not change are never drawn again.  ``to_html`` writes all the charts
+into one HTML page that loads plotly.js and the template once::
+
+    from encoding_music.charts import RadarRenderer, radar_specs, to_html
+
+    features = ["danceability", "energy", "speechiness", "liveness", "instrumentalness", "valence"]
+    per_track = radar_specs(spotify, features, label="track_name")
+    per_album = radar_specs(spotify, features, label="track_name", by="Album_Name")
+
+    paths = RadarRenderer(workers=4).render(per_track)   # name -> PNG file
+    to_html(per_album, "albums.html")
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..tracing import traced
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("ENCODING_MUSIC_CACHE", Path.home() / ".cache" / "encoding_music")) \
+    / "radar"
+# The Spotify guide's feature list
+DEFAULT_FEATURES = ["danceability", "energy", "speechiness", "liveness", "instrumentalness", "valence"]
+
+
+def radar_template(features: Iterable[str], radial_range=(0, 1)) -> dict:
+    """The Plotly template shared by every radar: colours, axes, font and margins."""
+    from plotly.colors import qualitative
+
+    return {"layout": {
+        "colorway": list(qualitative.Plotly),
+        "font": {"family": "Arial, sans-serif", "size": 12},
+        "paper_bgcolor": "white",
+        "polar": {"bgcolor": "#E5ECF6",
+                  "radialaxis": {"range": list(radial_range), "gridcolor": "white", "linecolor": "white"},
+                  "angularaxis": {"categoryorder": "array", "categoryarray": list(features),
+                                  "gridcolor": "white", "linecolor": "white"}},
+        "margin": {"l": 100, "r": 100, "t": 70, "b": 50},
+        "legend": {"title": {"text": "Track Title"}},
+    }}
+
+
+def feature_matrix(df: pd.DataFrame, features: Iterable[str]) -> np.ndarray:
+    """Rows x features as floats, with the first feature repeated at the end to close each loop.
+
+    A feature list that already ends with its first feature (as in the
+    guides) is not closed twice.
+    """
+    features = list(dict.fromkeys(features))
+    values = df[features].to_numpy(dtype=np.float64)
+    return np.round(np.concatenate([values, values[:, :1]], axis=1), 6)
+
+
+def radar_specs(df: pd.DataFrame, features: Iterable[str] = DEFAULT_FEATURES, label: str = "track_title",
+                by: Optional[str] = None, title: str = "{}", template: Optional[dict] = None) -> dict:
+    """Figure specs for many radars: chart name -> Plotly figure dict.
+
+    With ``by=None`` every row gets its own chart, named by its ``label``.
+    Otherwise there is one chart per value of ``by`` (an album, an
+    artist), with one trace per row, as in the guides' ``audio_feature_radar``.
+    ``title`` is formatted with the chart name.
+    """
+    features = list(dict.fromkeys(features))
+    theta = features + features[:1]
+    values = feature_matrix(df, features).tolist()
+    labels = df[label].astype(str).tolist()
+    template = template or radar_template(features)
+
+    if by is None:
+        groups = {}
+        for row, name in enumerate(labels):
+            # Keep repeated titles apart: "Help!", "Help! (2)"
+            unique, n = name, 1
+            while unique in groups:
+                n += 1
+                unique = f"{name} ({n})"
+            groups[unique] = [row]
+    else:
+        codes, names = pd.factorize(df[by], sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        groups = {str(name): order[bounds[i]:bounds[i + 1]].tolist() for i, name in enumerate(names)}
+
+    return {name: {
+        "data": [{"type": "scatterpolar", "mode": "lines", "r": values[row], "theta": theta, "name": labels[row]}
+                 for row in rows],
+        "layout": {"title": {"text": title.format(name)}, "template": template},
+    } for name, rows in groups.items()}
+
+
+def audio_feature_radar(audio_feature_data: pd.DataFrame, feature_list: Iterable[str], chart_title: str,
+                        label: str = "track_title"):
+    """One radar with a trace per row: the guides' function, without the melt."""
+    import plotly.graph_objects as go
+
+    spec = radar_specs(audio_feature_data.assign(_chart=chart_title), feature_list, label=label, by="_chart",
+                       title="{}")[chart_title]
+    return go.Figure(spec)
+
+
+def spec_key(spec: dict, **options) -> str:
+    """Hash of a spec's data, layout and template, plus any rendering options."""
+    text = json.dumps([spec, options], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _render_jobs(jobs: list, image_format: str, width: int, height: int, scale: float) -> int:
+    # Runs in a worker process; Kaleido starts once per process and is reused
+    import plotly.io as pio
+
+    for spec, path in jobs:
+        image = pio.to_image(spec, format=image_format, width=width, height=height, scale=scale, validate=False)
+        tmp_path = Path(path).with_suffix(".tmp")
+        tmp_path.write_bytes(image)
+        os.replace(tmp_path, path)
+    return len(jobs)
+
+
+class RadarRenderer:
+    """Static images of figure specs, drawn by a pool of processes and cached by spec hash.
+
+    Args:
+        cache_dir: folder of the cached images
+        workers: rendering processes (``1`` renders in this process)
+        format: ``"png"``, ``"svg"``, ``"jpeg"``, ``"webp"`` or ``"pdf"``
+        width, height, scale: image size, as in ``fig.write_image``
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, workers: Optional[int] = None, format: str = "png",
+                 width: int = 500, height: int = 500, scale: float = 1.0):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.format = format
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.stats = {"cached": 0, "rendered": 0}
+
+    def path(self, spec: dict) -> Path:
+        key = spec_key(spec, format=self.format, width=self.width, height=self.height, scale=self.scale)
+        return self.cache_dir / f"{key[:32]}.{self.format}"
+
+    @traced("render", "RadarRenderer.render")
+    def render(self, specs: dict) -> dict:
+        """Chart name -> image file, drawing only the charts not already in the cache."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        paths = {name: self.path(spec) for name, spec in specs.items()}
+        # Charts with the same spec share one file
+        jobs = {path: specs[name] for name, path in paths.items() if not path.exists()}
+        jobs = [(spec, str(path)) for path, spec in jobs.items()]
+        self.stats = {"cached": len(specs) - len(jobs), "rendered": len(jobs)}
+
+        options = (self.format, self.width, self.height, self.scale)
+        if self.workers == 1 or len(jobs) < 2:
+            _render_jobs(jobs, *options)
+        elif jobs:
+            # A few chunks per worker, so a slow chunk does not hold up the rest
+            chunks = [jobs[i::self.workers * 4] for i in range(min(len(jobs), self.workers * 4))]
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for future in [pool.submit(_render_jobs, chunk, *options) for chunk in chunks]:
+                    future.result()
+        return paths
+
+    def export(self, specs: dict, directory) -> dict:
+        """Render, then copy each image to ``directory`` under its chart name."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        exported = {}
+        stems = set()
+        for name, path in self.render(specs).items():
+            base = re.sub(r"[^\w.-]+", "_", name).strip("_") or "chart"
+            # "Help!" and "Help?" both become "Help"; compare without case, as on macOS and Windows
+            stem, n = base, 1
+            while stem.lower() in stems:
+                n += 1
+                stem = f"{base}_{n}"
+            stems.add(stem.lower())
+            target = directory / f"{stem}.{self.format}"
+            shutil.copyfile(path, target)
+            exported[name] = target
+        return exported
+
+
+def _json(value) -> str:
+    # "</script>" inside a track title must not end the script
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
+@traced("render", "radar.to_html")
+def to_html(specs: dict, path, include_plotlyjs="cdn", width: int = 500, height: int = 500) -> Path:
+    """Write every chart into one HTML page; plotly.js and each distinct template appear once.
+
+    ``include_plotlyjs`` is ``"cdn"`` (load plotly.js from the web), ``True``
+    (embed it, for a page that works offline) or ``False`` (leave it out,
+    for a page that loads plotly.js itself), as in ``fig.write_html``.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if include_plotlyjs not in ("cdn", True, False):
+        raise ValueError(f'include_plotlyjs must be "cdn", True or False, not {include_plotlyjs!r}')
+
+    templates = {}
+    charts = []
+    for i, spec in enumerate(specs.values()):
+        layout = dict(spec["layout"])
+        template = _json(layout.pop("template", {}))
+        number = templates.setdefault(template, len(templates))
+        charts.append((f"radar-{i}", number, _json(spec["data"]), _json(layout)))
+
+    if include_plotlyjs == "cdn":
+        script = f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    elif include_plotlyjs is True:
+        script = f"<script>{get_plotlyjs()}</script>"
+    else:
+        script = ""
+    lines = ["<!DOCTYPE html>", '<html><head><meta charset="utf-8">', script, "</head><body>", "<script>",
+             "const templates = [" + ",".join(templates) + "];", "</script>"]
+    for div, number, data, layout in charts:
+        lines.append(f'<div id="{div}" style="display:inline-block;width:{width}px;height:{height}px"></div>')
+        lines.append(f'<script>Plotly.newPlot("{div}", {data}, '
+                     f'Object.assign({{template: templates[{number}]}}, {layout}));</script>')
+    lines.append("</body></html>")
+
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text("\n".join(lines), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,47 @@
+"""Typed loaders and storage for the lab datasets used in the tutorials."""
+
+from .._lazy import lazy_attributes
+
+_EXPORTS = {
+    "BillboardCrawler": ".billboard_crawler",
+    "artist_urls": ".billboard_crawler",
+    "crawl_chart_histories": ".billboard_crawler",
+    "parse_chart_history": ".billboard_crawler",
+    "load_beatles_billboard": ".billboard_spotify",
+    "load_beatles_spotify": ".billboard_spotify",
+    "load_billboard": ".billboard_spotify",
+    "load_spotify": ".billboard_spotify",
+    "memory_report": ".billboard_spotify",
+    "read_dataset": ".billboard_spotify",
+    "write_dataset": ".billboard_spotify",
+    "CantoCodes": ".cantometrics",
+    "decode_canto": ".cantometrics",
+    "unpack_canto": ".cantometrics",
+    "CantoCube": ".cube",
+    "DropNA": ".cleaning",
+    "FillNA": ".cleaning",
+    "JoinColumns": ".cleaning",
+    "JoinLists": ".cleaning",
+    "Pipeline": ".cleaning",
+    "Replace": ".cleaning",
+    "SplitColumns": ".cleaning",
+    "SplitExplode": ".cleaning",
+    "ToDatetime": ".cleaning",
+    "Gazetteer": ".geocoding",
+    "Geocoder": ".geocoding",
+    "Nominatim": ".geocoding",
+    "GlobalJukebox": ".global_jukebox",
+    "load_global_jukebox": ".global_jukebox",
+    "LabelIndex": ".multilabel",
+    "SongLabels": ".multilabel",
+    "Schema": ".schemas",
+    "apply_schema": ".schemas",
+    "memory_usage": ".schemas",
+    "read_csv": ".schemas",
+    "DatasetStore": ".store",
+    "default_store": ".store",
+    "load_stage": ".store",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_attributes(__name__, attributes=_EXPORTS)
@@ -0,0 +1,440 @@
+"""Polite, cached crawling of Billboard chart-history pages.
+
+The scraping guide downloads one artist's ``chart-history`` page with
+``requests.get``, parses all of it with Beautiful Soup's pure-Python
+``html.parser``, and then walks each ``o-chart-results-list-row`` with
+repeated ``find_next`` calls.  Doing that for hundreds of artists is slow,
+downloads every page again on every run, and sends Billboard a burst of
+requests.
+
+``BillboardCrawler`` fetches many pages at once while staying polite:
+
+* at most ``per_host`` requests to one host at a time, started at least
+  ``delay`` seconds apart, with retries that honour ``Retry-After``
+* every page is kept in an HTTP cache on disk; a page younger than
+  ``max_age`` is not requested again, and an older one is revalidated with
+  ``If-None-Match`` / ``If-Modified-Since``, so unchanged pages cost a
+  ``304`` and no download
+* the list of pages to crawl is saved as it goes, and finished pages are
+  in the cache, so an interrupted crawl picks up where it stopped
+
+Rows are extracted with lxml and XPath, with the same rules as the guide's
+Beautiful Soup code, and come back as one frame typed like the files in
+``02_Lab_Data/Billboard and Spotify Data``::
+
+    from encoding_music.datasets.billboard_crawler import BillboardCrawler, artist_urls
+
+    crawler = BillboardCrawler(workers=4, per_host=2, delay=1.0)
+    billboard = crawler.crawl(artist_urls(["Miles_Davis", "Nina_Simone"]), state="crawl.json")
+    crawler.queue.failed        # pages that could not be fetched, and why
+
+From the command line, one ``<Artist>_Billboard.csv`` per artist::
+
+    python -m encoding_music.datasets.billboard_crawler out_folder --artists Miles_Davis Nina_Simone
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Union
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from .billboard_spotify import ARTISTS, BILLBOARD_SCHEMA, PARTITION_COLUMN, artist_name
+from ..tracing import count, traced
+from .schemas import apply_schema
+
+BILLBOARD_URL = "https://www.billboard.com"
+ROW_CLASS = "o-chart-results-list-row"
+ITEM_CLASS = "o-chart-results-list__item"
+COLUMNS = ["title", "author", "release_date", "peak_weeks", "peak_date", "total_weeks"]
+DEFAULT_CACHE_DIR = Path(os.environ.get("ENCODING_MUSIC_CACHE", Path.home() / ".cache" / "encoding_music")) \
+    / "billboard_http"
+# Pages younger than this (in seconds) are used without asking the server
+DEFAULT_MAX_AGE = 24 * 60 * 60
+USER_AGENT = "encoding_music chart-history crawler (https://github.com/RichardFreedman/Encoding_Music)"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+XPATHS = {
+    "rows": f"//*[{_has_class(ROW_CLASS)}]",
+    "items": f".//*[{_has_class(ITEM_CLASS)}]",
+    "all_items": f"//*[{_has_class(ITEM_CLASS)}]",
+    "heading": "(.//h3)[1]",
+    # Beautiful Soup's h3.find_next('span'): the first span inside or after the h3
+    "author": "(descendant::span | following::span)[1]",
+    "text": ".//text()[not(ancestor::script or ancestor::style)]",
+}
+
+
+@lru_cache(maxsize=None)
+def _xpath(name: str):
+    from lxml import etree
+
+    return etree.XPath(XPATHS[name])
+
+
+def artist_url(artist: str, chart: str = "tlp") -> str:
+    """Chart-history URL of an artist ("Miles_Davis" or "Miles Davis"); ``tlp`` is the Billboard 200."""
+    slug = artist_name(artist).lower().replace(" ", "-")
+    return f"{BILLBOARD_URL}/artist/{slug}/chart-history/{chart}/"
+
+
+def artist_urls(artists: Optional[Iterable[str]] = None, chart: str = "tlp") -> dict:
+    """Artist display name -> chart-history URL, for the lab artists by default."""
+    return {artist_name(artist): artist_url(artist, chart) for artist in artists or ARTISTS}
+
+
+def _text(element) -> str:
+    """Like Beautiful Soup's ``get_text(strip=True)``: the stripped text pieces, joined."""
+    return "".join(piece.strip() for piece in _xpath("text")(element))
+
+
+@traced("parse")
+def parse_chart_history(html: Union[str, bytes]) -> pd.DataFrame:
+    """The rows of one chart-history page, as strings, in the guide's columns.
+
+    As in the guide, the title is the row's first ``h3``, the author the
+    first ``span`` after it, and the four values the items that follow the
+    row's first four ``o-chart-results-list__item`` elements.
+    """
+    import lxml.html
+
+    document = lxml.html.fromstring(html)
+    # find_next(class_=item) is the next item in document order, wherever it is
+    all_items = _xpath("all_items")(document)
+    following = {item: after for item, after in zip(all_items, all_items[1:])}
+    rows = []
+    for row in _xpath("rows")(document):
+        headings = _xpath("heading")(row)
+        items = _xpath("items")(row)
+        if not headings or len(items) < 4:
+            continue
+        author = _xpath("author")(headings[0])
+        values = [following.get(item) for item in items[:4]]
+        rows.append([_text(headings[0]), _text(author[0]) if author else None]
+                    + [_text(value) if value is not None else None for value in values])
+    return pd.DataFrame(rows, columns=COLUMNS, dtype="string")
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class HTTPCache:
+    """Page bodies on disk, with the validators needed for conditional requests.
+
+    Each URL has a ``<sha1>.html`` body and a ``<sha1>.json`` record of its
+    URL, ``ETag``, ``Last-Modified`` and when it was last confirmed.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_age: float = DEFAULT_MAX_AGE):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = _cache_key(url)
+        return self.directory / f"{key}.html", self.directory / f"{key}.json"
+
+    def record(self, url: str) -> Optional[dict]:
+        body_path, record_path = self._paths(url)
+        if not (body_path.exists() and record_path.exists()):
+            return None
+        with open(record_path) as f:
+            return json.load(f)
+
+    def body(self, url: str) -> Optional[bytes]:
+        body_path, _ = self._paths(url)
+        return body_path.read_bytes() if body_path.exists() else None
+
+    def is_fresh(self, record: dict) -> bool:
+        return time.time() - record["checked"] < self.max_age
+
+    def validators(self, record: Optional[dict]) -> dict:
+        """Headers that ask the server to answer ``304`` if the page has not changed."""
+        headers = {}
+        if record and record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record and record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def _write_record(self, url: str, record: dict):
+        _, record_path = self._paths(url)
+        tmp_path = record_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(record, f, indent=1)
+        os.replace(tmp_path, record_path)
+
+    def store(self, url: str, body: bytes, headers) -> dict:
+        body_path, _ = self._paths(url)
+        tmp_path = body_path.with_suffix(".part")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, body_path)
+        record = {"url": url, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                  "fetched": time.time(), "checked": time.time()}
+        self._write_record(url, record)
+        return record
+
+    def confirm(self, url: str, record: dict) -> dict:
+        """The server said ``304``: the stored page is current as of now."""
+        record = {**record, "checked": time.time()}
+        self._write_record(url, record)
+        return record
+
+    def clear(self):
+        for path in list(self.directory.glob("*.html")) + list(self.directory.glob("*.json")):
+            path.unlink()
+
+
+class HostLimiter:
+    """At most ``per_host`` requests in flight to each host, started at least ``delay`` seconds apart."""
+
+    def __init__(self, per_host: int = 2, delay: float = 1.0):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def pause(self, host: str, seconds: float):
+        """Start nothing more on ``host`` for ``seconds`` (after a ``429`` or ``503``)."""
+        with self._lock:
+            self._next_start[host] = max(self._next_start.get(host, 0.0), time.monotonic() + seconds)
+
+    @contextmanager
+    def __call__(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            slots = self._slots.setdefault(host, threading.Semaphore(self.per_host))
+        with slots:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.delay
+            time.sleep(start - now)
+            yield
+
+
+class CrawlQueue:
+    """Named URLs to crawl, with what is done and what failed saved to a JSON file.
+
+    Without a ``path`` the state is kept in memory only.
+    """
+
+    def __init__(self, urls: dict, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        state = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path) as f:
+                state = json.load(f)
+        self.urls = {**state.get("urls", {}), **urls}
+        # A page that changed URL is crawled again
+        self.done = {name: rows for name, rows in state.get("done", {}).items()
+                     if state["urls"].get(name) == self.urls.get(name)}
+        self.failed = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"urls": self.urls, "done": self.done, "failed": self.failed}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def mark_done(self, name: str, rows: int):
+        with self._lock:
+            self.done[name] = rows
+            self.failed.pop(name, None)
+            self._save()
+
+    def mark_failed(self, name: str, error: str):
+        with self._lock:
+            self.failed[name] = error
+            self._save()
+
+
+def _retry_after(response, attempt: int) -> float:
+    value = response.headers.get("Retry-After") if response is not None else None
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return 2.0 ** attempt
+
+
+class BillboardCrawler:
+    """Fetches chart-history pages concurrently and politely, through an HTTP cache.
+
+    Args:
+        cache_dir: folder of the HTTP cache
+        workers: pages fetched at the same time, over all hosts
+        per_host: requests in flight to any one host
+        delay: seconds between the starts of two requests to one host
+        max_age: seconds a cached page is used without revalidating it
+        retries: further attempts after a timeout, ``429`` or ``5xx``
+        timeout: seconds to wait for a response
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, workers: int = 4, per_host: int = 2, delay: float = 1.0,
+                 max_age: float = DEFAULT_MAX_AGE, retries: int = 3, timeout: float = 30):
+        self.cache = HTTPCache(cache_dir, max_age=max_age)
+        self.limiter = HostLimiter(per_host=per_host, delay=delay)
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.queue = None
+        self.stats = {"cached": 0, "not_modified": 0, "downloaded": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        # One session (and connection pool) per worker thread
+        if not hasattr(self._local, "session"):
+            import requests
+
+            self._local.session = requests.Session()
+            self._local.session.headers["User-Agent"] = USER_AGENT
+        return self._local.session
+
+    def _count(self, outcome: str):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    @traced("fetch", "billboard.fetch")
+    def fetch(self, url: str) -> bytes:
+        """The page at ``url``, from the cache when it is fresh or the server says it is unchanged."""
+        import requests
+
+        record = self.cache.record(url)
+        if record is not None and self.cache.is_fresh(record):
+            self._count("cached")
+            return self.cache.body(url)
+
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                with self.limiter(url):
+                    response = self._session().get(url, headers=self.cache.validators(record),
+                                                   timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            if response is not None and response.status_code not in RETRY_STATUS:
+                break
+            if attempt == self.retries:
+                response.raise_for_status()
+            self.limiter.pause(host, _retry_after(response, attempt))
+
+        if response.status_code == 304 and record is not None:
+            self.cache.confirm(url, record)
+            self._count("not_modified")
+            return self.cache.body(url)
+        response.raise_for_status()
+        self.cache.store(url, response.content, response.headers)
+        self._count("downloaded")
+        count("bytes_fetched", len(response.content))
+        return response.content
+
+    def _page(self, name: str, url: str) -> pd.DataFrame:
+        df = parse_chart_history(self.fetch(url))
+        df.insert(0, PARTITION_COLUMN, name)
+        return df
+
+    def crawl(self, urls: dict, state=None) -> pd.DataFrame:
+        """Crawl ``urls`` (name -> URL) and return all rows in one typed frame.
+
+        ``state`` is a JSON file recording progress.  Every page goes
+        through :meth:`fetch`, so after an interruption the pages finished
+        within ``max_age`` come from the cache and only the unfinished ones
+        are downloaded, while older pages are revalidated and a newer chart
+        is picked up.  Pages that fail are left out and listed in
+        ``self.queue.failed``.
+        """
+        self.queue = CrawlQueue(urls, state)
+        frames = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._page, name, url): name
+                       for name, url in urls.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    frames[name] = future.result()
+                except Exception as error:
+                    self.queue.mark_failed(name, f"{type(error).__name__}: {error}")
+                    continue
+                self.queue.mark_done(name, len(frames[name]))
+
+        ordered = [frames[name] for name in urls if name in frames]
+        df = pd.concat(ordered, ignore_index=True) if ordered else \
+            pd.DataFrame(columns=[PARTITION_COLUMN] + COLUMNS, dtype="string")
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype("category")
+        return apply_schema(df, BILLBOARD_SCHEMA)
+
+
+def crawl_chart_histories(artists: Optional[Iterable[str]] = None, chart: str = "tlp", state=None,
+                          **kwargs) -> pd.DataFrame:
+    """Crawl the chart histories of the lab artists (or ``artists``); keywords go to ``BillboardCrawler``."""
+    return BillboardCrawler(**kwargs).crawl(artist_urls(artists, chart), state=state)
+
+
+def to_lab_csv(df: pd.DataFrame, path):
+    """Write one artist's rows in the layout of the ``*_Billboard.csv`` lab files."""
+    dates = {column: "%m.%d.%y" for column in BILLBOARD_SCHEMA.dates}
+    out = df.drop(columns=[PARTITION_COLUMN], errors="ignore").reset_index(drop=True)
+    for column, date_format in dates.items():
+        out[column] = out[column].dt.strftime(date_format)
+    out.to_csv(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl Billboard chart histories into *_Billboard.csv files.")
+    parser.add_argument("output", help="folder for the CSV files")
+    parser.add_argument("--artists", nargs="*", help="artists as in the lab file names (default: the lab artists)")
+    parser.add_argument("--chart", default="tlp", help="chart code in the URL (tlp is the Billboard 200)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE)
+    args = parser.parse_args(argv)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    crawler = BillboardCrawler(args.cache_dir, workers=args.workers, per_host=args.per_host,
+                               delay=args.delay, max_age=args.max_age)
+    artists = args.artists or ARTISTS
+    df = crawler.crawl(artist_urls(artists, args.chart), state=output / "crawl_state.json")
+    for artist in artists:
+        rows = df[df[PARTITION_COLUMN] == artist_name(artist)]
+        if artist_name(artist) in crawler.queue.done:
+            to_lab_csv(rows, output / f"{artist.replace(' ', '_')}_Billboard.csv")
+    print(f"{len(crawler.queue.done)} pages, {len(df)} rows; " +
+          ", ".join(f"{count} {outcome}" for outcome, count in crawler.stats.items()))
+    for name, error in crawler.queue.failed.items():
+        print(f"failed: {name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Typed loading of the Billboard and Spotify lab data.
+
+``02_Lab_Data/Billboard and Spotify Data`` holds one Billboard and one
+Spotify CSV per artist, and ``02_Lab_Data/Beatles`` two more Beatles tables.
+The loaders here read them with declared schemas (categories for artists,
+albums and keys, float32 audio features, small integers for durations and
+counts), combine the per-artist files into one frame with a
+``dataset_artist`` column, and can save that frame as a Parquet dataset
+partitioned by artist, which later loads in milliseconds::
+
+    from encoding_music.datasets import load_spotify, write_dataset, read_dataset
+
+    spotify = load_spotify()                     # every artist, typed
+    write_dataset(spotify, "spotify_parquet")   # one folder per artist
+    dylan = read_dataset("spotify_parquet", artists=["Bob Dylan"],
+                         columns=["track_name", "energy", "valence"])
+
+When the repository's ``02_Lab_Data`` folder is not next to the package (for
+example in Colab), files are read from GitHub instead, as in the tutorials.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from .schemas import AUDIO_FEATURES, Schema, apply_schema, memory_usage, read_csv
+
+LAB_DATA = Path(__file__).resolve().parents[2] / "02_Lab_Data"
+REMOTE_LAB_DATA = "https://raw.githubusercontent.com/RichardFreedman/Encoding_Music/main/02_Lab_Data"
+BILLBOARD_SPOTIFY_FOLDER = "Billboard and Spotify Data"
+ARTISTS = ["Beatles", "Bob_Dylan", "Led_Zeppelin", "Miles_Davis", "Nina_Simone", "Rolling_Stones", "Tina_Turner"]
+PARTITION_COLUMN = "dataset_artist"
+
+SPOTIFY_SCHEMA = Schema(
+    dtypes={
+        "artist": "category",
+        "Album_Name": "category",
+        "track_name": "string",
+        "track_id": "string",
+        **{feature: "float32" for feature in AUDIO_FEATURES},
+        "key": pd.CategoricalDtype(range(12)),
+        "mode": "int8",
+        "duration_ms": "int32",
+        "time_signature": "int8",
+    },
+    # Some files call the album column "album"
+    renames={"album": "Album_Name"},
+    replace={"mode": {"Major": 1, "Minor": 0}},
+    drop=["Unnamed: 0"],
+)
+
+BILLBOARD_SCHEMA = Schema(
+    dtypes={
+        "title": "string",
+        "author": "category",
+        "peak_weeks": "string",
+        "total_weeks": "int16",
+    },
+    dates={"release_date": "%m.%d.%y", "peak_date": "%m.%d.%y"},
+    drop=["Unnamed: 0"],
+)
+
+BEATLES_BILLBOARD_SCHEMA = Schema(
+    dtypes={
+        "Title": "string",
+        "Year": "int16",
+        "Album.debut": "category",
+        "Duration": "int16",
+        "Other.releases": "int16",
+        "Genre": "string",
+        "Songwriter": "category",
+        "Lead.vocal": "category",
+        "Top.50.Billboard": "int16",
+    },
+)
+
+BEATLES_SPOTIFY_SCHEMA = Schema(
+    dtypes={
+        "year": "int16",
+        "album": "category",
+        "song": "string",
+        "spotify url": "string",
+        **{feature: "float32" for feature in AUDIO_FEATURES},
+        "key": pd.CategoricalDtype(range(12)),
+        "mode": "int8",
+        "duration_ms": "int32",
+        "time_signature": "int8",
+    },
+)
+
+
+def lab_data_path(*parts) -> str:
+    """Local path under ``02_Lab_Data`` if the folder exists, else the GitHub raw URL."""
+    if LAB_DATA.exists():
+        return str(LAB_DATA.joinpath(*parts))
+    return "/".join([REMOTE_LAB_DATA] + [part.replace(" ", "%20") for part in parts])
+
+
+def artist_name(artist: str) -> str:
+    """File-name artist ("Bob_Dylan") as a display name ("Bob Dylan")."""
+    return artist.replace("_", " ")
+
+
+def _load_artists(kind: str, schema: Schema, artists: Optional[Iterable[str]]) -> pd.DataFrame:
+    frames = []
+    for artist in artists or ARTISTS:
+        df = read_csv(lab_data_path(BILLBOARD_SPOTIFY_FOLDER, f"{artist}_{kind}.csv"), schema)
+        df.insert(0, PARTITION_COLUMN, artist_name(artist))
+        frames.append(df)
+    # Categories differ per file, so concatenating gives plain strings; cast again afterwards
+    combined = pd.concat(frames, ignore_index=True)
+    combined[PARTITION_COLUMN] = combined[PARTITION_COLUMN].astype("category")
+    return apply_schema(combined, Schema(dtypes=schema.dtypes))
+
+
+def load_spotify(artists: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """All (or the given) artists' Spotify tracks in one typed frame."""
+    return _load_artists("Spotify", SPOTIFY_SCHEMA, artists)
+
+
+def load_billboard(artists: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """All (or the given) artists' Billboard chart entries in one typed frame."""
+    return _load_artists("Billboard", BILLBOARD_SCHEMA, artists)
+
+
+def load_beatles_billboard() -> pd.DataFrame:
+    return read_csv(lab_data_path("Beatles", "Beatles_Billboard_Belgrade_2026.csv"), BEATLES_BILLBOARD_SCHEMA)
+
+
+def load_beatles_spotify() -> pd.DataFrame:
+    return read_csv(lab_data_path("Beatles", "Beatles_Spotify_2026.csv"), BEATLES_SPOTIFY_SCHEMA)
+
+
+def write_dataset(df: pd.DataFrame, root, partition_column: str = PARTITION_COLUMN):
+    """Write ``df`` as a Parquet dataset with one folder per value of ``partition_column``."""
+    df.to_parquet(root, engine="pyarrow", partition_cols=[partition_column], index=False)
+
+
+def read_dataset(root,
+                 artists: Optional[Iterable[str]] = None,
+                 columns: Optional[list] = None,
+                 schema: Optional[Schema] = SPOTIFY_SCHEMA,
+                 partition_column: str = PARTITION_COLUMN) -> pd.DataFrame:
+    """Read a dataset written by :func:`write_dataset`, optionally only some artists and columns.
+
+    Only the matching artists' folders and the requested columns are read.
+    Parquet keeps most types, but not categories of numbers (such as
+    ``key``), so the schema's types are applied again afterwards; pass
+    ``BILLBOARD_SCHEMA`` for a Billboard dataset.
+    """
+    filters = [(partition_column, "in", list(artists))] if artists else None
+    if columns is not None and partition_column not in columns:
+        columns = [partition_column] + list(columns)
+    df = pd.read_parquet(root, engine="pyarrow", columns=columns, filters=filters)
+    if schema is not None:
+        df = apply_schema(df, Schema(dtypes=schema.dtypes))
+    return df
+
+
+def memory_report(artists: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Memory of the combined tables read with default ``read_csv`` versus the declared schemas."""
+    rows = []
+    for kind, loader in [("Spotify", load_spotify), ("Billboard", load_billboard)]:
+        default = pd.concat([pd.read_csv(lab_data_path(BILLBOARD_SPOTIFY_FOLDER, f"{artist}_{kind}.csv"))
+                             for artist in artists or ARTISTS], ignore_index=True)
+        typed = loader(artists)
+        rows.append({"table": kind, "rows": len(typed),
+                     "default_bytes": memory_usage(default), "typed_bytes": memory_usage(typed)})
+    report = pd.DataFrame(rows)
+    report["ratio"] = report["default_bytes"] / report["typed_bytes"]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save the Billboard and Spotify tables as Parquet datasets.")
+    parser.add_argument("output", help="folder for the spotify/ and billboard/ datasets")
+    args = parser.parse_args(argv)
+    output = Path(args.output)
+    write_dataset(load_spotify(), output / "spotify")
+    write_dataset(load_billboard(), output / "billboard")
+    print(memory_report().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Decoding the "Powers of 2" codes in the Global Jukebox canto table.
+
+Each ``line_N`` cell of the canto table packs one or more cantometrics codes
+into a single integer: code ``c`` is stored as ``2 ** c`` and several codes
+are added together, so ``20`` means codes 4 and 2.  The Global Jukebox guide
+decodes them with a lookup of every sum of one, two or three powers of two
+and ``applymap``, which is slow and turns any cell with four or more codes
+into ``0``.
+
+Here the codes are read straight from the bits, for all 37 lines of all
+songs at once::
+
+    from encoding_music.datasets.cantometrics import decode_canto, unpack_canto
+
+    decoded = decode_canto(canto)
+    decoded.tensor          # bool array, songs x lines x codes
+    decoded.long()          # one row per (song, line, code)
+    decoded.counts()        # songs with each code, per line
+
+    # the guide's canto_unpacked, with every code kept
+    canto_unpacked = unpack_canto(canto)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+LINE_PATTERN = re.compile(r"line_(\d+)$")
+# Cantometrics codes run from 1 to 13 (bits 1..13 of the stored value)
+CODES = np.arange(1, 14)
+
+
+def canto_lines(canto: pd.DataFrame) -> list:
+    """The ``line_N`` columns of a canto table, in numeric order."""
+    lines = [column for column in canto.columns if LINE_PATTERN.match(str(column))]
+    return sorted(lines, key=lambda column: int(LINE_PATTERN.match(column).group(1)))
+
+
+def _as_int(values: pd.DataFrame) -> np.ndarray:
+    """Cell values as int64, with missing values as 0 (no codes)."""
+    return values.fillna(0).to_numpy(dtype=np.int64)
+
+
+def decode_codes(values, codes: np.ndarray = CODES) -> np.ndarray:
+    """Multi-hot codes for an array of stored values.
+
+    Returns a bool array with one more axis than ``values``, of length
+    ``len(codes)``: ``result[..., i]`` is whether ``codes[i]`` is set.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    # Little-endian bytes, unpacked lowest bit first: bit n lands at index n
+    as_bytes = np.ascontiguousarray(values, dtype="<u4").reshape(-1, 1).view(np.uint8)
+    bits = np.unpackbits(as_bytes, axis=-1, bitorder="little")
+    return bits[:, codes].view(bool).reshape(values.shape + (len(codes),))
+
+
+def codes_of(value: int, codes: np.ndarray = CODES) -> tuple:
+    """Codes packed in one stored value, highest first (as in the guide): 144 -> (7, 4)."""
+    return tuple(int(c) for c in codes[::-1] if (int(value) >> int(c)) & 1)
+
+
+def unexpected_bits(values, codes: np.ndarray = CODES) -> np.ndarray:
+    """Mask of values with bits set outside ``codes`` (bit 0, or above the highest code)."""
+    mask = np.bitwise_or.reduce(np.left_shift(1, codes.astype(np.int64)))
+    return (np.asarray(values, dtype=np.int64) & ~mask) != 0
+
+
+@dataclass
+class CantoCodes:
+    """Decoded canto codes.
+
+    Attributes:
+        songs: the song ids, one per row of ``tensor``
+        lines: the line column names, one per second axis entry
+        codes: the code numbers, one per third axis entry
+        tensor: bool array, songs x lines x codes
+    """
+    songs: pd.Index
+    lines: list
+    codes: np.ndarray
+    tensor: np.ndarray
+
+    def line(self, line: str) -> pd.DataFrame:
+        """Songs x codes for one line, as 0/1 columns named by code."""
+        values = self.tensor[:, self.lines.index(line), :]
+        return pd.DataFrame(values.astype(np.uint8), index=self.songs, columns=self.codes)
+
+    def long(self) -> pd.DataFrame:
+        """Tidy view: one row per song, line and code that is set."""
+        song, line, code = np.nonzero(self.tensor)
+        return pd.DataFrame({
+            "song_id": self.songs[song],
+            "line": pd.Categorical.from_codes(line, categories=self.lines),
+            "code": self.codes[code].astype(np.int8),
+        })
+
+    def counts(self) -> pd.DataFrame:
+        """Lines x codes: how many songs have each code."""
+        return pd.DataFrame(self.tensor.sum(axis=0), index=self.lines, columns=self.codes)
+
+    def n_codes(self) -> pd.DataFrame:
+        """Songs x lines: how many codes each cell holds."""
+        return pd.DataFrame(self.tensor.sum(axis=2), index=self.songs, columns=self.lines)
+
+
+def decode_canto(canto: pd.DataFrame, lines: Optional[list] = None, codes: np.ndarray = CODES) -> CantoCodes:
+    """Decode every line column of a canto table into a ``CantoCodes`` tensor."""
+    lines = lines or canto_lines(canto)
+    values = _as_int(canto[lines])
+    songs = pd.Index(canto["song_id"] if "song_id" in canto.columns else canto.index, name="song_id")
+    return CantoCodes(songs=songs, lines=list(lines), codes=codes, tensor=decode_codes(values, codes))
+
+
+def unpack_canto(canto: pd.DataFrame, lines: Optional[list] = None, codes: np.ndarray = CODES) -> pd.DataFrame:
+    """The canto table with each line value replaced by a tuple of its codes, highest first.
+
+    Same layout as ``canto_unpacked`` in the Global Jukebox guide, but exact
+    for any number of codes; missing values and 0 become an empty tuple.
+    Each distinct stored value is decoded only once.
+    """
+    lines = lines or canto_lines(canto)
+    values = _as_int(canto[lines])
+    unique, inverse = np.unique(values, return_inverse=True)
+    decoded = np.empty(len(unique), dtype=object)
+    decoded[:] = [codes_of(value, codes) for value in unique]
+    unpacked = canto.copy()
+    unpacked[lines] = pd.DataFrame(decoded[inverse.reshape(values.shape)], index=canto.index, columns=lines)
+    return unpacked
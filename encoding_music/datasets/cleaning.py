@@ -0,0 +1,289 @@
+"""Declarative, vectorized cleaning pipelines.
+
+The cleaning tutorials fix data one value at a time with ``.apply``:
+``normalize_billboard`` to turn ``-1`` into ``0``, ``convertTuple`` to join
+tuples into strings, and ``apply(combine_cols, axis=1)`` to build an
+``'Author-Title'`` column.  Each of those calls a Python function for every
+row, which is fine for 300 songs and very slow for a few million chart
+entries.
+
+Here a cleaning recipe is a list of steps, each of which runs as a single
+whole-column pandas (or Arrow) operation:
+
+=================  ==========================================================
+``Replace``        replace values in a column (``-1`` -> ``0``)
+``FillNA``         fill missing values
+``DropNA``         drop rows with missing values
+``ToDatetime``     parse dates with a format
+``JoinColumns``    "Songwriter: Title" from several columns
+``JoinLists``      ``('a', 'b')`` -> ``"a_b"`` (the tutorial's ``convertTuple``)
+``SplitColumns``   one column into several (``' US: '`` -> UK and US columns)
+``SplitExplode``   ``"Rock, Pop"`` -> one row per genre
+=================  ==========================================================
+
+A ``Pipeline`` runs the steps in order, times each one, and remembers the
+output of every stage under a hash of its input and the steps so far (the
+last stage in memory, every stage on disk with ``cache_dir``).  Running it
+again on the same data (or on data that differs only after some step was
+changed) picks up from the last stage it already has::
+
+    from encoding_music.datasets import DropNA, FillNA, JoinColumns, Pipeline, Replace, ToDatetime
+
+    clean = Pipeline([
+        FillNA("Album.debut", "unreleased"),
+        DropNA(),
+        Replace("Top.50.Billboard", {-1: 0}),
+        ToDatetime("Year", "%Y"),
+        JoinColumns(["Songwriter", "Title"], "Author-Title", sep=": "),
+    ], cache_dir="clean_cache")
+
+    beatles_billboard = clean(pd.read_csv(beatles_billboard_csv))
+    print(clean.timings)
+"""
+
+import hashlib
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from .store import from_arrow, to_arrow
+
+
+class Step:
+    """A cleaning step: a frame in, a frame out, no per-row Python calls."""
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def key(self) -> str:
+        """Identifies the step and its settings in cache keys."""
+        return repr(self)
+
+
+@dataclass
+class Replace(Step):
+    column: str
+    mapping: dict
+
+    def __call__(self, df):
+        return df.assign(**{self.column: df[self.column].replace(self.mapping)})
+
+
+@dataclass
+class FillNA(Step):
+    column: str
+    value: Any
+
+    def __call__(self, df):
+        return df.assign(**{self.column: df[self.column].fillna(self.value)})
+
+
+@dataclass
+class DropNA(Step):
+    columns: Optional[list] = None
+    how: str = "any"
+
+    def __call__(self, df):
+        return df.dropna(subset=self.columns, how=self.how)
+
+
+@dataclass
+class ToDatetime(Step):
+    column: str
+    format: Optional[str] = None
+    errors: str = "coerce"
+
+    def __call__(self, df):
+        return df.assign(**{self.column: pd.to_datetime(df[self.column], format=self.format, errors=self.errors)})
+
+
+@dataclass
+class JoinColumns(Step):
+    columns: list
+    into: str
+    sep: str = " "
+
+    def __call__(self, df):
+        parts = [df[column].astype("string") for column in self.columns]
+        return df.assign(**{self.into: parts[0].str.cat(parts[1:], sep=self.sep)})
+
+
+@dataclass
+class JoinLists(Step):
+    """Join list or tuple values into strings; other values are left as they are."""
+    column: str
+    sep: str = "_"
+
+    def __call__(self, df):
+        values = df[self.column]
+        try:
+            array = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = None
+        if array is not None and not pa.types.is_list(array.type):
+            return df
+        if array is not None:
+            try:
+                # (1, 2) joins as "1_2", like str(1) + "_" + str(2)
+                array = array.cast(pa.list_(pa.string()))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                array = None
+        if array is not None:
+            joined = pd.Series(pc.binary_join(array, self.sep).to_pandas(), index=values.index)
+        else:
+            # Lists mixed with plain values (or of items Arrow cannot cast): join only the lists
+            is_list = values.map(type).isin([list, tuple])
+            joined = values.where(~is_list, values[is_list].map(lambda items: self.sep.join(map(str, items))))
+        return df.assign(**{self.column: joined})
+
+
+@dataclass
+class SplitColumns(Step):
+    """Split one text column into several, e.g. "UK: Help! US: Help!" on ``' US: '``."""
+    column: str
+    into: list
+    sep: str
+
+    def __call__(self, df):
+        parts = df[self.column].str.split(self.sep, n=len(self.into) - 1, expand=True)
+        parts = parts.reindex(columns=range(len(self.into)))
+        parts.columns = self.into
+        return df.assign(**{name: parts[name] for name in self.into})
+
+
+@dataclass
+class SplitExplode(Step):
+    """Split a text column on ``sep`` and give each piece its own row."""
+    column: str
+    sep: str = ", "
+    strip: bool = True
+
+    def __call__(self, df):
+        df = df.assign(**{self.column: df[self.column].str.split(self.sep)}).explode(self.column)
+        if self.strip:
+            df[self.column] = df[self.column].str.strip()
+        return df
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Hash of a frame's columns, dtypes, index and values.
+
+    The values are hashed from their Arrow buffers, which for text columns
+    is several times faster than ``pd.util.hash_pandas_object``.
+    """
+    digest = hashlib.sha256(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    for column in to_arrow(df).columns:
+        for chunk in column.chunks:
+            _hash_array(digest, chunk)
+    return digest.hexdigest()
+
+
+def _hash_array(digest, array: pa.Array):
+    # Slices share their parent's buffers, so the offset matters too
+    digest.update(f"{array.offset}:{len(array)}".encode("utf-8"))
+    for buffer in array.buffers():
+        if buffer is not None:
+            digest.update(buffer)
+    if pa.types.is_dictionary(array.type):
+        # Categories: buffers() covers only the codes
+        _hash_array(digest, array.dictionary)
+
+
+class Pipeline:
+    """Runs cleaning steps in order, caching and timing each stage.
+
+    The latest stage's output is kept in memory, and every stage's output is
+    written as an Arrow file to ``cache_dir`` if one is given, under a key
+    made from the input frame's hash and the steps up to that stage.  Only
+    one frame is held, however large the catalogue; without ``cache_dir``
+    a run can only pick up from that one.  ``timings`` describes the
+    last run: one row per step with its time, the rows it produced, and
+    whether the result came from the cache.
+    """
+
+    def __init__(self, steps: list, cache_dir=None):
+        self.steps = list(steps)
+        self.cache_dir = cache_dir
+        self.timings = None
+        self._latest = None   # (key, frame) of the last stage run or loaded
+
+    def stage_keys(self, input_hash: str) -> list:
+        keys = []
+        key = input_hash
+        for step in self.steps:
+            key = hashlib.sha256(f"{key}|{step.key()}".encode("utf-8")).hexdigest()
+            keys.append(key)
+        return keys
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return Path(self.cache_dir) / f"{key[:32]}.arrow" if self.cache_dir else None
+
+    def _load(self, key: str) -> Optional[pd.DataFrame]:
+        if self._latest is not None and self._latest[0] == key:
+            return self._latest[1]
+        path = self._cache_path(key)
+        if path is not None and path.exists():
+            df = from_arrow(feather.read_table(path))
+            index = df.columns[0]
+            df = df.set_index(index).rename_axis(None if index == "__index__" else index)
+            self._latest = (key, df)
+            return df
+        return None
+
+    def _save(self, key: str, df: pd.DataFrame):
+        self._latest = (key, df)
+        path = self._cache_path(key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            table = to_arrow(df.rename_axis(df.index.name or "__index__").reset_index())
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return  # keep it in memory only
+        tmp_path = path.with_suffix(".tmp")
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        tmp_path.replace(path)
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        start = time.perf_counter()
+        keys = self.stage_keys(frame_hash(df))
+        rows = []
+        hash_seconds = time.perf_counter() - start
+
+        # Resume after the last stage that is already cached
+        resume = 0
+        for i in range(len(keys), 0, -1):
+            cached = self._load(keys[i - 1])
+            if cached is not None:
+                df, resume = cached, i
+                break
+        for step in self.steps[:resume]:
+            rows.append({"step": step.key(), "seconds": 0.0, "rows": None, "cached": True})
+        if resume:
+            rows[-1]["rows"] = len(df)
+
+        for step, key in zip(self.steps[resume:], keys[resume:]):
+            start = time.perf_counter()
+            df = step(df)
+            seconds = time.perf_counter() - start
+            self._save(key, df)
+            rows.append({"step": step.key(), "seconds": seconds, "rows": len(df), "cached": False})
+
+        rows.insert(0, {"step": "hash input", "seconds": hash_seconds, "rows": None, "cached": False})
+        self.timings = pd.DataFrame(rows)
+        return df.copy()
+
+    __call__ = run
+
+    def clear(self):
+        self._latest = None
+        if self.cache_dir:
+            for path in Path(self.cache_dir).glob("*.arrow"):
+                path.unlink()
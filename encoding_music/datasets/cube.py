@@ -0,0 +1,205 @@
+"""A precomputed aggregation cube of cantometrics codes by place and genre.
+
+The lullaby study in the Global Jukebox guide merges the song metadata with
+the unpacked canto table on ``song_id`` and then groups by ``Region`` to
+compare, say, melodic range.  Every new question (another genre, another
+line, Division instead of Region) repeats the merge and the group-by over
+all the songs.
+
+``CantoCube`` does the merge once and keeps, for every society and for
+every (society, genre) pair, additive totals of the decoded codes:
+
+* the number of songs
+* for each line and code, how many songs have that code
+* for each line, the sum and count of the songs' code values (a song with
+  two codes counts their average), from which means are taken
+
+Because the totals add up, any coarser level (Subregion, Division, Region,
+or everything) is a sum over the society cells, so questions are answered
+without going back to the songs.  ``refresh`` recomputes only the
+societies whose songs were added, removed or changed::
+
+    from encoding_music.datasets import CantoCube
+
+    cube = CantoCube(canto, songs, line_names=short_title_dict)
+    cube.counts("Region", "Melodic_Range", genre="Lullaby")   # regions x codes
+    cube.means("Region", genre="Lullaby")                     # regions x lines
+    cube.drill("Region", "Africa", genre="Lullaby")           # Africa's divisions
+    cube.refresh(new_canto, new_songs)
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cantometrics import CODES, canto_lines, decode_codes
+from .multilabel import LabelIndex
+
+LEVELS = ["Region", "Division", "Subregion", "society_id"]
+ALL_GENRES = "*"
+UNKNOWN = "Unknown"
+
+
+def _sum_by(groups: np.ndarray, n_groups: int, *arrays: np.ndarray) -> list:
+    """Sum each array's rows by group number (0..n_groups-1)."""
+    order = np.argsort(groups, kind="stable")
+    starts = np.searchsorted(groups[order], np.arange(n_groups))
+    present = np.bincount(groups, minlength=n_groups) > 0
+    sums = []
+    for array in arrays:
+        total = np.zeros((n_groups,) + array.shape[1:], dtype=array.dtype)
+        if len(array):
+            total[present] = np.add.reduceat(array[order], starts[present], axis=0)
+        sums.append(total)
+    return sums
+
+
+class CantoCube:
+    """Code counts and means of the canto lines, by society and genre, ready to roll up.
+
+    Args:
+        canto: the canto table (``song_id``, ``line_1`` .. ``line_37``)
+        songs: the songs table, with ``song_id``, ``society_id``, the place
+            levels and the genre field
+        genre_field: multi-valued column of ``songs`` to slice by
+        levels: place columns of ``songs``, broadest first, ending with the society
+        line_names: optional line id -> name (the guide's ``short_title_dict``)
+    """
+
+    def __init__(self, canto: pd.DataFrame, songs: pd.DataFrame, genre_field: str = "Genre",
+                 levels: Iterable[str] = LEVELS, line_names: Optional[dict] = None, codes: np.ndarray = CODES):
+        self.levels = list(levels)
+        self.society = self.levels[-1]
+        self.genre_field = genre_field
+        self.codes = codes
+        self.lines = canto_lines(canto)
+        self.line_names = {line: (line_names or {}).get(line, line) for line in self.lines}
+        self._line_ids = {name: line for line, name in self.line_names.items()}
+        self._songs = None
+        self._cells = None
+        self.refresh(canto, songs)
+
+    # building
+
+    def _song_frame(self, canto: pd.DataFrame, songs: pd.DataFrame) -> pd.DataFrame:
+        """One row per song: place levels, genre string and stored line values."""
+        meta = songs[["song_id"] + self.levels + [self.genre_field]].copy()
+        meta["song_id"] = meta["song_id"].astype(str)
+        meta = meta.drop_duplicates("song_id").set_index("song_id")
+        meta[self.levels] = meta[self.levels].astype("string").fillna(UNKNOWN)
+        values = canto[["song_id"] + self.lines].copy()
+        values["song_id"] = values["song_id"].astype(str)
+        values[self.lines] = values[self.lines].fillna(0).astype(np.int64)
+        return meta.join(values.drop_duplicates("song_id").set_index("song_id"), how="inner")
+
+    def _aggregate(self, frame: pd.DataFrame) -> dict:
+        """Cells for the songs in ``frame``: one per society, and one per (society, genre)."""
+        decoded = decode_codes(frame[self.lines].to_numpy(), self.codes)
+        n_codes = decoded.sum(axis=2)
+        value = (decoded * self.codes).sum(axis=2) / np.maximum(n_codes, 1)
+
+        # Every song counts once for its society, and once more for each of its genres
+        genres = LabelIndex(frame[self.genre_field])
+        genre_rows = np.repeat(np.arange(len(frame)), np.diff(genres.indptr))
+        song = np.concatenate([np.arange(len(frame)), genre_rows])
+        genre = np.concatenate([np.full(len(frame), ALL_GENRES, dtype=object),
+                                np.asarray(genres.vocabulary, dtype=object)[genres.indices]])
+        society = frame[self.society].to_numpy(dtype=object)[song]
+        groups, keys = pd.MultiIndex.from_arrays([society, genre]).factorize()
+        keys = pd.DataFrame({self.society: keys.get_level_values(0), "genre": keys.get_level_values(1)})
+
+        sizes, code_counts, value_sum, value_n = _sum_by(
+            groups, len(keys), np.ones(len(song), dtype=np.int32), decoded[song].astype(np.int32),
+            value[song], (n_codes[song] > 0).astype(np.int32))
+        return {"keys": keys, "songs": sizes, "code_counts": code_counts,
+                "value_sum": value_sum, "value_n": value_n}
+
+    def refresh(self, canto: pd.DataFrame, songs: pd.DataFrame) -> int:
+        """Bring the cube up to date with new tables; returns how many songs changed.
+
+        Only the societies of added, removed or changed songs are recomputed.
+        """
+        frame = self._song_frame(canto, songs)
+        if self._songs is None:
+            changed = frame.index
+            affected = set(frame[self.society])
+        else:
+            old_hash = pd.util.hash_pandas_object(self._songs, index=True)
+            new_hash = pd.util.hash_pandas_object(frame, index=True)
+            both = old_hash.index.intersection(new_hash.index)
+            changed = (old_hash.index.difference(new_hash.index)
+                       .union(new_hash.index.difference(old_hash.index))
+                       .union(both[old_hash[both].to_numpy() != new_hash[both].to_numpy()]))
+            affected = set(self._songs[self.society].reindex(changed).dropna()) | \
+                set(frame[self.society].reindex(changed).dropna())
+
+        new_cells = self._aggregate(frame[frame[self.society].isin(affected)])
+        if self._cells is not None:
+            keep = ~self._cells["keys"][self.society].isin(affected).to_numpy()
+            new_cells = {name: (pd.concat([cells[keep], new_cells[name]], ignore_index=True) if name == "keys"
+                                else np.concatenate([cells[keep], new_cells[name]]))
+                         for name, cells in self._cells.items()}
+        self._cells = new_cells
+        self._songs = frame
+        self.places = frame.groupby(self.society, observed=True)[self.levels[:-1]].first()
+        # Every level's value for every cell, so queries need no lookups
+        societies = self._cells["keys"][self.society]
+        self._cell_places = self.places.reindex(societies).reset_index()
+        return len(changed)
+
+    # querying
+
+    def _rollup(self, level: Optional[str], genre: Optional[str], where: Optional[dict]):
+        places = self._cell_places
+        selected = (self._cells["keys"]["genre"] == (genre or ALL_GENRES)).to_numpy().copy()
+        for column, values in (where or {}).items():
+            values = [values] if isinstance(values, str) else list(values)
+            selected &= places[column].isin(values).to_numpy()
+
+        if level is None:
+            labels = np.zeros(int(selected.sum()), dtype=np.int64)
+            index = pd.Index(["All"])
+        else:
+            labels, index = pd.factorize(places[level][selected], sort=True)
+            index = pd.Index(index, name=level)
+        sums = _sum_by(labels, len(index), *(self._cells[name][selected]
+                                             for name in ("songs", "code_counts", "value_sum", "value_n")))
+        return index, sums
+
+    def _line_id(self, line: str) -> str:
+        return self._line_ids.get(line, line)
+
+    def sizes(self, level: Optional[str] = "Region", genre: Optional[str] = None,
+              where: Optional[dict] = None) -> pd.Series:
+        """Number of songs in each group (``level=None`` for all songs together)."""
+        index, (songs, *_) = self._rollup(level, genre, where)
+        return pd.Series(songs, index=index, name="songs")
+
+    def counts(self, level: Optional[str], line: str, genre: Optional[str] = None,
+               where: Optional[dict] = None) -> pd.DataFrame:
+        """Groups x codes: how many songs in each group have each code on ``line``."""
+        index, (_, code_counts, _, _) = self._rollup(level, genre, where)
+        values = code_counts[:, self.lines.index(self._line_id(line)), :]
+        return pd.DataFrame(values, index=index, columns=pd.Index(self.codes, name=line))
+
+    def means(self, level: Optional[str] = "Region", genre: Optional[str] = None, where: Optional[dict] = None,
+              lines: Optional[list] = None) -> pd.DataFrame:
+        """Groups x lines: the mean code of the songs rated on each line."""
+        index, (_, _, value_sum, value_n) = self._rollup(level, genre, where)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = value_sum / value_n
+        df = pd.DataFrame(means, index=index, columns=[self.line_names[line] for line in self.lines])
+        return df if lines is None else df[[self.line_names[self._line_id(line)] for line in lines]]
+
+    def drill(self, level: str, value: str, genre: Optional[str] = None, where: Optional[dict] = None,
+              lines: Optional[list] = None) -> pd.DataFrame:
+        """Means one level below ``level`` within ``value`` (e.g. the Divisions of one Region)."""
+        below = self.levels[self.levels.index(level) + 1]
+        return self.means(below, genre=genre, where={**(where or {}), level: value}, lines=lines)
+
+    def genres(self) -> pd.Series:
+        """Songs per genre, most common first."""
+        keys = self._cells["keys"]
+        sizes = pd.Series(self._cells["songs"], index=keys["genre"])
+        return sizes[sizes.index != ALL_GENRES].groupby(level=0).sum().sort_values(ascending=False)
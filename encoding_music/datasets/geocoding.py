@@ -0,0 +1,267 @@
+"""Batch geocoding through local gazetteers and an on-disk cache.
+
+The maps tutorial's ``get_coordinates`` makes a new ``Nominatim`` geocoder
+for every address and asks OpenStreetMap about each place in turn, every
+time the notebook runs, including places it has already asked about and
+places (SoundMap buildings, Global Jukebox societies) whose coordinates are
+already in our own tables.
+
+``Geocoder`` looks a batch of addresses up once:
+
+* addresses are normalized (case, spacing, non-breaking spaces) and each
+  distinct one is looked up only once
+* local gazetteers (any table of place names with coordinates) are asked
+  first, with no network and no rate limit
+* then the on-disk cache of earlier answers, including "not found"
+* then the remote geocoder, with a few requests in flight but never more
+  than one started per second, as Nominatim's usage policy asks; each
+  answer is added to the cache as soon as it arrives
+
+Running the same notebook again costs no requests at all::
+
+    from encoding_music.datasets.geocoding import Gazetteer, Geocoder
+
+    societies_places = Gazetteer.from_frame(societies, "society", "Society_latitude", "Society_longitude")
+    geocoder = Geocoder([societies_places])            # then Nominatim for anything else
+    places = geocoder.geocode(["Bryn Mawr College", "Haverford College"])
+    rilm_df = geocoder.add_coordinates(rilm_df, "b_place_uplvl1")
+
+A ``Gazetteer`` built from a dict is also an offline stand-in for the
+remote geocoder: ``Geocoder([Gazetteer(places)], remote=[])``.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from ..tracing import traced
+from .billboard_crawler import HostLimiter
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "encoding_music geocoder (https://github.com/RichardFreedman/Encoding_Music)"
+DEFAULT_CACHE_PATH = Path(os.environ.get("ENCODING_MUSIC_CACHE", Path.home() / ".cache" / "encoding_music")) \
+    / "geocode_cache.jsonl"
+RESULT_COLUMNS = ["address", "latitude", "longitude", "source"]
+
+
+def normalize_address(address) -> str:
+    """The form in which addresses are compared and cached: ``" Bryn  Mawr College."`` -> ``"bryn mawr college"``."""
+    text = unicodedata.normalize("NFKC", str(address))
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,;").casefold()
+
+
+class Gazetteer:
+    """Coordinates of known places, looked up locally by normalized name.
+
+    Args:
+        places: place name -> ``(latitude, longitude)``
+        name: how results from this gazetteer are labelled in ``source``
+    """
+
+    def __init__(self, places: dict, name: str = "gazetteer"):
+        self.name = name
+        self.places = {}
+        for place, coordinates in places.items():
+            # The first spelling of a place wins
+            self.places.setdefault(normalize_address(place), (float(coordinates[0]), float(coordinates[1])))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, name_column: str, latitude: str = "latitude", longitude: str = "longitude",
+                   name: Optional[str] = None) -> "Gazetteer":
+        """Places from a table, e.g. the Global Jukebox societies or the SoundMap survey."""
+        rows = df[[name_column, latitude, longitude]].dropna()
+        coordinates = zip(pd.to_numeric(rows[latitude]), pd.to_numeric(rows[longitude]))
+        return cls(dict(zip(rows[name_column], coordinates)) if len(rows) else {}, name=name or name_column)
+
+    def __len__(self):
+        return len(self.places)
+
+    def lookup(self, query: str) -> Optional[tuple]:
+        return self.places.get(query)
+
+
+class Nominatim:
+    """OpenStreetMap's Nominatim search, as used in the maps tutorial.
+
+    At most ``in_flight`` requests are open at once, and requests start at
+    least ``delay`` seconds apart (Nominatim allows one per second).
+    """
+
+    def __init__(self, user_agent: str = USER_AGENT, url: str = NOMINATIM_URL, delay: float = 1.0,
+                 in_flight: int = 2, timeout: float = 10):
+        self.name = "nominatim"
+        self.user_agent = user_agent
+        self.url = url
+        self.timeout = timeout
+        self.limiter = HostLimiter(per_host=in_flight, delay=delay)
+
+    @traced("fetch", "nominatim.lookup")
+    def lookup(self, query: str) -> Optional[tuple]:
+        import requests
+
+        with self.limiter(self.url):
+            response = requests.get(self.url, params={"q": query, "format": "jsonv2", "limit": 1},
+                                    headers={"User-Agent": self.user_agent}, timeout=self.timeout)
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+class GeocodeCache:
+    """Answers from remote geocoders, one JSON line per address, appended as they arrive.
+
+    ``None`` coordinates record that the address was not found, so it is
+    not asked about again.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by an interrupted run
+                    coordinates = entry.get("coordinates")
+                    self.entries[entry["query"]] = (tuple(coordinates) if coordinates else None, entry["source"])
+
+    def __contains__(self, query: str):
+        return query in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, query: str):
+        """``(coordinates or None, source)``, or ``None`` if the address was never looked up."""
+        return self.entries.get(query)
+
+    def put(self, query: str, coordinates: Optional[tuple], source: str):
+        with self._lock:
+            self.entries[query] = (coordinates, source)
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"query": query, "coordinates": coordinates, "source": source}) + "\n")
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+
+
+class Geocoder:
+    """Geocodes batches of addresses: local gazetteers, then the cache, then remote geocoders.
+
+    Args:
+        gazetteers: local lookups, tried in order
+        remote: remote geocoders, tried in order for addresses still unknown
+            (``None`` for Nominatim, ``[]`` for none)
+        cache: path of the cache file, or ``None`` to cache in memory only
+        workers: remote lookups in flight at once (each geocoder still
+            spaces its own requests)
+        retry_missing: ask remote geocoders again about addresses they
+            did not find before
+    """
+
+    def __init__(self, gazetteers: Iterable = (), remote: Optional[Iterable] = None, cache=DEFAULT_CACHE_PATH,
+                 workers: int = 2, retry_missing: bool = False):
+        self.gazetteers = list(gazetteers)
+        self.remote = [Nominatim()] if remote is None else list(remote)
+        self.cache = GeocodeCache(cache)
+        self.workers = workers
+        self.retry_missing = retry_missing
+        self.errors = {}
+        self.stats = {}
+
+    def _lookup_remote(self, query: str):
+        for geocoder in self.remote:
+            coordinates = geocoder.lookup(query)
+            if coordinates is not None:
+                return coordinates, geocoder.name
+        return None, None
+
+    def _resolve(self, queries: list) -> dict:
+        """Normalized query -> ``(coordinates or None, source)`` for each distinct query."""
+        found = {}
+        pending = []
+        stats = dict.fromkeys(["gazetteer", "cache", "remote", "not_found", "error"], 0)
+        for query in queries:
+            for gazetteer in self.gazetteers:
+                coordinates = gazetteer.lookup(query)
+                if coordinates is not None:
+                    found[query] = (coordinates, gazetteer.name)
+                    stats["gazetteer"] += 1
+                    break
+            else:
+                cached = self.cache.get(query)
+                if cached is not None and (cached[0] is not None or not self.retry_missing or not self.remote):
+                    found[query] = cached
+                    stats["cache"] += 1
+                else:
+                    pending.append(query)
+
+        self.errors = {}
+        if pending and self.remote:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(self._lookup_remote, query): query for query in pending}
+                for future in as_completed(futures):
+                    query = futures[future]
+                    try:
+                        coordinates, source = future.result()
+                    except Exception as error:
+                        # Not cached: a failed request says nothing about the address
+                        self.errors[query] = f"{type(error).__name__}: {error}"
+                        stats["error"] += 1
+                        continue
+                    self.cache.put(query, coordinates, source)
+                    found[query] = (coordinates, source)
+                    stats["remote" if coordinates is not None else "not_found"] += 1
+        self.stats = stats
+        return found
+
+    def geocode(self, addresses: Iterable) -> pd.DataFrame:
+        """One row per address, in order: the address, its latitude and longitude, and where they came from.
+
+        Addresses that were not found (or whose lookup failed, see
+        ``errors``) have missing coordinates.
+        """
+        addresses = pd.Series(list(addresses), dtype="object")
+        normalized = {address: normalize_address(address) for address in pd.unique(addresses.dropna())}
+        found = self._resolve(list(dict.fromkeys(normalized.values())))
+
+        rows = {}
+        for address, query in normalized.items():
+            coordinates, source = found.get(query, (None, None))
+            rows[address] = (*(coordinates or (None, None)), source)
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=RESULT_COLUMNS[1:])
+        df = table.reindex(addresses.to_numpy()).rename_axis("address").reset_index()
+        df[["latitude", "longitude"]] = df[["latitude", "longitude"]].astype(float)
+        df["source"] = df["source"].astype("category")
+        return df
+
+    def locate(self, address) -> Optional[tuple]:
+        """``(latitude, longitude)`` of one address, or ``None``: the tutorial's ``get_coordinates``."""
+        row = self.geocode([address]).iloc[0]
+        return None if pd.isna(row["latitude"]) else (float(row["latitude"]), float(row["longitude"]))
+
+    def add_coordinates(self, df: pd.DataFrame, column: str, latitude: str = "Latitude",
+                        longitude: str = "Longitude") -> pd.DataFrame:
+        """``df`` with coordinate columns for the places in ``column``."""
+        places = self.geocode(df[column])
+        return df.assign(**{latitude: places["latitude"].to_numpy(), longitude: places["longitude"].to_numpy()})
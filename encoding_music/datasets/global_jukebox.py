@@ -0,0 +1,242 @@
+"""Local snapshots of the Global Jukebox (Cantometrics) tables.
+
+The Global Jukebox guide downloads six CSV files from GitHub at the start of
+every notebook, cleans non-breaking spaces (``\\xa0``) out of them column by
+column, and puts the results in global variables.  ``snapshot`` does the
+download once: it cleans the whole table in Arrow, stores text columns with
+few distinct values (regions, divisions, line categories) as categories
+and the canto code columns in 16 bits or fewer, and writes one Parquet file
+per table with a ``snapshot.json`` recording where and when each came from.
+Running it again asks GitHub whether each file changed (``If-None-Match``),
+so an up-to-date snapshot costs six ``304`` answers and no downloads.
+
+``load_global_jukebox`` returns a ``GlobalJukebox`` whose tables are read
+(memory mapped) the first time they are used::
+
+    from encoding_music.datasets import load_global_jukebox
+
+    gjb = load_global_jukebox()      # downloads only if there is no snapshot yet
+    gjb.canto.head()
+    gjb.songs[["song_id", "Genre", "Region"]]
+    gjb.load("societies", columns=["society_id", "Region", "Division"])
+
+The snapshot lives in ``~/.cache/encoding_music/global_jukebox`` unless
+another folder is given (or ``ENCODING_MUSIC_CACHE`` is set).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ..tracing import count, traced
+from .store import to_arrow
+
+GLOBAL_JUKEBOX_URL = "https://raw.githubusercontent.com/theglobaljukebox/cantometrics/main"
+TABLES = {
+    "canto": "raw/data.csv",
+    "societies": "raw/societies.csv",
+    "songs": "raw/songs.csv",
+    "codes": "etc/codes.csv",
+    "lines_explained": "etc/variables.csv",
+    "raw_codes": "etc/raw_codes.csv",
+}
+DEFAULT_SNAPSHOT_DIR = Path(os.environ.get("ENCODING_MUSIC_CACHE", Path.home() / ".cache" / "encoding_music")) \
+    / "global_jukebox"
+MANIFEST = "snapshot.json"
+# Text columns with at most this share of distinct values become categories
+CATEGORY_RATIO = 0.5
+# Integer columns that hold cantometrics codes (powers of two up to 2 ** 13), not quantities
+CODE_COLUMNS = re.compile(r"line_\d+$")
+
+
+def normalize_spaces(table: pa.Table) -> pa.Table:
+    """Replace non-breaking spaces with spaces in column names and every text column."""
+    names = [name.replace("\xa0", " ") for name in table.column_names]
+    columns = []
+    for column in table.columns:
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            column = pc.replace_substring(column, "\xa0", " ")
+        columns.append(column)
+    return pa.table(columns, names=names)
+
+
+def compact_types(table: pa.Table, category_ratio: float = CATEGORY_RATIO,
+                  code_columns: re.Pattern = CODE_COLUMNS) -> pa.Table:
+    """Dictionary-encode repetitive text columns and shrink the code columns to fit their range.
+
+    Only integer columns whose names match ``code_columns`` (the canto
+    ``line_N`` columns) are narrowed, since they are decoded rather than
+    computed with.  Ids, counts and years keep 64 bits, so joins and sums
+    behave as before.  Arithmetic on a narrowed column keeps its small type
+    and wraps around (``canto["line_1"] * 8`` in int16 overflows past
+    32767): decode the codes first (see ``cantometrics``) or ``astype("int64")``.
+    """
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if len(column) and (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+            if pc.count_distinct(column).as_py() <= category_ratio * len(column):
+                column = column.dictionary_encode()
+        elif len(column) and pa.types.is_integer(column.type) and code_columns.match(name):
+            low, high = (value.as_py() for value in pc.min_max(column).values())
+            if low is not None:
+                for small in (pa.int8(), pa.int16(), pa.int32()):
+                    info = np.iinfo(small.to_pandas_dtype())
+                    if info.min <= low and high <= info.max:
+                        column = column.cast(small)
+                        break
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+@traced("parse")
+def read_table_bytes(data: bytes) -> pa.Table:
+    """Parse one downloaded CSV into a cleaned, compactly typed Arrow table."""
+    df = pd.read_csv(io.BytesIO(data), low_memory=False)
+    return compact_types(normalize_spaces(to_arrow(df)))
+
+
+def _validators(record: Optional[dict]) -> dict:
+    """Headers that ask the server to answer ``304`` if the file has not changed since ``record``."""
+    headers = {}
+    if record and record.get("etag"):
+        headers["If-None-Match"] = record["etag"]
+    if record and record.get("last_modified"):
+        headers["If-Modified-Since"] = record["last_modified"]
+    return headers
+
+
+@traced("fetch", "global_jukebox.download")
+def _download(url: str, headers: Optional[dict] = None):
+    """``(body, response headers)`` for ``url``; the body is None when the server answers ``304``."""
+    import requests
+
+    response = requests.get(url, headers=headers or {}, timeout=60)
+    if response.status_code == 304:
+        return None, response.headers
+    response.raise_for_status()
+    count("bytes_fetched", len(response.content))
+    return response.content, response.headers
+
+
+def _read_manifest(directory: Path) -> dict:
+    path = directory / MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def snapshot(directory=DEFAULT_SNAPSHOT_DIR,
+             tables: Optional[Iterable[str]] = None,
+             base_url: str = GLOBAL_JUKEBOX_URL,
+             fetch=_download) -> dict:
+    """Download the tables and save them as Parquet; returns the manifest.
+
+    For a table already saved, the request carries the ``ETag`` and
+    ``Last-Modified`` recorded with it, and a ``304`` answer keeps the saved
+    file without downloading it.  A download that is byte-for-byte the same
+    as the saved one is not rewritten either.  ``fetch`` (url, request
+    headers -> body or None, response headers) can be replaced, e.g. to
+    read from local copies.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(directory)
+    for name in tables or TABLES:
+        url = f"{base_url}/{TABLES[name]}"
+        path = directory / f"{name}.parquet"
+        record = manifest.get(name) if path.exists() else None
+        data, headers = fetch(url, _validators(record if record and record.get("url") == url else None))
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if data is None and record is not None:
+            record["checked"] = now
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        if record is None or record.get("sha256") != digest:
+            table = read_table_bytes(data)
+            tmp_path = path.with_suffix(".tmp")
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+            record = {"url": url, "sha256": digest, "rows": table.num_rows, "fetched": now}
+        manifest[name] = {**record, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                          "checked": now}
+    with open(directory / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+class GlobalJukebox:
+    """The snapshot tables, each read from Parquet the first time it is used.
+
+    Tables are available as attributes (``gjb.canto``, ``gjb.songs``, ...)
+    or by name (``gjb["songs"]``).
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR):
+        self.directory = Path(directory)
+        self.manifest = _read_manifest(self.directory)
+        self._tables = {}
+
+    @property
+    def tables(self) -> list:
+        return [name for name in TABLES if (self.directory / f"{name}.parquet").exists()]
+
+    def load(self, name: str, columns: Optional[list] = None) -> pd.DataFrame:
+        """A table (or some of its columns), read without keeping it."""
+        if name not in TABLES:
+            raise KeyError(f"Unknown Global Jukebox table {name!r}; expected one of {list(TABLES)}")
+        path = self.directory / f"{name}.parquet"
+        if not path.exists():
+            raise FileNotFoundError(f"No snapshot of {name!r} in {self.directory}; run snapshot() first")
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name not in self._tables:
+            self._tables[name] = self.load(name)
+        return self._tables[name]
+
+    def __getattr__(self, name: str) -> pd.DataFrame:
+        if name.startswith("_") or name not in TABLES:
+            raise AttributeError(name)
+        return self[name]
+
+    def __dir__(self):
+        return list(super().__dir__()) + self.tables
+
+    def __repr__(self):
+        rows = ", ".join(f"{name}={self.manifest.get(name, {}).get('rows', '?')}" for name in self.tables)
+        return f"GlobalJukebox({str(self.directory)!r}, {rows})"
+
+
+def load_global_jukebox(directory=DEFAULT_SNAPSHOT_DIR, download: bool = True) -> GlobalJukebox:
+    """The Global Jukebox tables from a local snapshot, taking the snapshot first if there is none."""
+    directory = Path(directory)
+    missing = [name for name in TABLES if not (directory / f"{name}.parquet").exists()]
+    if missing and download:
+        snapshot(directory, tables=missing)
+    return GlobalJukebox(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save a local snapshot of the Global Jukebox tables.")
+    parser.add_argument("directory", nargs="?", default=str(DEFAULT_SNAPSHOT_DIR))
+    parser.add_argument("--tables", nargs="*", choices=list(TABLES), help="only these tables")
+    args = parser.parse_args(argv)
+    for name, record in snapshot(args.directory, tables=args.tables).items():
+        print(f"{name}: {record['rows']} rows from {record['url']} ({record['fetched']})")
+
+
+if __name__ == "__main__":
+    main()
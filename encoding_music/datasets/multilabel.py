@@ -0,0 +1,170 @@
+"""Multi-label indexes for semicolon-separated fields.
+
+In the Global Jukebox ``songs`` table, ``Genre``, ``Instruments`` and
+``Performers`` hold several labels in one string (``"Dance Song; Lullaby"``).
+The guide either searches those strings with ``str.contains`` (which also
+matches "Lullaby" inside longer labels) or splits and explodes the whole
+table before every count or group-by.
+
+``LabelIndex`` splits a column once and keeps it as sparse matrices: each
+label is interned in a vocabulary, each row lists its label numbers (CSR),
+and each label lists its rows (the postings).  Queries, counts and
+crosstabs then work on those integer arrays, without an exploded copy of
+the table::
+
+    from encoding_music.datasets import SongLabels
+
+    labels = SongLabels(songs)                      # Genre, Instruments, Performers
+    genre = labels["Genre"]
+    lullabies = songs[genre.mask("Lullaby") & ~genre.mask("Dance Song")]
+    genre.value_counts().head(20)
+    genre.crosstab(songs["Region"])                 # genres x regions
+    labels.filter(Genre="Lullaby", Instruments=["Drum", "Rattle"])
+"""
+
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FIELDS = ("Genre", "Instruments", "Performers")
+DEFAULT_SEP = ";"
+
+Labels = Union[str, Iterable[str]]
+
+
+def _as_list(labels: Labels) -> list:
+    return [labels] if isinstance(labels, str) else list(labels)
+
+
+class LabelIndex:
+    """Labels of one multi-valued text column, as a vocabulary plus CSR arrays.
+
+    Attributes:
+        index: the row labels of the original column
+        vocabulary: the distinct labels, in order of first appearance
+        indptr, indices: row ``i``'s label numbers are ``indices[indptr[i]:indptr[i + 1]]``
+        postings_ptr, postings: label ``j``'s row numbers are
+            ``postings[postings_ptr[j]:postings_ptr[j + 1]]``, in order
+    """
+
+    def __init__(self, values: pd.Series, sep: str = DEFAULT_SEP, lower: bool = False):
+        self.index = values.index
+        self.sep = sep
+        self.lower = lower
+
+        # Split only this column, once; empty pieces and missing values carry no label
+        split = values.astype("string").str.split(sep)
+        rows = np.repeat(np.arange(len(values)), split.str.len().fillna(1).astype(int).to_numpy())
+        pieces = split.explode().str.strip()
+        if lower:
+            pieces = pieces.str.lower()
+        keep = (pieces.fillna("") != "").to_numpy()
+        codes, vocabulary = pd.factorize(pieces[keep].to_numpy())
+        rows = rows[keep]
+
+        # Sort by row, and drop a label repeated within one row ("Lullaby; Lullaby")
+        size = max(len(vocabulary), 1)
+        pairs = np.unique(rows.astype(np.int64) * size + codes)
+        rows, codes = pairs // size, pairs % size
+
+        self.vocabulary = pd.Index(vocabulary, name=values.name)
+        self.indices = codes.astype(np.int32)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(values)))])
+        order = np.argsort(codes, kind="stable")
+        self.postings = rows[order].astype(np.int32)
+        self.postings_ptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+        self._lookup = {label: i for i, label in enumerate(self.vocabulary)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, label):
+        return self._normalize(label) in self._lookup
+
+    def _normalize(self, label: str) -> str:
+        label = label.strip()
+        return label.lower() if self.lower else label
+
+    def rows(self, label: str) -> np.ndarray:
+        """Row numbers (positions) that carry ``label``; empty if it is unknown."""
+        code = self._lookup.get(self._normalize(label))
+        if code is None:
+            return np.array([], dtype=np.int32)
+        return self.postings[self.postings_ptr[code]:self.postings_ptr[code + 1]]
+
+    def mask(self, labels: Labels, how: str = "any") -> np.ndarray:
+        """Bool array over rows: rows with any (``how="any"``) or all (``"all"``) of ``labels``.
+
+        Combine masks with ``&``, ``|`` and ``~`` for other boolean queries.
+        """
+        labels = _as_list(labels)
+        counts = np.zeros(len(self), dtype=np.int32)
+        for label in labels:
+            counts[self.rows(label)] += 1
+        return counts == len(labels) if how == "all" else counts > 0
+
+    def labels(self, row: int) -> list:
+        """The labels of the row at position ``row``."""
+        return self.vocabulary[self.indices[self.indptr[row]:self.indptr[row + 1]]].tolist()
+
+    def value_counts(self, rows: Optional[np.ndarray] = None) -> pd.Series:
+        """Rows per label, most common first; ``rows`` (a bool mask) restricts the count."""
+        if rows is None:
+            counts = np.diff(self.postings_ptr)
+        else:
+            counts = np.bincount(self.indices[np.repeat(rows, np.diff(self.indptr))], minlength=len(self.vocabulary))
+        return pd.Series(counts, index=self.vocabulary, name="count").sort_values(ascending=False, kind="stable")
+
+    def crosstab(self, other: pd.Series, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Labels x values of ``other`` (e.g. ``songs["Region"]``): rows having both.
+
+        ``other`` must have the same rows, in the same order, as the indexed column.
+        """
+        row_of_label = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        other_codes, other_values = pd.factorize(other.to_numpy(), sort=True)
+        keep = other_codes[row_of_label] >= 0
+        if rows is not None:
+            keep &= rows[row_of_label]
+        cells = self.indices[keep].astype(np.int64) * len(other_values) + other_codes[row_of_label[keep]]
+        counts = np.bincount(cells, minlength=len(self.vocabulary) * len(other_values))
+        return pd.DataFrame(counts.reshape(len(self.vocabulary), len(other_values)),
+                            index=self.vocabulary, columns=pd.Index(other_values, name=other.name))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long form (row label, label) pairs, like ``explode`` on this column alone."""
+        row_of_label = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return pd.DataFrame({self.index.name or "row": self.index[row_of_label],
+                             self.vocabulary.name or "label": self.vocabulary[self.indices]})
+
+
+class SongLabels:
+    """``LabelIndex`` for each multi-valued field of a table such as the Global Jukebox songs."""
+
+    def __init__(self, songs: pd.DataFrame, fields: Iterable[str] = DEFAULT_FIELDS, sep: str = DEFAULT_SEP,
+                 lower: bool = False):
+        self.songs = songs
+        self.indexes = {field: LabelIndex(songs[field], sep=sep, lower=lower)
+                        for field in fields if field in songs.columns}
+
+    def __getitem__(self, field: str) -> LabelIndex:
+        return self.indexes[field]
+
+    def mask(self, how: str = "any", **labels: Labels) -> np.ndarray:
+        """Rows matching every field given, e.g. ``mask(Genre="Lullaby", Instruments=["Drum"])``."""
+        result = np.ones(len(self.songs), dtype=bool)
+        for field, field_labels in labels.items():
+            result &= self.indexes[field].mask(field_labels, how=how)
+        return result
+
+    def filter(self, how: str = "any", **labels: Labels) -> pd.DataFrame:
+        """The songs matching :meth:`mask`."""
+        return self.songs[self.mask(how=how, **labels)]
+
+    def value_counts(self, field: str, **labels: Labels) -> pd.Series:
+        """Label counts for ``field``, optionally among songs matching other fields."""
+        return self.indexes[field].value_counts(self.mask(**labels) if labels else None)
+
+    def crosstab(self, field: str, by: str = "Region", **labels: Labels) -> pd.DataFrame:
+        """Labels of ``field`` x values of column ``by``, optionally among matching songs."""
+        return self.indexes[field].crosstab(self.songs[by], self.mask(**labels) if labels else None)
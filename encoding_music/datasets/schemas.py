@@ -0,0 +1,84 @@
+"""Declared column types for the lab datasets.
+
+``pd.read_csv`` with no arguments stores every text column as Python
+objects (or strings) and every number as 64 bits.  For the Billboard and
+Spotify tables that wastes most of the memory: a few hundred artist and
+album names repeat on every row, audio features never need more than
+float32 precision, and durations and keys fit in small integers.
+
+A schema here is a plain dict of ``column -> dtype`` (any dtype pandas
+accepts, including ``"category"``), plus optional renames, date formats and
+value replacements, applied with :func:`apply_schema`.
+"""
+
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+AUDIO_FEATURES = ["danceability", "energy", "speechiness", "acousticness",
+                  "instrumentalness", "liveness", "valence", "loudness", "tempo"]
+
+
+@dataclass
+class Schema:
+    """Column types for one kind of table.
+
+    Attributes:
+        dtypes: column -> dtype; columns not listed keep what ``read_csv`` gave
+        renames: old column name -> new name, applied first
+        dates: column -> ``strftime`` format for ``pd.to_datetime``
+        replace: column -> {old value: new value}, applied before casting
+        drop: columns to remove (e.g. a saved index)
+    """
+    dtypes: dict
+    renames: dict = field(default_factory=dict)
+    dates: dict = field(default_factory=dict)
+    replace: dict = field(default_factory=dict)
+    drop: list = field(default_factory=list)
+
+    def read_csv_dtypes(self) -> dict:
+        """Types that can be given to ``read_csv`` directly (text as string or category).
+
+        Numeric columns are cast afterwards instead, since a stray value
+        ("Major" in a ``mode`` column) would make ``read_csv`` fail.
+        """
+        reverse = {new: old for old, new in self.renames.items()}
+        return {reverse.get(column, column): dtype for column, dtype in self.dtypes.items()
+                if dtype in ("category", "string") and column not in self.replace}
+
+
+def apply_schema(df: pd.DataFrame, schema: Schema) -> pd.DataFrame:
+    """Return ``df`` with the schema's renames, replacements, dates and dtypes applied."""
+    df = df.drop(columns=[c for c in schema.drop if c in df.columns])
+    df = df.rename(columns=schema.renames)
+    for column, mapping in schema.replace.items():
+        if column in df.columns:
+            df[column] = df[column].replace(mapping)
+    for column, date_format in schema.dates.items():
+        if column in df.columns:
+            dates = pd.to_datetime(df[column], format=date_format, errors="coerce")
+            if "%y" in date_format:
+                # Two-digit years: "03.14.64" is 1964, not 2064
+                future = dates > pd.Timestamp.now()
+                dates = dates.where(~future, dates - pd.DateOffset(years=100))
+            df[column] = dates
+    for column, dtype in schema.dtypes.items():
+        if column not in df.columns or str(df[column].dtype) == str(dtype):
+            continue
+        if dtype not in ("category", "string") and df[column].dtype.kind not in "biuf":
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        if df[column].isna().any() and pd.api.types.is_integer_dtype(dtype):
+            # Plain NumPy integers cannot hold missing values
+            dtype = str(dtype).capitalize()
+        df[column] = df[column].astype(dtype)
+    return df
+
+
+def read_csv(path, schema: Schema, **kwargs) -> pd.DataFrame:
+    """``pd.read_csv`` followed by :func:`apply_schema`."""
+    return apply_schema(pd.read_csv(path, dtype=schema.read_csv_dtypes(), **kwargs), schema)
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Deep memory usage of a frame in bytes (strings included)."""
+    return int(df.memory_usage(deep=True).sum())
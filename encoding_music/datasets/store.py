@@ -0,0 +1,223 @@
+"""Versioned Arrow/Parquet storage for lab data stages.
+
+The Beatles lab ships its intermediate stages as pandas pickles
+(``beatles_billboard_spotify_combined_raw.pkl``,
+``our_clean_beatles_data.pkl``, ``beatles_data_combined_clean_tidy.pkl``).
+Pickles only load with a compatible pandas, always load every column, and
+have to be read completely before anything can be used.
+
+``DatasetStore`` keeps each stage as a series of versioned files instead:
+
+* Arrow IPC (Feather v2, uncompressed) by default, which can be memory
+  mapped, so reading a few columns touches only those columns' bytes;
+  Parquet if a smaller file matters more than load time
+* each file records the stage name, version, pandas version, content hash
+  and source file in its schema metadata
+* writing identical data again does not create a new version
+
+``load_stage`` converts a pickle the first time it is asked for (or when
+the pickle changes) and reads from the store after that::
+
+    from encoding_music.datasets import load_stage
+
+    tidy = load_stage("02_Lab_Data/Beatles/beatles_data_combined_clean_tidy.pkl",
+                      columns=["song", "audio_feature", "value"])
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+METADATA_KEY = b"encoding_music"
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a frame to an Arrow table, turning mixed-type object columns into strings."""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for column in df.columns:
+            if df[column].dtype == object:
+                try:
+                    pa.array(df[column], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    df[column] = df[column].map(lambda v: None if pd.isna(v) else str(v)).astype("string")
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def from_arrow(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table back to a frame, with list columns as Python lists."""
+    df = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            # Arrow gives NumPy arrays; the pickles (and the tutorials) use lists
+            df[field.name] = df[field.name].map(lambda v: v.tolist() if v is not None else v)
+    return df
+
+
+def table_hash(table: pa.Table) -> str:
+    """Hash of a table's schema and contents, used to skip writing unchanged data."""
+    digest = hashlib.sha256(table.schema.remove_metadata().to_string().encode("utf-8"))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema.remove_metadata()) as writer:
+        writer.write_table(table.replace_schema_metadata(None))
+    digest.update(sink.getvalue().to_pybytes())
+    return digest.hexdigest()
+
+
+class DatasetStore:
+    """A folder of named stages, each a sequence of versioned Arrow or Parquet files."""
+
+    def __init__(self, root, format: str = "arrow"):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {list(FORMATS)}")
+        self.root = Path(root)
+        self.format = format
+
+    def stages(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    def _files(self, stage: str) -> dict:
+        """version -> path, for every stored version of ``stage``."""
+        folder = self.root / stage
+        if not folder.exists():
+            return {}
+        files = {}
+        for path in folder.iterdir():
+            if path.suffix in FORMATS.values() and path.stem.startswith("v") and path.stem[1:].isdigit():
+                files[int(path.stem[1:])] = path
+        return dict(sorted(files.items()))
+
+    def versions(self, stage: str) -> list[int]:
+        return list(self._files(stage))
+
+    def latest(self, stage: str) -> Optional[int]:
+        versions = self.versions(stage)
+        return versions[-1] if versions else None
+
+    def metadata(self, stage: str, version: Optional[int] = None) -> dict:
+        """The stage/version/hash/source record stored with a version (the latest by default)."""
+        path = self._path(stage, version)
+        schema = pq.read_schema(path) if path.suffix == ".parquet" else feather.read_table(path, columns=[]).schema
+        return json.loads((schema.metadata or {}).get(METADATA_KEY, b"{}"))
+
+    def _path(self, stage: str, version: Optional[int] = None) -> Path:
+        files = self._files(stage)
+        if not files:
+            raise KeyError(f"No stored versions of stage {stage!r} in {self.root}")
+        version = max(files) if version is None else version
+        if version not in files:
+            raise KeyError(f"Stage {stage!r} has no version {version}")
+        return files[version]
+
+    def write(self, stage: str, df: pd.DataFrame, source=None) -> int:
+        """Store ``df`` as a new version of ``stage`` unless it equals the latest one.
+
+        ``source`` (a file path) is recorded with its SHA-256 so converted
+        files can be checked for staleness.  Returns the version number.
+        """
+        table = to_arrow(df)
+        content_hash = table_hash(table)
+        latest = self.latest(stage)
+        if latest is not None and self.metadata(stage, latest).get("content_hash") == content_hash:
+            return latest
+
+        version = (latest or 0) + 1
+        record = {
+            "stage": stage,
+            "version": version,
+            "content_hash": content_hash,
+            "pandas_version": pd.__version__,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": table.num_rows,
+        }
+        if source is not None:
+            stat = Path(source).stat()
+            record["source"] = Path(source).name
+            record["source_sha256"] = file_sha256(source)
+            record["source_size"] = stat.st_size
+            record["source_mtime_ns"] = stat.st_mtime_ns
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(record).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+
+        folder = self.root / stage
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"v{version}{FORMATS[self.format]}"
+        tmp_path = path.with_suffix(".tmp")
+        if self.format == "parquet":
+            pq.write_table(table, tmp_path)
+        else:
+            # Uncompressed so the file can be memory mapped without decoding
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return version
+
+    def read_table(self, stage: str, columns: Optional[list] = None, version: Optional[int] = None,
+                   memory_map: bool = True) -> pa.Table:
+        """The stage as an Arrow table; with Arrow files and ``memory_map`` nothing is copied."""
+        path = self._path(stage, version)
+        if path.suffix == ".parquet":
+            return pq.read_table(path, columns=columns, memory_map=memory_map)
+        return feather.read_table(path, columns=columns, memory_map=memory_map)
+
+    def read(self, stage: str, columns: Optional[list] = None, version: Optional[int] = None,
+             memory_map: bool = True) -> pd.DataFrame:
+        """The stage (or some of its columns) as a DataFrame, with the original pandas dtypes."""
+        return from_arrow(self.read_table(stage, columns, version, memory_map))
+
+    def source_is_current(self, stage: str, source) -> bool:
+        """Whether the latest version was converted from the current contents of ``source``."""
+        if self.latest(stage) is None:
+            return False
+        record = self.metadata(stage)
+        stat = Path(source).stat()
+        # Same size and mtime: skip hashing the file
+        if (record.get("source_size"), record.get("source_mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+            return True
+        return record.get("source_sha256") == file_sha256(source)
+
+    def import_pickle(self, path, stage: Optional[str] = None) -> int:
+        """Store a pickled DataFrame as a stage (named after the file), unless already current."""
+        path = Path(path)
+        stage = stage or path.stem
+        if self.source_is_current(stage, path):
+            return self.latest(stage)
+        return self.write(stage, pd.read_pickle(path), source=path)
+
+    def import_pickles(self, directory) -> dict:
+        """Convert every ``*.pkl`` in ``directory``; returns stage -> version."""
+        return {path.stem: self.import_pickle(path) for path in sorted(Path(directory).glob("*.pkl"))}
+
+
+def default_store(path) -> DatasetStore:
+    """The store kept in a ``stages`` folder beside a lab data file."""
+    return DatasetStore(Path(path).parent / "stages")
+
+
+def load_stage(path, columns: Optional[list] = None, store: Optional[DatasetStore] = None) -> pd.DataFrame:
+    """Read a pickled lab stage through the store, converting it first if needed."""
+    path = Path(path)
+    store = store or default_store(path)
+    store.import_pickle(path)
+    return store.read(path.stem, columns=columns)
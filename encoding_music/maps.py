@@ -0,0 +1,115 @@
+"""The maps guide's helpers: coordinates for places, and maps drawn from a frame.
+
+``get_coordinates`` keeps the guide's signature but goes through a shared
+:class:`~encoding_music.datasets.geocoding.Geocoder`, so each place is asked
+about once and remembered between sessions.  ``places_map`` and
+``journeys_map`` build the guide's Plotly ``Scattermapbox`` figures (a
+marker per place; a line from birthplace to deathplace per person) straight
+from dataframe columns::
+
+    from encoding_music.maps import get_coordinates, journeys_map, places_map
+
+    get_coordinates("Haverford College")          # (40.007..., -75.306...)
+    places_map(df, text="Place").show()
+    journeys_map(rilm_df, color_by="b_place_uplvl2").show()
+
+Plotly is imported only when a map is drawn.
+"""
+
+from typing import Optional
+
+import pandas as pd
+
+from .tracing import traced
+
+_geocoder = None
+
+
+def default_geocoder():
+    """The ``Geocoder`` shared by ``get_coordinates`` (cached on disk, Nominatim behind it)."""
+    global _geocoder
+    if _geocoder is None:
+        from .datasets.geocoding import Geocoder
+
+        _geocoder = Geocoder()
+    return _geocoder
+
+
+def get_coordinates(address, geocoder=None) -> Optional[tuple]:
+    """``(latitude, longitude)`` of a place, or ``None`` if it cannot be found."""
+    return (geocoder or default_geocoder()).locate(address)
+
+
+def _layout(fig, latitudes: pd.Series, longitudes: pd.Series, zoom: float, width: int, height: int):
+    # Centre on the mean of the places, as in the guide
+    fig.update_layout(mapbox_style="open-street-map", mapbox_zoom=zoom,
+                      mapbox_center_lat=float(latitudes.mean()), mapbox_center_lon=float(longitudes.mean()),
+                      width=width, height=height, margin={"l": 0, "r": 0, "t": 40, "b": 0})
+    return fig
+
+
+@traced("render")
+def places_map(df: pd.DataFrame, latitude: str = "Latitude", longitude: str = "Longitude",
+               text: Optional[str] = None, color=None, size=15, lines: bool = False, zoom: float = 10,
+               width: int = 800, height: int = 800):
+    """One marker per row (optionally joined by lines), hover text from column ``text``.
+
+    ``color`` and ``size`` are a single value or the name of a column.
+    """
+    import plotly.graph_objects as go
+
+    df = df.dropna(subset=[latitude, longitude])
+    marker = {"size": df[size] if isinstance(size, str) and size in df.columns else size}
+    if color is not None:
+        marker["color"] = df[color] if isinstance(color, str) and color in df.columns else color
+    fig = go.Figure(go.Scattermapbox(
+        lat=df[latitude], lon=df[longitude], mode="markers+lines" if lines else "markers", marker=marker,
+        hovertext=df[text] if text else None, hoverinfo="text" if text else None))
+    return _layout(fig, df[latitude], df[longitude], zoom, width, height)
+
+
+def color_map(values: pd.Series, palette=None) -> dict:
+    """A colour for each distinct value, cycling through a Plotly palette (``Dark24`` by default)."""
+    if palette is None:
+        import plotly.express as px
+
+        palette = px.colors.qualitative.Dark24
+    return {value: palette[i % len(palette)] for i, value in enumerate(values.dropna().unique())}
+
+
+@traced("render")
+def journeys_map(df: pd.DataFrame, start=("b_lat_decimal", "b_long_decimal"), end=("d_lat_decimal", "d_long_decimal"),
+                 name: str = "name", color_by: Optional[str] = "b_place_uplvl2", missing_color: str = "#440154",
+                 hover: Optional[str] = ("{name}<br>Born in {b_place_uplvl1} on {born_dt}"
+                                         "<br>Died in {d_place_uplvl1} on {died_dt}"),
+                 zoom: float = 4, width: int = 1000, height: int = 800):
+    """A line from start to end for every row (the guide's birth-to-death map of RILM guitarists).
+
+    Lines and markers are coloured by ``color_by``; ``hover`` is formatted
+    with each row's columns.  All lines are one trace per colour, and all
+    markers one trace, rather than two traces per person.
+    """
+    import plotly.graph_objects as go
+
+    df = df.dropna(subset=list(start) + list(end))
+    colors = df[color_by].map(color_map(df[color_by])).fillna(missing_color) if color_by \
+        else pd.Series(missing_color, index=df.index)
+
+    fig = go.Figure()
+    for color, group in df.groupby(colors, sort=False):
+        # None between segments breaks the line, so one trace draws every journey of this colour
+        n = len(group)
+        lat = pd.concat([group[start[0]], group[end[0]], pd.Series([None] * n, index=group.index)]).sort_index(
+            kind="stable")
+        lon = pd.concat([group[start[1]], group[end[1]], pd.Series([None] * n, index=group.index)]).sort_index(
+            kind="stable")
+        label = group[color_by].iloc[0] if color_by and pd.notna(group[color_by].iloc[0]) else "unknown"
+        fig.add_trace(go.Scattermapbox(lat=lat.tolist(), lon=lon.tolist(), mode="lines", hoverinfo="skip",
+                                       line={"width": 1, "color": color}, name=str(label)))
+
+    texts = [hover.format(**row) for row in df.to_dict("records")] if hover else None
+    fig.add_trace(go.Scattermapbox(
+        lat=pd.concat([df[start[0]], df[end[0]]]).tolist(), lon=pd.concat([df[start[1]], df[end[1]]]).tolist(),
+        mode="markers", marker={"size": 9, "color": pd.concat([colors, colors]).tolist()},
+        hovertext=texts * 2 if texts else None, hoverinfo="text" if texts else "skip", showlegend=False))
+    return _layout(fig, df[start[0]], df[start[1]], zoom, width, height)
@@ -0,0 +1,164 @@
+"""The MEI guide's helpers: load MEI files as Beautiful Soup trees, draw them, list their notes.
+
+``get_xml`` and ``open_file`` return the parsed soup (the guide's
+``getXML`` returned the text, to be parsed in the next cell, and is kept
+under that name).  ``create_network`` turns any element into a NetworkX
+tree and ``display_network`` draws it with Pyvis::
+
+    from encoding_music import mei
+
+    soup = mei.get_xml("https://crimproject.org/mei/CRIM_Model_0019.mei")
+    mei.display_network(mei.create_network(soup.find("measure", {"n": 1})), "measure.html", notebook=False)
+    mei.extract_notes_simplified(soup)[:8]
+    mei.calculate_ficta_factors(["https://crimproject.org/mei/CRIM_Model_0019.mei", "Updates/Model_0036.mei"])
+
+Beautiful Soup, chardet, NetworkX and Pyvis are imported only when used.
+"""
+
+import os
+import re
+import textwrap
+from typing import Iterable
+
+from .tracing import count, traced
+
+# MEI accidental values as conventional symbols
+ACCIDENTALS = {"s": "#", "f": "b", "n": ""}
+
+
+@traced("fetch")
+def getXML(url: str, timeout: float = 60) -> str:
+    """The text of the MEI file at ``url``."""
+    import requests
+
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    count("bytes_fetched", len(response.content))
+    return response.text
+
+
+@traced("parse")
+def get_xml(url: str, timeout: float = 60):
+    """The MEI file at ``url``, parsed."""
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(getXML(url, timeout), "xml")
+
+
+@traced("parse")
+def open_file(filename):
+    """A local MEI file, parsed, whatever its text encoding."""
+    import chardet
+    from bs4 import BeautifulSoup
+
+    with open(filename, "rb") as file:
+        content = file.read()
+    encoding = chardet.detect(content)["encoding"] or "utf-8"
+    return BeautifulSoup(content.decode(encoding), "xml")
+
+
+def format_element(tag, wrap_length: int = 20, exclude: Iterable[str] = ()) -> str:
+    """``"name (attr=value ...)"``, wrapped to ``wrap_length`` characters."""
+    attrs_list = [f"{a}={v}" for a, v in tag.attrs.items() if a not in exclude]
+    formatted_string = f"{tag.name} ({' '.join(attrs_list)})" if attrs_list else tag.name
+    return textwrap.fill(formatted_string, wrap_length)
+
+
+@traced("analyze")
+def create_network(tag, with_attributes: bool = False, attrs_to_exclude: Iterable[str] = ()):
+    """A directed graph of ``tag`` and every element inside it, each linked to its children.
+
+    Nodes are sized by their number of descendants and grouped and levelled
+    by their depth in the document.
+    """
+    import networkx as nx
+
+    all_tags = [tag] + tag.find_all()
+    G = nx.DiGraph()
+    for node in all_tags:
+        depth = len(list(node.parents))
+        G.add_node(id(node),
+                   label=format_element(node, exclude=attrs_to_exclude) if with_attributes else node.name,
+                   value=len(list(node.descendants)), group=depth, level=depth,
+                   scaling={"label": {"enabled": True}})
+    for node in all_tags:
+        for child in node.children:
+            if child.name:
+                G.add_edge(id(node), id(child), arrows="to",
+                           id=f"{id(node)}_{node.name}|{id(child)}_{child.name}")
+    count("edges_built", G.number_of_edges())
+    return G
+
+
+@traced("render")
+def display_network(network, filename: str = "tmp.html", width=900, height=900, bgcolor: str = "white",
+                    font_color: str = "black", notebook: bool = True):
+    """Draw a graph from ``create_network`` with Pyvis, saved as ``filename``."""
+    from pyvis.network import Network
+
+    nt = Network(notebook=notebook, width=width, height=height, bgcolor=bgcolor, font_color=font_color)
+    nt.from_nx(network)
+    if notebook:
+        return nt.show(filename)
+    nt.save_graph(filename)
+    return filename
+
+
+@traced("parse")
+def extract_notes_simplified(soup) -> list:
+    """Every note's pitch name with its accidental: ``["G", "F#", "Bb", ...]``.
+
+    Accidentals from the key signature are ``accid.ges`` attributes of the
+    note; those written in the bar are ``<accid>`` children of the note.
+    """
+    note_list = []
+    for note in soup.find_all("note"):
+        pname = note.get("pname")
+        if not pname:
+            continue
+        clean_tone = pname.upper()
+        accid = note.get("accid.ges")
+        if not accid:
+            accid_elem = note.find("accid")
+            accid = accid_elem and (accid_elem.get("accid.ges") or accid_elem.get("accid"))
+        if accid:
+            clean_tone += ACCIDENTALS.get(accid, "")
+        note_list.append(clean_tone)
+    count("notes_parsed", len(note_list))
+    return note_list
+
+
+def _person(soup, role: str) -> str:
+    # The exact role first; the duos only have "xml_editor" and "mei_editor"
+    person = soup.find("persName", {"role": role}) or soup.find("persName", {"role": re.compile(f"{role}$")})
+    return person.text.strip() if person else ""
+
+
+def ficta_factor(soup) -> float:
+    """Editorial accidentals (``<accid func="edit">``) per note."""
+    notes = edited = 0
+    for element in soup.find_all(["note", "accid"]):
+        if element.name == "note":
+            notes += 1
+        elif element.get("func") == "edit":
+            edited += 1
+    return edited / notes if notes else 0.0
+
+
+@traced("analyze")
+def ficta_table(soups: dict):
+    """File name, composer, editor and ficta factor of each parsed piece, binned low/medium/high."""
+    import pandas as pd
+
+    df = pd.DataFrame([{"file_name": name, "composer": _person(soup, "composer"),
+                        "editor": _person(soup, "editor"), "ficta_factor": ficta_factor(soup)}
+                       for name, soup in soups.items()])
+    df["ficta_bins"] = pd.cut(df["ficta_factor"], bins=3, labels=["low", "medium", "high"])
+    return df
+
+
+def calculate_ficta_factors(corpus_list: Iterable[str]):
+    """The guide's table of ficta factors for MEI files given as URLs or local paths."""
+    soups = {os.path.basename(piece): get_xml(piece) if re.match(r"https?://", str(piece)) else open_file(piece)
+             for piece in corpus_list}
+    return ficta_table(soups)
@@ -0,0 +1,206 @@
+"""The networks guide's helpers: Louvain communities, Pyvis pages, feature and Spotify networks.
+
+The guide repeats the same few steps in every example: build a NetworkX
+graph, colour it by Louvain community, hand it to a black Pyvis
+``Network`` with ForceAtlas2 physics, and save the HTML.  Those steps are
+``add_communities`` and ``save_network`` here, and the guide's complete
+examples become single calls::
+
+    from encoding_music.networks import add_related_artists, feature_network
+
+    G = feature_network(beatles_spotify, "song", "danceability", 0.005, "dance.html")
+
+    artists = pyvis_network()
+    artists.add_node("The Beatles", value=100, group=0)
+    add_related_artists("The Beatles", "3WrFJ7ztbogyGnTHbHJFl2", artists, 10, sp)
+
+``feature_graph`` (behind ``feature_network``) finds every pair of songs
+within ``threshold`` of each other by sorting the feature once, instead of
+scanning the whole frame for each row.  NetworkX, Pyvis and python-louvain are imported only when used.
+"""
+
+from collections import Counter
+from copy import deepcopy
+from itertools import combinations
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .tracing import count, traced
+
+# The physics every graph in the guides uses
+FORCE_ATLAS_OPTIONS = """
+{
+  "physics": {
+    "enabled": true,
+    "forceAtlas2Based": {"springLength": 1},
+    "solver": "forceAtlas2Based"
+  }
+}
+"""
+
+
+@traced("analyze")
+def add_communities(G):
+    """A copy of ``G`` with each node's Louvain community stored as its ``group``."""
+    import networkx as nx
+    from community import community_louvain
+
+    G = deepcopy(G)
+    partition = community_louvain.best_partition(G)
+    nx.set_node_attributes(G, partition, "group")
+    return G
+
+
+def pyvis_network(width="1000", height="1000", notebook: bool = False, physics: bool = True, **kwargs):
+    """An empty Pyvis ``Network`` in the guides' style: black background, white labels, ForceAtlas2."""
+    from pyvis import network as net
+
+    network_graph = net.Network(width=width, height=height, notebook=notebook, bgcolor="black",
+                                font_color="white", **kwargs)
+    if physics:
+        network_graph.set_options(FORCE_ATLAS_OPTIONS)
+    return network_graph
+
+
+@traced("render")
+def save_network(G, filename, width="1000", height="1000", communities: bool = False, **kwargs) -> Path:
+    """Draw a NetworkX graph with Pyvis and save it as ``filename`` (an ``.html`` page)."""
+    if not str(filename).endswith(".html"):
+        raise TypeError("Your output file must end in .html")
+    if communities:
+        G = add_communities(G)
+    network_graph = pyvis_network(width, height, **kwargs)
+    network_graph.from_nx(G)
+    network_graph.save_graph(str(filename))
+    return Path(filename)
+
+
+def unique_pairs(groups: Iterable[Iterable]) -> list:
+    """Every distinct pair of different items that share a group, each pair sorted.
+
+    The guides' ``combinations`` + ``_clean_pairs``: a pair and its reverse
+    count once, and an item is never paired with itself.
+    """
+    return sorted(pair_counts(groups))
+
+
+def pair_counts(groups: Iterable[Iterable]) -> Counter:
+    """How many groups each (sorted) pair of different items shares: the edge weights."""
+    counts = Counter()
+    for group in groups:
+        items = sorted(set(map(str, group)))
+        counts.update(combinations(items, 2))
+    return counts
+
+
+def _close_pairs(values: np.ndarray, threshold: float):
+    # Positions (i, j), i < j in sorted order, with abs(values[i] - values[j]) <= threshold
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    # ordered + threshold rounds differently from the guide's subtraction
+    # (0.423 - 0.418 > 0.005), so take a few ulps more and then filter exactly
+    bound = ordered + threshold
+    ends = np.searchsorted(ordered, bound + 4 * np.spacing(np.abs(bound)), side="right")
+    counts = ends - np.arange(len(ordered)) - 1
+    first = np.repeat(np.arange(len(ordered)), counts)
+    # Offsets 1..count within each run
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    i, j = order[first], order[first + offsets]
+    close = np.abs(values[i] - values[j]) <= threshold
+    return i[close], j[close]
+
+
+@traced("analyze")
+def feature_graph(df: pd.DataFrame, song_column: str, feature: str, threshold: float, communities: bool = True):
+    """Songs linked when their values of ``feature`` are within ``threshold``, as a NetworkX graph.
+
+    Edges are heavier the closer the two values, ``(1 - difference / largest
+    difference) * 5``, and each node's ``title`` (its tooltip) shows its value.
+    """
+    import networkx as nx
+
+    if feature not in df.columns:
+        raise KeyError(f"Not a valid feature. Features are: {', '.join(map(repr, df.columns))}")
+
+    rows = df[[song_column, feature]].dropna()
+    songs = rows[song_column].astype(str).to_numpy()
+    values = rows[feature].astype("float64").to_numpy()
+    # As in the guide, the weight and tooltip use each song's first value
+    first_value = pd.Series(values, index=songs).groupby(level=0, sort=False).first()
+
+    i, j = _close_pairs(values, threshold)
+    keep = songs[i] != songs[j]
+    edges = pd.DataFrame({"u": np.minimum(songs[i][keep], songs[j][keep]),
+                          "v": np.maximum(songs[i][keep], songs[j][keep])}).drop_duplicates()
+    # Plain lists: iterating string columns one value at a time is slow
+    u, v = edges["u"].tolist(), edges["v"].tolist()
+    difference = np.abs(first_value.loc[u].to_numpy() - first_value.loc[v].to_numpy())
+    largest = difference.max() if len(difference) else 0
+    weights = (1 - difference / largest) * 5 if largest else np.full(len(difference), 5.0)
+
+    G = nx.Graph()
+    linked = set(u) | set(v)
+    G.add_nodes_from(song for song in dict.fromkeys(songs.tolist()) if song in linked)
+    G.add_weighted_edges_from(zip(u, v, weights.tolist()))
+    count("edges_built", G.number_of_edges())
+    if communities and len(G):
+        G = add_communities(G)
+    value_of = first_value.to_dict()
+    nx.set_node_attributes(G, {node: f"{feature}: {value_of[node]}" for node in G}, "title")
+    return G
+
+
+def feature_network(df: pd.DataFrame, song_column: str, feature: str, threshold: float, output_name,
+                    communities: bool = True):
+    """The guide's feature network: ``feature_graph`` drawn with Pyvis and saved to ``output_name``.
+
+    Returns the NetworkX graph.
+    """
+    if not str(output_name).endswith(".html"):
+        raise TypeError("Your output file must end in .html")
+    G = feature_graph(df, song_column, feature, threshold, communities)
+    save_network(G, output_name)
+    return G
+
+
+def _node_names(graph) -> set:
+    # Pyvis networks and NetworkX graphs list their nodes differently
+    return set(graph.get_nodes() if hasattr(graph, "get_nodes") else graph.nodes())
+
+
+def add_related_artists(starting_artist_name, starting_artist_id, existing_graph, limit, spotipy_client,
+                        order_group: Optional[int] = None) -> pd.DataFrame:
+    """Add up to ``limit`` of Spotify's related artists to a Pyvis or NetworkX graph.
+
+    New artists are sized by popularity and grouped by ``order_group`` (or
+    by their rank).  Returns the related artists, for the next generation.
+    """
+    related = pd.DataFrame(spotipy_client.artist_related_artists(starting_artist_id)["artists"])
+    nodes = _node_names(existing_graph)
+    for i, artist in enumerate(related.head(limit).itertuples()):
+        if artist.name not in nodes:
+            existing_graph.add_node(artist.name, value=int(artist.popularity), group=order_group or (i + 1))
+            nodes.add(artist.name)
+        existing_graph.add_edge(starting_artist_name, artist.name)
+    return related
+
+
+def add_related_songs(starting_song_name, starting_artist_name, starting_song_id, existing_graph, limit,
+                      spotipy_client, first_gen: bool = True, order_group: Optional[int] = None) -> pd.DataFrame:
+    """Add up to ``limit`` of Spotify's recommended tracks, as "Artist: Title" nodes.
+
+    Returns the recommended tracks.
+    """
+    related = pd.DataFrame(spotipy_client.recommendations(seed_tracks=[starting_song_id])["tracks"])
+    start = f"{starting_artist_name}: {starting_song_name}"
+    nodes = _node_names(existing_graph)
+    for i, track in enumerate(related.head(limit).itertuples()):
+        name = f"{track.artists[0]['name']}: {track.name}"
+        if name not in nodes:
+            existing_graph.add_node(name, value=int(track.popularity), group=order_group or (i + 1))
+            nodes.add(name)
+        existing_graph.add_edge(start, name)
+    return related
@@ -0,0 +1,28 @@
+"""Retrieval-augmented generation helpers for the RAG tutorial."""
+
+from .._lazy import lazy_attributes
+
+_EXPORTS = {
+    "iter_chunks": ".chunking",
+    "join_pages": ".chunking",
+    "split_text": ".chunking",
+    "HashingEmbedding": ".embeddings",
+    "EmbeddingIndex": ".index",
+    "file_hash": ".index",
+    "load_metadata_csv": ".index",
+    "read_pdf_pages": ".index",
+    "IngestReport": ".ingest",
+    "extract_file": ".ingest",
+    "hash_file": ".ingest",
+    "ingest_directory": ".ingest",
+    "ingest_files": ".ingest",
+    "iter_extracted": ".ingest",
+    "BM25Index": ".retrieval",
+    "HybridRetriever": ".retrieval",
+    "MetadataIndex": ".retrieval",
+    "benchmark_recall": ".retrieval",
+    "clean_filter": ".retrieval",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_attributes(__name__, attributes=_EXPORTS)
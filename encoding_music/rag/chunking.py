@@ -0,0 +1,84 @@
+"""Text chunking for the RAG pipeline.
+
+``split_text`` follows the same idea as LangChain's
+``RecursiveCharacterTextSplitter`` used in the RAG tutorial: chunks of at
+most ``chunk_size`` characters, each sharing at least ``chunk_overlap``
+characters with the next, preferring to break at paragraph gaps, then line
+breaks, then spaces.  It also returns each chunk's character offset in the source text, which the
+embedding index uses as part of the chunk key.
+"""
+
+import re
+from typing import Iterable, Iterator
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 200
+SEPARATORS = ("\n\n", "\n", " ")
+NON_SPACE = re.compile(r"\S")
+
+
+def join_pages(pages: Iterable[str]) -> str:
+    """Join page texts into one document string in a single pass."""
+    return "".join(pages)
+
+
+def _break_point(text: str, start: int, end: int, min_end: int) -> int:
+    """Best place to end a chunk in text[start:end], at or after ``min_end``."""
+    for separator in SEPARATORS:
+        position = text.rfind(separator, min_end, end)
+        if position != -1:
+            return position + len(separator)
+    return end
+
+
+def _word_start(text: str, position: int, low: int) -> int:
+    """The last start of a word in ``text[low:position + 1]``, else the nearest non-space to ``position``."""
+    for i in range(position, low - 1, -1):
+        if not text[i].isspace() and text[i - 1].isspace():
+            return i
+    # No word starts nearby: start mid-word, but not on whitespace the chunk would skip
+    while position > low and text[position].isspace():
+        position -= 1
+    match = NON_SPACE.search(text, position)
+    return match.start() if match else len(text)
+
+
+def iter_chunks(text: str,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[tuple[int, str]]:
+    """Yield (start_offset, chunk_text) pairs covering ``text``."""
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    length = len(text)
+    start = content_end = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            new_text = NON_SPACE.search(text, content_end)
+            new_text = new_text.start() if new_text else length
+            if new_text >= end:
+                # More whitespace than fits in a chunk: nothing to overlap with
+                start, end = new_text, min(new_text + chunk_size, length)
+        if end < length:
+            # Do not let a separator near the start produce a tiny chunk, or one
+            # with nothing past the end of the previous chunk
+            end = _break_point(text, start, end, max(start + chunk_overlap, new_text) + 1)
+        raw = text[start:end]
+        chunk = raw.strip()
+        first = start + len(raw) - len(raw.lstrip())
+        if chunk:
+            yield first, chunk
+        if end >= length:
+            break
+        # Step back for the overlap from the chunk's last character, then back to
+        # the start of a word, so chunks share at least chunk_overlap characters
+        content_end = start + len(raw.rstrip())
+        position = max(content_end - chunk_overlap, first + 1)
+        start = _word_start(text, position, max(position - chunk_overlap, first + 1))
+
+
+def split_text(text: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> list[tuple[int, str]]:
+    """List version of :func:`iter_chunks`."""
+    return list(iter_chunks(text, chunk_size, chunk_overlap))
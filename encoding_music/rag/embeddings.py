@@ -0,0 +1,56 @@
+"""Embedding functions for the RAG pipeline.
+
+The index accepts any callable that maps a list of strings to a list of
+vectors, so the OpenAI embeddings from the tutorial plug in directly::
+
+    from langchain_openai import OpenAIEmbeddings
+    embed = OpenAIEmbeddings(model="text-embedding-3-large").embed_documents
+
+``HashingEmbedding`` is a deterministic local stand-in: it needs no API key,
+costs nothing and always gives the same vector for the same text, which
+makes it suitable for tests and for trying out the pipeline offline.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbedding:
+    """Bag-of-words vectors using the hashing trick.
+
+    Each lower-cased word is hashed (with a stable hash, unlike Python's
+    ``hash``) to one of ``dim`` buckets with a +1/-1 sign, and the result is
+    normalised to unit length.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._buckets = {}
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        if token not in self._buckets:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            self._buckets[token] = (value % self.dim, 1.0 if value >> 63 else -1.0)
+        return self._buckets[token]
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                bucket, sign = self._bucket(token)
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # Same interface as LangChain embeddings, so either can be passed around
+    def embed_documents(self, texts: list[str]) -> np.ndarray:
+        return self(texts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self([text])[0]
@@ -0,0 +1,306 @@
+"""Persistent embedding index with incremental ingest.
+
+The RAG tutorial reloads every PDF, re-merges the CSV metadata and re-embeds
+the whole corpus each session.  ``EmbeddingIndex`` keeps the work on disk
+instead, in a directory with three files:
+
+* ``vectors.f32``: unit-length float32 embeddings, one row per chunk,
+  appended as files are added and read back as a NumPy memory map
+* ``chunks.jsonl``: one JSON line per chunk (source, file hash, character
+  offset, text, metadata)
+* ``manifest.json``: embedding size, row count and, for every ingested file,
+  its content hash and the range of rows holding its chunks
+
+Chunks are keyed by the SHA-256 of the file they came from plus their
+character offset, so adding one new concert program embeds only that file,
+re-adding an unchanged file costs a hash, and an edited file replaces its
+old chunks.  The same contents under a second file name are stored once;
+their chunks stay searchable until every name for them is removed.
+
+Example::
+
+    from encoding_music.rag import EmbeddingIndex, HashingEmbedding, load_metadata_csv
+
+    index = EmbeddingIndex("program_index", embed=HashingEmbedding())
+    metadata = load_metadata_csv("programs.csv")
+    for path in Path("PDFs").glob("*.pdf"):
+        index.ingest_file(path, metadata.get(path.name))
+    for hit in index.search("principal trumpet orchestra 2019", k=5):
+        print(hit["score"], hit["source"])
+"""
+
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+
+import numpy as np
+
+from .chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, join_pages, split_text
+
+# Metadata fields PDFPlumber adds that only confuse retrieval (see the tutorial)
+IRRELEVANT_METADATA = ["Author", "Subject", "Producer", "ModDate", "Keywords", "Creator", "Title"]
+
+
+def file_hash(path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_pdf_pages(path) -> list[str]:
+    """Text of each page of a PDF, using pdfplumber (as PDFPlumberLoader does) or pypdf."""
+    try:
+        import pdfplumber
+    except ImportError:
+        from pypdf import PdfReader
+        return [page.extract_text() or "" for page in PdfReader(str(path)).pages]
+    with pdfplumber.open(str(path)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def load_metadata_csv(filepath,
+                      source_column: str = "Filename",
+                      columns: Sequence[str] = ("Category", "Year", "Term"),
+                      rename: Optional[dict] = None) -> dict:
+    """Read per-file metadata from a CSV, keyed by file name.
+
+    By default this matches ``loadCSV`` in the tutorial, renaming
+    ``Category`` to ``Ensemble_Type`` as the tutorial's merge step does.
+    """
+    rename = {"Category": "Ensemble_Type"} if rename is None else rename
+    metadata = {}
+    with open(filepath, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            source = Path(row[source_column]).name
+            metadata[source] = {rename.get(c, c): row[c] for c in columns if c in row}
+    return metadata
+
+
+class EmbeddingIndex:
+    """Chunks and their embeddings, stored on disk and updated incrementally."""
+
+    def __init__(self,
+                 directory,
+                 embed: Callable[[list[str]], Sequence[Sequence[float]]],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+                 batch_size: int = 64):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embed = embed
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+
+        self._manifest_path = self.directory / "manifest.json"
+        self._vectors_path = self.directory / "vectors.f32"
+        self._chunks_path = self.directory / "chunks.jsonl"
+
+        if self._manifest_path.exists():
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"dim": None, "count": 0, "files": {}, "sources": {}}
+        self.dim = manifest["dim"]
+        self.count = manifest["count"]
+        self.files = manifest["files"]
+        self.sources = manifest["sources"]
+
+        # Anything past the manifest's row count is left over from an interrupted write
+        self.chunks = []
+        leftover = False
+        if self._chunks_path.exists():
+            with open(self._chunks_path, encoding="utf-8") as f:
+                for line in f:
+                    if len(self.chunks) == self.count:
+                        leftover = True
+                        break
+                    self.chunks.append(json.loads(line))
+        if leftover or self._vectors_size() > self.count * (self.dim or 0) * 4:
+            self._truncate()
+        self._vectors = None
+
+    def __len__(self) -> int:
+        """Number of live chunks."""
+        return int(self.live_mask().sum())
+
+    # Storage
+
+    def _vectors_size(self) -> int:
+        return self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+
+    def _truncate(self):
+        with open(self._chunks_path, "w", encoding="utf-8") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+        if self._vectors_path.exists():
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(self.count * (self.dim or 0) * 4)
+
+    def save(self):
+        """Write the manifest; rows appended since the last save become permanent."""
+        manifest = {"dim": self.dim, "count": self.count, "files": self.files, "sources": self.sources}
+        tmp_path = self._manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Memory-mapped (rows, dim) array of all stored embeddings."""
+        if self.count == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._vectors is None or len(self._vectors) != self.count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                      shape=(self.count, self.dim))
+        return self._vectors
+
+    def live_mask(self) -> np.ndarray:
+        """Boolean mask of rows that belong to a current file."""
+        mask = np.zeros(self.count, dtype=bool)
+        for entry in self.files.values():
+            mask[entry["start"]:entry["stop"]] = True
+        return mask
+
+    # Ingest
+
+    def has_file(self, digest: str) -> bool:
+        return digest in self.files
+
+    def _set_source(self, source: str, digest: str):
+        """Point ``source`` at ``digest``, dropping the contents it named before if nothing else does."""
+        previous = self.sources.get(source)
+        self.sources[source] = digest
+        if previous is not None and previous != digest:
+            self._release(previous)
+
+    def _release(self, digest: str):
+        if digest not in self.sources.values():
+            self.files.pop(digest, None)
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` in batches and normalise each vector to unit length."""
+        batches = [np.asarray(self.embed(texts[i:i + self.batch_size]), dtype=np.float32)
+                   for i in range(0, len(texts), self.batch_size)]
+        vectors = np.vstack(batches) if batches else np.zeros((0, self.dim or 0), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_chunks(self, source: str, digest: str, chunks: Iterable[tuple[int, str]],
+                   metadata: Optional[dict] = None, vectors: Optional[np.ndarray] = None,
+                   save: bool = True) -> int:
+        """Embed and store already-split chunks of one file; return how many were added.
+
+        Pass ``vectors`` (from :meth:`embed_texts`) if they were computed
+        already.  If ``source`` was ingested before with different contents,
+        its old chunks stop being searchable (``compact`` reclaims the space).
+        With ``save=False`` the manifest is only written by the next
+        :meth:`save`, which keeps bulk ingest from rewriting it per file.
+        Contents that are already indexed are only recorded under ``source``.
+        """
+        if self.has_file(digest):
+            if self.sources.get(source) != digest:
+                self._set_source(source, digest)
+                if save:
+                    self.save()
+            return 0
+        chunks = list(chunks)
+        metadata = dict(metadata or {})
+        if vectors is None:
+            vectors = self.embed_texts([text for _, text in chunks])
+        if self.dim is None and len(vectors):
+            self.dim = int(vectors.shape[1])
+
+        start = self.count
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.astype(np.float32).tobytes())
+        with open(self._chunks_path, "a", encoding="utf-8") as f:
+            for offset, text in chunks:
+                record = {"source": source, "file_hash": digest, "start_index": offset,
+                          "text": text, "metadata": metadata}
+                self.chunks.append(record)
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += len(chunks)
+
+        # A changed file replaces its previous version
+        self.files[digest] = {"source": source, "start": start, "stop": self.count, "metadata": metadata}
+        self._set_source(source, digest)
+        if save:
+            self.save()
+        return len(chunks)
+
+    def add_document(self, source: str, text: str, metadata: Optional[dict] = None,
+                     digest: Optional[str] = None) -> int:
+        """Split, embed and store one document's text."""
+        digest = digest or hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if self.has_file(digest):
+            return self.add_chunks(source, digest, (), metadata)
+        return self.add_chunks(source, digest, split_text(text, self.chunk_size, self.chunk_overlap), metadata)
+
+    def ingest_file(self, path, metadata: Optional[dict] = None,
+                    read_pages: Callable = read_pdf_pages) -> int:
+        """Add one file (a PDF by default) unless its contents are already indexed."""
+        path = Path(path)
+        digest = file_hash(path)
+        if self.has_file(digest):
+            return self.add_chunks(path.name, digest, (), metadata)
+        return self.add_document(path.name, join_pages(read_pages(path)), metadata, digest=digest)
+
+    def remove_source(self, source: str) -> bool:
+        """Stop returning a file's chunks (unless another name has the same contents).
+
+        Returns False if ``source`` was not indexed.
+        """
+        digest = self.sources.pop(source, None)
+        if digest is None:
+            return False
+        self._release(digest)
+        self.save()
+        return True
+
+    def compact(self):
+        """Rewrite the storage without chunks of removed or replaced files."""
+        live = np.flatnonzero(self.live_mask())
+        vectors = np.array(self.vectors[live]) if len(live) else np.zeros((0, self.dim or 0), np.float32)
+        # Live files keep their order, so each one's rows just shift down
+        new_start = np.cumsum(self.live_mask()) - self.live_mask()
+        self.chunks = [self.chunks[i] for i in live]
+        for entry in self.files.values():
+            size = entry["stop"] - entry["start"]
+            entry["start"] = int(new_start[entry["start"]]) if entry["start"] < len(new_start) else len(live)
+            entry["stop"] = entry["start"] + size
+        self.count = len(live)
+        self._vectors = None
+        with open(self._vectors_path, "wb") as f:
+            f.write(vectors.tobytes())
+        self._truncate()
+        self.save()
+
+    # Search
+
+    def search(self, query: str, k: int = 10, rows: Optional[np.ndarray] = None) -> list[dict]:
+        """The ``k`` chunks most similar (cosine) to ``query``.
+
+        ``rows`` optionally restricts the scan to a subset of row numbers.
+        Each hit is the stored chunk record plus ``row`` and ``score``.
+        """
+        if self.count == 0:
+            return []
+        if rows is None:
+            rows = np.flatnonzero(self.live_mask())
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return []
+        query_vector = self.embed_texts([query])[0]
+        scores = self.vectors[rows] @ query_vector
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [dict(self.chunks[rows[i]], row=int(rows[i]), score=float(scores[i])) for i in top]
@@ -0,0 +1,264 @@
+"""Parallel PDF ingest for the RAG pipeline.
+
+The tutorial awaits ``loadPDF`` for one file at a time, builds each
+document with repeated ``+=`` and splits everything in a single thread.
+Here each file is hashed in the main process first, so files the index
+already holds never reach a worker.  The CPU-bound part (text extraction,
+joining pages, merging the CSV metadata and chunking) runs in a process
+pool, with at most two files per worker queued at a time, and finished
+files are streamed back as they complete, so the main process can embed and
+store one file while the workers are still reading the next ones.
+
+Every stage is timed, and the report gives overall throughput::
+
+    from encoding_music.rag import EmbeddingIndex, HashingEmbedding, ingest_directory
+
+    index = EmbeddingIndex("program_index", embed=HashingEmbedding())
+    report = ingest_directory(index, "PDFs", metadata_csv="programs.csv", workers=8)
+    print(report)
+
+or from the command line::
+
+    python -m encoding_music.rag.ingest PDFs --csv programs.csv --index program_index
+"""
+
+import argparse
+import os
+import time
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from .chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, join_pages, split_text
+from .embeddings import HashingEmbedding
+from .index import EmbeddingIndex, file_hash, load_metadata_csv, read_pdf_pages
+
+STAGES = ("hash", "extract", "chunk", "embed", "store")
+
+# Files submitted to the pool per worker before waiting for one to finish
+QUEUED_PER_WORKER = 2
+
+
+@dataclass
+class ExtractedFile:
+    """One file after the worker stages: its chunks, metadata and stage timings."""
+    source: str
+    digest: str
+    chunks: list = field(default_factory=list)
+    metadata: dict = field(default_factory=dict)
+    size: int = 0
+    timings: dict = field(default_factory=dict)
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestReport:
+    """Counts, per-stage seconds (summed over workers) and wall-clock time."""
+    files: int = 0
+    skipped: int = 0
+    failed: list = field(default_factory=list)
+    chunks: int = 0
+    bytes: int = 0
+    wall_time: float = 0.0
+    timings: dict = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+
+    def add(self, extracted: ExtractedFile):
+        for stage, seconds in extracted.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        if extracted.error is not None:
+            self.failed.append((extracted.source, extracted.error))
+        elif extracted.skipped:
+            self.skipped += 1
+        else:
+            self.files += 1
+            self.chunks += len(extracted.chunks)
+            self.bytes += extracted.size
+
+    def __str__(self):
+        wall = self.wall_time or float("nan")
+        lines = [
+            f"Ingested {self.files} files ({self.skipped} unchanged, {len(self.failed)} failed) "
+            f"into {self.chunks} chunks in {self.wall_time:.2f}s",
+            f"Throughput: {self.files / wall:.1f} files/s, {self.chunks / wall:.1f} chunks/s, "
+            f"{self.bytes / wall / 1e6:.2f} MB/s",
+        ]
+        lines += [f"  {stage:<8}{seconds:8.2f}s" for stage, seconds in self.timings.items()]
+        return "\n".join(lines)
+
+
+def hash_file(path, known_hashes: Iterable[str] = frozenset()) -> ExtractedFile:
+    """Hash one file, marking it skipped if its contents are in ``known_hashes``."""
+    path = Path(path)
+    extracted = ExtractedFile(source=path.name, digest="")
+    try:
+        start = time.perf_counter()
+        extracted.digest = file_hash(path)
+        extracted.size = path.stat().st_size
+        extracted.timings["hash"] = time.perf_counter() - start
+        extracted.skipped = extracted.digest in known_hashes
+    except OSError as e:
+        # A vanished or unreadable program is reported, not fatal
+        extracted.error = f"{type(e).__name__}: {e}"
+    return extracted
+
+
+def _extract(extracted: ExtractedFile,
+             path: Path,
+             metadata: Optional[dict],
+             chunk_size: int,
+             chunk_overlap: int,
+             read_pages: Callable) -> ExtractedFile:
+    """Extract, merge metadata and chunk a hashed file (runs in a worker)."""
+    timings = extracted.timings
+    try:
+        start = time.perf_counter()
+        pages = read_pages(path)
+        timings["extract"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        extracted.chunks = split_text(join_pages(pages), chunk_size, chunk_overlap)
+        extracted.metadata = {"source": path.name, "total_pages": len(pages), **(metadata or {})}
+        timings["chunk"] = time.perf_counter() - start
+    except Exception as e:
+        # One unreadable program should not stop the whole archive
+        extracted.error = f"{type(e).__name__}: {e}"
+    return extracted
+
+
+def extract_file(path,
+                 metadata: Optional[dict] = None,
+                 known_hashes: Iterable[str] = frozenset(),
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+                 read_pages: Callable = read_pdf_pages) -> ExtractedFile:
+    """Hash, extract, merge metadata and chunk one file."""
+    extracted = hash_file(path, known_hashes)
+    if extracted.skipped or extracted.error is not None:
+        return extracted
+    return _extract(extracted, Path(path), metadata, chunk_size, chunk_overlap, read_pages)
+
+
+def iter_extracted(paths: Iterable,
+                   metadata: Optional[dict] = None,
+                   known_hashes: Iterable[str] = (),
+                   workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+                   read_pages: Callable = read_pdf_pages) -> Iterator[ExtractedFile]:
+    """Yield each file's chunks as soon as its worker finishes.
+
+    ``metadata`` maps file names to extra metadata (see ``load_metadata_csv``).
+    Files are hashed here as they are queued, and only files whose contents
+    are not in ``known_hashes`` go to a worker; at most
+    ``QUEUED_PER_WORKER`` files per worker are queued at once.  If the
+    caller stops early or a file raises, files not yet started are
+    cancelled.  With ``workers=1`` everything runs in this process, which is
+    easier to debug and avoids pool start-up for a handful of files.
+    """
+    metadata = metadata or {}
+    known_hashes = frozenset(known_hashes)
+    paths = [Path(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            yield extract_file(path, metadata.get(path.name), known_hashes, chunk_size, chunk_overlap, read_pages)
+        return
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(paths)))
+    queued = set()
+    try:
+        for path in paths:
+            extracted = hash_file(path, known_hashes)
+            if extracted.skipped or extracted.error is not None:
+                yield extracted
+                continue
+            queued.add(pool.submit(_extract, extracted, path, metadata.get(path.name),
+                                   chunk_size, chunk_overlap, read_pages))
+            if len(queued) >= workers * QUEUED_PER_WORKER:
+                done, queued = wait(queued, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(queued):
+            yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def ingest_files(index: EmbeddingIndex,
+                 paths: Iterable,
+                 metadata: Optional[dict] = None,
+                 workers: Optional[int] = None,
+                 read_pages: Callable = read_pdf_pages,
+                 save_every: int = 100) -> IngestReport:
+    """Extract ``paths`` in parallel and add every new or changed file to ``index``.
+
+    The index manifest is written every ``save_every`` files and at the end,
+    even when the run stops with an error, so an interrupted run keeps most
+    of its work.  Files the index already holds are not re-read, but a new
+    name for them is recorded.
+    """
+    report = IngestReport()
+    started = time.perf_counter()
+    extracted_files = iter_extracted(paths, metadata, index.files.keys(), workers,
+                                     index.chunk_size, index.chunk_overlap, read_pages)
+    # Closing the generator on an error cancels the files still waiting for a worker
+    with closing(extracted_files):
+        try:
+            for extracted in extracted_files:
+                if extracted.skipped:
+                    # Known contents, perhaps under a new name: record the name
+                    index.add_chunks(extracted.source, extracted.digest, (), save=False)
+                elif extracted.error is None:
+                    start = time.perf_counter()
+                    vectors = index.embed_texts([text for _, text in extracted.chunks])
+                    extracted.timings["embed"] = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    index.add_chunks(extracted.source, extracted.digest, extracted.chunks,
+                                     extracted.metadata, vectors=vectors, save=False)
+                    extracted.timings["store"] = time.perf_counter() - start
+                report.add(extracted)
+                if extracted.timings.get("store") is not None and report.files % save_every == 0:
+                    index.save()
+        finally:
+            # Keep what was stored even if a worker or the embedding fails
+            index.save()
+    report.wall_time = time.perf_counter() - started
+    return report
+
+
+def ingest_directory(index: EmbeddingIndex,
+                     directory,
+                     metadata_csv=None,
+                     pattern: str = "*.pdf",
+                     workers: Optional[int] = None,
+                     read_pages: Callable = read_pdf_pages) -> IngestReport:
+    """Ingest every file matching ``pattern`` in ``directory``, with optional CSV metadata."""
+    metadata = load_metadata_csv(metadata_csv) if metadata_csv else None
+    paths = sorted(Path(directory).glob(pattern))
+    return ingest_files(index, paths, metadata, workers, read_pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add a folder of PDFs to a RAG embedding index.")
+    parser.add_argument("directory", help="folder of PDFs")
+    parser.add_argument("--csv", help="CSV with Filename, Category, Year and Term columns")
+    parser.add_argument("--index", default="rag_index", help="index directory (default: rag_index)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--openai-model", default=None,
+                        help="embed with this OpenAI model instead of the offline hashing embedding")
+    args = parser.parse_args(argv)
+
+    if args.openai_model:
+        from langchain_openai import OpenAIEmbeddings
+        embed = OpenAIEmbeddings(model=args.openai_model).embed_documents
+    else:
+        embed = HashingEmbedding()
+    index = EmbeddingIndex(args.index, embed=embed)
+    print(ingest_directory(index, args.directory, args.csv, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
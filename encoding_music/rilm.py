@@ -0,0 +1,219 @@
+"""The RILM data guide's helpers: index queries, cleaning, concept and author networks, charts.
+
+The functions keep the guide's names and arguments.  The API token is read
+from the ``RILM_BEARER_TOKEN`` environment variable (or passed as
+``token=``) rather than pasted into the notebook, and a query with no
+results returns an empty frame instead of printing an apology and
+returning ``None``::
+
+    from encoding_music import rilm
+
+    results = rilm.clean_query_data(rilm.get_query_data("religion and religious music--Judaism"), None, None)
+    rilm.create_concept_map(results, weight_threshold=2).save_graph("judaism.html")
+    rilm.term_hist(results, num_terms=10)
+
+NetworkX, Pyvis and Plotly are imported only when a graph or chart is made.
+"""
+
+import os
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from .networks import add_communities, pair_counts, pyvis_network, unique_pairs
+from .tracing import count, traced
+
+BASE = "https://api-ibis.rilm.org/200/haverford/"
+URLS = {
+    "year": BASE + "rilm_index_RYs",
+    "terms": BASE + "rilm_index_top_terms",
+    "index": BASE + "rilm_index",
+    "author": BASE + "rilm_index_by_author",
+}
+# The API's short column names, as the guide renames them
+COLUMNS = {"ry": "year", "ac": "item", "ent": "entry", "lvl": "level", "name": "term", "cat": "category"}
+
+
+def headers(token: Optional[str] = None) -> dict:
+    token = token or os.environ.get("RILM_BEARER_TOKEN")
+    if not token:
+        raise RuntimeError("Set RILM_BEARER_TOKEN (or pass token=) to query the RILM API")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@traced("fetch", "rilm.query")
+def _query(url: str, params: dict, token: Optional[str] = None, timeout: float = 60) -> pd.DataFrame:
+    import requests
+
+    response = requests.get(url, headers=headers(token), params={**params, "includeAuthors": True},
+                            timeout=timeout)
+    response.raise_for_status()
+    count("bytes_fetched", len(response.content))
+    results = pd.DataFrame(response.json())
+    if results.empty:
+        return pd.DataFrame(columns=list(COLUMNS.values()) + ["full_id"])
+    results = results.fillna("")
+    # Year and accession number together identify each item
+    results["full_id"] = results["ry"].astype(str) + "-" + results["ac"].astype(str)
+    return results.rename(columns=COLUMNS)
+
+
+def author_search(author_name: str, token: Optional[str] = None) -> pd.DataFrame:
+    """Index rows for every item by ``author_name``."""
+    return _query(URLS["author"], {"authorName": author_name}, token)
+
+
+def get_query_data(search_term: str, limit_to_entries: bool = False, token: Optional[str] = None) -> pd.DataFrame:
+    """Index rows for every item indexed with ``search_term``.
+
+    With ``limit_to_entries`` only the index entries that contain the term
+    are kept, not every entry of those items.
+    """
+    results = _query(URLS["index"], {"termName": search_term}, token)
+    if limit_to_entries and not results.empty:
+        results = _search_entry_items_only(results, search_term)
+    return results
+
+
+simple_search = get_query_data
+
+
+def _search_entry_items_only(results: pd.DataFrame, search_term: str) -> pd.DataFrame:
+    # The (item, entry) pairs where the term appears, and all the rows of those entries
+    matches = results.loc[results["term"] == search_term, ["full_id", "entry"]].drop_duplicates()
+    return results.merge(matches, on=["full_id", "entry"])
+
+
+@traced("analyze")
+def clean_query_data(results: pd.DataFrame, year_list: Optional[Iterable] = None,
+                     categories: Optional[Iterable] = None) -> pd.DataFrame:
+    """Limit the results to some years and term categories, with each term once per item."""
+    if year_list is not None:
+        results = results[results["year"].isin(year_list)]
+    if categories is not None:
+        results = results[results["category"].isin(categories)]
+    return results.drop_duplicates(["term", "full_id"])
+
+
+def one_author_graph(author_name: str, results: pd.DataFrame, min_count: int = 2, filename=None):
+    """The terms one author uses more than ``min_count`` times, linked when they index the same item.
+
+    Saves the network to ``"<author_name> graph.html"`` (or ``filename``)
+    and returns the Pyvis network.
+    """
+    import networkx as nx
+
+    selected = results[results["author"] == author_name]
+    counts = selected["term"].value_counts()
+    top_counts = counts[counts > min_count]
+    grouped = selected[selected["term"].isin(top_counts.index)].groupby("full_id")["term"].apply(list)
+
+    G = nx.Graph()
+    for term, count in top_counts.items():
+        G.add_node(term, size=int(count))
+    G.add_edges_from(unique_pairs(grouped))
+    G = add_communities(G)
+
+    network_graph = pyvis_network(width="1800", height="600")
+    network_graph.from_nx(G)
+    network_graph.save_graph(str(filename or f"{author_name} graph.html"))
+    return network_graph
+
+
+def _author_pairs(results: pd.DataFrame, author_impact_ratio: float):
+    # Authors who wrote more than author_impact_ratio percent of the items, and pairs sharing a term
+    items_per_author = results.groupby("author")["full_id"].nunique()
+    author_ratios = (items_per_author / results["full_id"].nunique() * 100).to_dict()
+    top_authors = [author for author, ratio in author_ratios.items() if ratio > author_impact_ratio]
+    authors_by_term = results[results["author"].isin(top_authors)].groupby("term")["author"].apply(list)
+    return top_authors, unique_pairs(authors_by_term), author_ratios
+
+
+def graph_author_communities(results: pd.DataFrame, author_impact_ratio: float, graph_name: str):
+    """The most prolific authors, linked when they use the same term, coloured by community.
+
+    Saves ``"<graph_name>_graph.html"`` and returns the Pyvis network.
+    """
+    import networkx as nx
+
+    top_authors, pairs, author_ratios = _author_pairs(results, author_impact_ratio)
+    G = nx.Graph()
+    for author in top_authors:
+        G.add_node(author, size=author_ratios[author] * 25)
+    G.add_edges_from(pairs)
+    G = add_communities(G)
+
+    network_graph = pyvis_network(width="1800", height="800")
+    network_graph.from_nx(G)
+    network_graph.save_graph(f"{graph_name}_graph.html")
+    return network_graph
+
+
+@traced("analyze")
+def concept_graph(results: pd.DataFrame, weight_threshold: int = 1):
+    """Terms linked when they index the same item, weighted by how many items they share.
+
+    Pairs shared by fewer than ``weight_threshold`` items are dropped, and so
+    are terms left without a pair (with a threshold of ``0`` every term is
+    kept).  Each node is grouped by its category and sized by the number of
+    years it appears in.  Returns a NetworkX graph.
+    """
+    import networkx as nx
+
+    counts = pair_counts(results.groupby("full_id", sort=False)["term"].apply(list))
+    weighted = {pair: count for pair, count in counts.items() if count >= weight_threshold}
+    if weight_threshold == 0:
+        nodes = results["term"].astype(str).unique()
+    else:
+        nodes = sorted({term for pair in weighted for term in pair})
+
+    terms = results.assign(term=results["term"].astype(str))
+    categories = terms.groupby("term")["category"].first().to_dict()
+    years = terms.groupby("term")["year"].unique().to_dict()
+
+    G = nx.Graph()
+    for name in nodes:
+        G.add_node(name, value=len(years[name]), group=categories[name], title=f"years: {(*years[name],)}")
+    for (u, v), weight in weighted.items():
+        G.add_edge(u, v, value=weight, title=str(weight))
+    count("edges_built", G.number_of_edges())
+    return G
+
+
+@traced("render")
+def create_concept_map(results: pd.DataFrame, weight_threshold: int = 1):
+    """The guide's concept map: ``concept_graph`` as a Pyvis network."""
+    network_graph = pyvis_network(width="1500px", height="1500px")
+    network_graph.from_nx(concept_graph(results, weight_threshold))
+    return network_graph
+
+
+@traced("render")
+def term_hist(cleaned_df: pd.DataFrame, num_terms: int = 5, height: int = 600, width: int = 800,
+              title: Optional[str] = None):
+    """A bar chart of the ``num_terms`` most frequent terms; returns the Plotly figure."""
+    import plotly.express as px
+
+    counts_frame = cleaned_df["term"].value_counts().head(num_terms).rename_axis("term").reset_index(
+        name="occurences")
+    fig = px.bar(counts_frame, x="term", y="occurences", title=title)
+    fig.update_layout(legend=dict(orientation="v", yanchor="top", y=1.1, xanchor="right", x=1), autosize=True,
+                      margin=dict(l=50, r=50, t=50, b=100), height=height, width=width, title=title)
+    return fig
+
+
+@traced("render")
+def scatter_plot(final_results: pd.DataFrame, term_threshold: int = 5, legend: bool = True, height: int = 800,
+                 width: int = 800, title: Optional[str] = None):
+    """Terms used more than ``term_threshold`` times, by year and author; returns the Plotly figure."""
+    import plotly.express as px
+
+    counts = final_results["term"].map(final_results["term"].value_counts())
+    filtered_df = final_results[counts > term_threshold]
+    marker_size = filtered_df.groupby(["term", "year"])["term"].transform("size")
+    fig = px.scatter(filtered_df.assign(marker_size=marker_size), x="year", y="term", hover_data=["author"],
+                     color="author", labels={"term": "Term", "author": "Author", "year": "Publication Year"},
+                     size="marker_size", height=height, width=width, title=title)
+    fig.update_layout(showlegend=legend)
+    fig.update_yaxes(categoryorder="category descending")
+    return fig
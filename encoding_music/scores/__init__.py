@@ -0,0 +1,21 @@
+"""Score summaries, caches and retrieval for the duo scores in the tool-calling guide."""
+
+from .._lazy import lazy_attributes
+
+_EXPORTS = {
+    "read_score": ".mei",
+    "summarize_directory": ".mei",
+    "summarize_score": ".mei",
+    "ScoreIndex": ".retrieval",
+    "count_tokens": ".retrieval",
+    "pack_context": ".retrieval",
+    "render_summary": ".retrieval",
+    "ScoreCache": ".cache",
+    "parse_score": ".cache",
+    "FeatureStore": ".features",
+    "build_features": ".features",
+    "compute_features": ".features",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_attributes(__name__, attributes=_EXPORTS)
@@ -0,0 +1,185 @@
+"""Process-wide cache of music21-parsed scores.
+
+The tools in the tool-calling guide call ``converter.parse`` on the MEI or
+MusicXML file every time they run, and for a Bach invention or a Bartók duo
+the parse takes far longer than the analysis.  ``parse_score`` is a drop-in
+replacement that parses each file once:
+
+* in memory, streams are kept in least-recently-used order and evicted once
+  their total (frozen) size passes ``max_bytes``
+* on disk, each parsed stream is frozen with music21's ``freezeThaw`` into a
+  pickle, so a new Python session thaws it instead of re-parsing
+
+Entries are keyed by the file's resolved path, modification time and size,
+so editing a score invalidates its cached copies automatically.  The cache
+is thread-safe: threads asking for the same score wait for one parse, while
+different scores parse in parallel.
+
+Example::
+
+    from encoding_music.scores import parse_score
+
+    @tool
+    def count_notes(file_path: str) -> dict:
+        score = parse_score(file_path)   # instead of converter.parse(file_path)
+        ...
+
+Cached streams are shared between callers; pass ``copy=True`` if a tool
+changes the stream in place.
+"""
+
+import copy as copy_module
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_DIR = Path(os.environ.get("ENCODING_MUSIC_CACHE", Path.home() / ".cache" / "encoding_music")) / "scores"
+
+
+def cache_key(path) -> tuple:
+    """(resolved path, mtime in ns, size) of a score file."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def freeze(stream) -> bytes:
+    """Pickle a music21 stream with freezeThaw (which handles its weak references)."""
+    from music21 import freezeThaw
+    return freezeThaw.StreamFreezer(stream).writeStr(fmt="pickle")
+
+
+def thaw(data: bytes):
+    from music21 import freezeThaw
+    thawer = freezeThaw.StreamThawer()
+    thawer.openStr(data)
+    return thawer.stream
+
+
+class ScoreCache:
+    """Parsed scores held in memory (LRU by size) and frozen on disk.
+
+    Attributes:
+        hits, disk_hits, misses: counts of lookups served from memory, from
+            a frozen copy on disk, and by parsing
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, cache_dir=DEFAULT_CACHE_DIR, parser=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._parser = parser
+        self._entries = OrderedDict()   # key -> (stream, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()   # guards the entries, sizes and counts
+        self._loading = {}              # key -> lock held while that key is parsed
+        self.hits = self.disk_hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _parse(self, path):
+        if self._parser is not None:
+            return self._parser(path)
+        from music21 import converter
+        return converter.parse(str(path))
+
+    def _disk_path(self, key) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        path, mtime_ns, size = key
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{Path(path).stem}-{digest}-{mtime_ns}-{size}.pickle"
+
+    def _load(self, key):
+        """Thaw from disk, or parse and freeze; returns (stream, size, whether it came from disk)."""
+        disk_path = self._disk_path(key)
+        if disk_path is not None and disk_path.exists():
+            try:
+                data = disk_path.read_bytes()
+                return thaw(data), len(data), True
+            except Exception:
+                # A pickle from another music21 version: fall back to parsing
+                disk_path.unlink(missing_ok=True)
+
+        stream = self._parse(key[0])
+        data = freeze(stream)
+        if disk_path is not None:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            # Drop frozen copies of older versions of the same file
+            for stale in disk_path.parent.glob(disk_path.name.rsplit("-", 2)[0] + "-*.pickle"):
+                stale.unlink(missing_ok=True)
+            tmp_path = disk_path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, disk_path)
+        return stream, len(data), False
+
+    def _lookup(self, key):
+        """The cached stream for ``key`` (counted as a hit), or None; call with the lock held."""
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key][0]
+
+    def get(self, path, copy: bool = False):
+        """The parsed stream for ``path``, parsing it at most once per version of the file."""
+        key = cache_key(path)
+        with self._lock:
+            stream = self._lookup(key)
+            if stream is None:
+                loading = self._loading.setdefault(key, threading.Lock())
+        if stream is None:
+            # Parse outside the cache lock, so other scores are served meanwhile
+            with loading:
+                with self._lock:
+                    stream = self._lookup(key)
+                if stream is None:
+                    try:
+                        stream, size, from_disk = self._load(key)
+                    except BaseException:
+                        with self._lock:
+                            self._loading.pop(key, None)
+                        raise
+                    with self._lock:
+                        if from_disk:
+                            self.disk_hits += 1
+                        else:
+                            self.misses += 1
+                        self._entries[key] = (stream, size)
+                        self._bytes += size
+                        self._evict(keep=key)
+                        self._loading.pop(key, None)
+        return copy_module.deepcopy(stream) if copy else stream
+
+    def _evict(self, keep=None):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, (_, size) = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._bytes -= size
+
+    def clear(self, disk: bool = False):
+        """Empty the in-memory cache (and the frozen copies too, with ``disk=True``)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if disk and self.cache_dir is not None and self.cache_dir.exists():
+                for path in self.cache_dir.glob("*.pickle"):
+                    path.unlink()
+
+
+default_cache = ScoreCache()
+
+
+def parse_score(path, copy: bool = False):
+    """``converter.parse`` through the process-wide :class:`ScoreCache`."""
+    return default_cache.get(path, copy=copy)
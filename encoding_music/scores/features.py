@@ -0,0 +1,203 @@
+"""Precomputed feature sidecars for the duo scores.
+
+Questions such as "return a table of how many of each note there is" are
+answered from the same handful of statistics every time.  ``build_features``
+computes a standard bundle for every MEI file in a folder and writes it next
+to the score as ``<name>.features.json``:
+
+* measure count, and for the whole score and each voice: note count,
+  ambitus, pitch-class histogram, pitch histogram and melodic interval
+  histogram (in semitones, signed)
+
+Each sidecar records the size, modification time and SHA-256 of the MEI it
+came from.  ``FeatureStore`` loads the sidecars once and, on every lookup,
+compares the source's size and mtime (a single ``stat``); only if those
+changed does it hash the file, and only if the hash changed does it
+recompute.  A fresh checkout with new mtimes therefore keeps using the
+sidecars, while an edited score is picked up automatically.
+
+Build them once::
+
+    python -m encoding_music.scores.features 02_Lab_Data/Duos_For_Intervals
+
+and answer from them in a tool::
+
+    features = FeatureStore("02_Lab_Data/Duos_For_Intervals")
+    features.note_table("Bach_BWV_0772")
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+from .mei import PITCH_CLASS_NAMES, interval_name, melodic_intervals, read_score
+
+FEATURES_VERSION = 1
+SIDECAR_SUFFIX = ".features.json"
+
+
+def pitch_name(midi: int) -> str:
+    """MIDI number as a pitch name with octave, e.g. 60 -> "C4"."""
+    return f"{PITCH_CLASS_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def sidecar_path(score_path) -> Path:
+    score_path = Path(score_path)
+    return score_path.with_name(score_path.stem + SIDECAR_SUFFIX)
+
+
+def _sha256(path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _voice_features(pitches: list) -> dict:
+    pitch_classes = [0] * 12
+    for pitch in pitches:
+        pitch_classes[pitch % 12] += 1
+    return {
+        "notes": len(pitches),
+        "ambitus": [min(pitches), max(pitches)] if pitches else [],
+        "pitch_classes": pitch_classes,
+        "pitches": {str(p): c for p, c in sorted(Counter(pitches).items())},
+        "intervals": {str(i): c for i, c in sorted(Counter(melodic_intervals(pitches)).items())},
+    }
+
+
+def compute_features(score_path) -> dict:
+    """The feature bundle for one MEI file."""
+    score_path = Path(score_path)
+    stat = score_path.stat()
+    score = read_score(score_path)
+    voices = {voice: _voice_features(pitches) for voice, pitches in score["voices"].items()}
+
+    # Whole-score totals; intervals are melodic, so they are summed per voice
+    total = _voice_features([p for pitches in score["voices"].values() for p in pitches])
+    intervals = Counter()
+    for voice in voices.values():
+        intervals.update({int(i): c for i, c in voice["intervals"].items()})
+    total["intervals"] = {str(i): c for i, c in sorted(intervals.items())}
+
+    return {
+        "version": FEATURES_VERSION,
+        "name": score_path.stem,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(score_path)},
+        "measures": score["measures"],
+        "total": total,
+        "voices": voices,
+    }
+
+
+def write_features(score_path) -> dict:
+    features = compute_features(score_path)
+    path = sidecar_path(score_path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(features, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return features
+
+
+def is_fresh(features: dict, score_path) -> bool:
+    """Whether a loaded bundle still describes ``score_path``."""
+    if features.get("version") != FEATURES_VERSION:
+        return False
+    stat = Path(score_path).stat()
+    source = features["source"]
+    if stat.st_size == source["size"] and stat.st_mtime_ns == source["mtime_ns"]:
+        return True
+    if stat.st_size != source["size"] or _sha256(score_path) != source["sha256"]:
+        return False
+    # Same contents with a new mtime (e.g. a fresh checkout): remember the new mtime
+    source["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+
+def build_features(directory, pattern: str = "*.mei", force: bool = False) -> dict:
+    """Write sidecars for every score in ``directory`` that lacks a fresh one.
+
+    Returns counts of ``written`` and ``fresh`` sidecars.
+    """
+    counts = {"written": 0, "fresh": 0}
+    for score_path in sorted(Path(directory).glob(pattern)):
+        path = sidecar_path(score_path)
+        if not force and path.exists():
+            with open(path) as f:
+                if is_fresh(json.load(f), score_path):
+                    counts["fresh"] += 1
+                    continue
+        write_features(score_path)
+        counts["written"] += 1
+    return counts
+
+
+class FeatureStore:
+    """In-memory view of a folder's feature sidecars, refreshed when a score changes."""
+
+    def __init__(self, directory, pattern: str = "*.mei"):
+        self.directory = Path(directory)
+        self.paths = {path.stem: path for path in sorted(self.directory.glob(pattern))}
+        self._features = {}
+
+    def __contains__(self, name):
+        return Path(name).stem in self.paths
+
+    def get(self, name) -> dict:
+        """Feature bundle for a score name (or path), recomputing a stale or missing sidecar."""
+        name = Path(name).stem
+        score_path = self.paths[name]
+        features = self._features.get(name)
+        if features is None:
+            path = sidecar_path(score_path)
+            if path.exists():
+                with open(path) as f:
+                    features = json.load(f)
+        if features is None or not is_fresh(features, score_path):
+            features = write_features(score_path)
+        self._features[name] = features
+        return features
+
+    def _part(self, name, voice=None) -> dict:
+        features = self.get(name)
+        return features["total"] if voice is None else features["voices"][str(voice)]
+
+    def note_table(self, name, voice=None) -> dict:
+        """How many of each pitch ("C4": 12, ...), lowest first."""
+        return {pitch_name(int(p)): c for p, c in self._part(name, voice)["pitches"].items()}
+
+    def pitch_class_table(self, name, voice=None) -> dict:
+        """How many of each pitch class ("C": 40, "C#": 0, ...)."""
+        return dict(zip(PITCH_CLASS_NAMES, self._part(name, voice)["pitch_classes"]))
+
+    def interval_table(self, name, voice=None) -> dict:
+        """How many of each melodic interval ("+M2": 30, "-m3": 8, ...)."""
+        return {interval_name(int(i)): c for i, c in self._part(name, voice)["intervals"].items()}
+
+    def ambitus(self, name, voice=None) -> list:
+        """Lowest and highest pitch names."""
+        return [pitch_name(p) for p in self._part(name, voice)["ambitus"]]
+
+    def note_counts(self, name) -> dict:
+        """Number of notes in each voice."""
+        return {voice: part["notes"] for voice, part in self.get(name)["voices"].items()}
+
+    def measures(self, name) -> int:
+        return self.get(name)["measures"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write feature sidecars for the MEI scores in a folder.")
+    parser.add_argument("directory", help="folder of MEI files")
+    parser.add_argument("--force", action="store_true", help="rewrite sidecars even if they are fresh")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    counts = build_features(args.directory, force=args.force)
+    print(f"Wrote {counts['written']} sidecars ({counts['fresh']} already fresh) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Lightweight MEI reading for the duo scores.
+
+music21's ``converter.parse`` builds a full object model of a score, which is
+more than summaries and histograms need.  ``read_score`` walks the MEI once
+with ElementTree and keeps just the header fields, key and meter, measure
+count and the MIDI pitch of every note (chord notes included) in each
+staff (voice).
+
+Pitches come from ``pname``, ``oct`` and the accidental (``pnum`` is only a
+fallback, since some of the Morley files give it an octave too low for the
+tenor).  Accidentals are taken from ``accid`` / ``accid.ges`` (as attributes
+or an ``<accid>`` child), carried through the rest of the measure, and the
+key signature is only applied in files that do not encode gestural
+accidentals themselves.
+
+The duo files all mark ``key.mode="major"``, whatever the piece, so the key
+is named from the title when it gives one ("Invention No. 4 in D minor"),
+and otherwise reported as a signature only ("1 flat").
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+
+from .. import tracing
+
+MEI_NS = "{http://www.music-encoding.org/ns/mei}"
+
+STEPS = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11}
+ALTERATIONS = {"s": 1, "f": -1, "ss": 2, "x": 2, "ff": -2, "n": 0, "ns": 1, "nf": -1}
+SHARP_ORDER = "fcgdaeb"
+FLAT_ORDER = "beadgcf"
+PITCH_CLASS_NAMES = ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+MAJOR_KEYS = ["Cb", "Gb", "Db", "Ab", "Eb", "Bb", "F", "C", "G", "D", "A", "E", "B", "F#", "C#"]
+MINOR_KEYS = ["Ab", "Eb", "Bb", "F", "C", "G", "D", "A", "E", "B", "F#", "C#", "G#", "D#", "A#"]
+TITLE_KEY = re.compile(r"\bin ([A-G])(?:[- ]?(flat|sharp))?\s+(major|minor)\b", re.IGNORECASE)
+INTERVAL_NAMES = ["P1", "m2", "M2", "m3", "M3", "P4", "TT", "P5", "m6", "M6", "m7", "M7", "P8"]
+
+
+def _text(element) -> str:
+    return " ".join("".join(element.itertext()).split()) if element is not None else ""
+
+
+def key_fifths(sig: str) -> int:
+    """MEI key signature ("3f", "2s", "0") as a count of fifths (-3, 2, 0)."""
+    if not sig or sig == "0":
+        return 0
+    count = int(sig[:-1])
+    return -count if sig[-1] == "f" else count
+
+
+def key_name(fifths: int, mode: str = None) -> str:
+    """Key of a signature in ``mode``, or the signature itself ("2 flats") without one."""
+    if mode == "minor":
+        return f"{MINOR_KEYS[fifths + 7]} minor"
+    if mode == "major":
+        return f"{MAJOR_KEYS[fifths + 7]} major"
+    if fifths == 0:
+        return "no sharps or flats"
+    return f"{abs(fifths)} {'flat' if fifths < 0 else 'sharp'}{'' if abs(fifths) == 1 else 's'}"
+
+
+def title_key(title: str):
+    """The key a title names ("... in E-flat major" -> "Eb major"), or None."""
+    match = TITLE_KEY.search(title or "")
+    if match is None:
+        return None
+    tonic, accidental, mode = match.groups()
+    accidental = {"flat": "b", "sharp": "#"}.get((accidental or "").lower(), "")
+    return f"{tonic.upper()}{accidental} {mode.lower()}"
+
+
+def interval_name(semitones: int, directed: bool = True) -> str:
+    """Name of a melodic interval by size, e.g. -3 -> "-m3", 14 -> "+14" (compound)."""
+    size = abs(semitones)
+    name = INTERVAL_NAMES[size] if size < len(INTERVAL_NAMES) else str(size)
+    if not directed or semitones == 0:
+        return name
+    return ("+" if semitones > 0 else "-") + name
+
+
+def _key_alterations(fifths: int) -> dict:
+    if fifths < 0:
+        return {step: -1 for step in FLAT_ORDER[:-fifths]}
+    return {step: 1 for step in SHARP_ORDER[:fifths]}
+
+
+def _accidental(note, attribute: str):
+    value = note.get(attribute)
+    if value is None:
+        child = note.find(f"{MEI_NS}accid")
+        if child is not None:
+            value = child.get(attribute)
+    return value
+
+
+@tracing.traced("parse")
+def read_score(path) -> dict:
+    """Header fields, key, meters, measure count and per-voice MIDI pitches of an MEI file.
+
+    Returns a dict with ``name``, ``title``, ``composer``, ``key``, ``meters``
+    (distinct "count/unit" strings in order of appearance), ``measures`` and
+    ``voices`` (staff number -> list of MIDI pitches, rests omitted).
+    """
+    path = Path(path)
+    root = ET.parse(path).getroot()
+    head = root.find(f"{MEI_NS}meiHead")
+    work = head.find(f".//{MEI_NS}work") if head is not None else None
+    title = _text(work.find(f"{MEI_NS}title")) if work is not None else ""
+    composer = _text(work.find(f"{MEI_NS}composer")) if work is not None else ""
+    if head is not None and not composer:
+        composer = _text(head.find(f".//{MEI_NS}persName[@role='composer']"))
+    if head is not None and not title:
+        title = _text(head.find(f".//{MEI_NS}title"))
+
+    # Signature from the first keySig or staffDef key.sig (their mode is not to be trusted)
+    fifths = 0
+    for element in root.iter():
+        if element.tag == f"{MEI_NS}keySig" and element.get("sig") is not None:
+            fifths = key_fifths(element.get("sig"))
+            break
+        if element.tag == f"{MEI_NS}staffDef" and element.get("key.sig") is not None:
+            fifths = key_fifths(element.get("key.sig"))
+            break
+
+    meters = []
+    for element in root.iter():
+        if element.tag == f"{MEI_NS}meterSig":
+            count, unit = element.get("count"), element.get("unit")
+        elif element.tag in (f"{MEI_NS}scoreDef", f"{MEI_NS}staffDef"):
+            count, unit = element.get("meter.count"), element.get("meter.unit")
+        else:
+            continue
+        if count and unit and f"{count}/{unit}" not in meters:
+            meters.append(f"{count}/{unit}")
+
+    notes = list(root.iter(f"{MEI_NS}note"))
+    use_key = not any(_accidental(n, "accid.ges") is not None for n in notes)
+    key_alterations = _key_alterations(fifths) if use_key else {}
+
+    voices = {}
+    measures = 0
+    for measure in root.iter(f"{MEI_NS}measure"):
+        measures += 1
+        for staff in measure.iter(f"{MEI_NS}staff"):
+            pitches = voices.setdefault(staff.get("n", "1"), [])
+            carried = {}
+            for note in staff.iter(f"{MEI_NS}note"):
+                step, octave = note.get("pname"), note.get("oct")
+                if step is None or octave is None:
+                    if note.get("pnum") is not None:
+                        pitches.append(int(note.get("pnum")))
+                    continue
+                written = _accidental(note, "accid")
+                gestural = _accidental(note, "accid.ges")
+                if written is not None:
+                    alteration = ALTERATIONS.get(written, 0)
+                    carried[(step, octave)] = alteration
+                elif gestural is not None:
+                    alteration = ALTERATIONS.get(gestural, 0)
+                else:
+                    alteration = carried.get((step, octave), key_alterations.get(step, 0))
+                pitches.append(12 * (int(octave) + 1) + STEPS[step] + alteration)
+    tracing.count("notes_parsed", sum(map(len, voices.values())))
+
+    return {
+        "name": path.stem,
+        "title": title,
+        "composer": composer,
+        "key": title_key(title) or key_name(fifths),
+        "meters": meters,
+        "measures": measures,
+        "voices": voices,
+    }
+
+
+def collection_name(name: str) -> str:
+    """Collection a duo belongs to, from its file name (Bach_BWV_0772 -> Bach_BWV)."""
+    parts = name.split("_")
+    return "_".join(parts[:2]) if len(parts) > 1 else name
+
+
+def melodic_intervals(pitches: list) -> list:
+    """Semitone steps between consecutive notes of one voice."""
+    return [b - a for a, b in zip(pitches, pitches[1:])]
+
+
+def summarize_score(path) -> dict:
+    """A compact, JSON-friendly description of one score for retrieval and prompts."""
+    score = read_score(path)
+    all_pitches = [p for pitches in score["voices"].values() for p in pitches]
+    intervals = Counter()
+    for pitches in score["voices"].values():
+        intervals.update(abs(step) for step in melodic_intervals(pitches))
+    return {
+        "name": score["name"],
+        "title": score["title"],
+        "composer": score["composer"],
+        "collection": collection_name(score["name"]),
+        "key": score["key"],
+        "meter": ", ".join(score["meters"]),
+        "measures": score["measures"],
+        "voices": len(score["voices"]),
+        "notes": {voice: len(pitches) for voice, pitches in score["voices"].items()},
+        "ambitus": [min(all_pitches), max(all_pitches)] if all_pitches else [],
+        "common_intervals": [interval_name(size, directed=False) for size, _ in intervals.most_common(5)],
+    }
+
+
+def summarize_directory(directory, pattern: str = "*.mei") -> dict:
+    """Summaries of every MEI file in ``directory``, keyed by score name."""
+    return {path.stem: summarize_score(path) for path in sorted(Path(directory).glob(pattern))}
@@ -0,0 +1,137 @@
+"""Local retrieval over score summaries for the tool-calling app.
+
+In the tool-calling guide, ``retrieve`` falls back to every score in
+``all_scores`` when no name is given, joins their full JSON into one
+prompt, and a second LLM call picks the relevant names.  ``ScoreIndex``
+replaces both steps with a local lookup:
+
+* each summary (composer, collection, key, meter, interval statistics) is
+  rendered once to a short text block and the rendering is cached
+* questions are matched against those blocks with BM25, optionally narrowed
+  by exact fields such as ``{"composer": "Bach, Johann Sebastian"}``
+* the best blocks are packed into the context until a token budget is
+  reached, so the prompt stays the same size however many scores there are
+
+Example::
+
+    from encoding_music.scores import ScoreIndex, summarize_directory
+
+    scores = ScoreIndex(summarize_directory("02_Lab_Data/Duos_For_Intervals"))
+    context = scores.context("Which Bartok duos use lots of seconds?", token_budget=1500)
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from ..rag.retrieval import BM25Index, MetadataIndex, clean_filter
+
+FIELDS = ("composer", "collection", "key", "meter")
+DEFAULT_TOKEN_BUDGET = 2000
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken if installed, else about 4 characters per token."""
+    encoder = _encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text))
+
+
+def render_summary(summary: dict) -> str:
+    """Short text form of a score summary, one field per line."""
+    lines = [f"Piece: {summary.get('name', '')}"]
+    for field, value in summary.items():
+        if field == "name" or value in (None, "", [], {}):
+            continue
+        if isinstance(value, dict):
+            value = ", ".join(f"{k}: {v}" for k, v in value.items())
+        elif isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value)
+        lines.append(f"{field.replace('_', ' ').capitalize()}: {value}")
+    return "\n".join(lines)
+
+
+def pack_context(blocks: list[str], token_budget: int = DEFAULT_TOKEN_BUDGET, separator: str = "\n\n") -> str:
+    """Join text blocks in order, stopping before the token budget is exceeded."""
+    packed, used = [], 0
+    separator_tokens = count_tokens(separator)
+    for block in blocks:
+        tokens = count_tokens(block) + (separator_tokens if packed else 0)
+        if used + tokens > token_budget:
+            break
+        packed.append(block)
+        used += tokens
+    return separator.join(packed)
+
+
+class ScoreIndex:
+    """Score summaries with cached renderings, field postings and a BM25 index.
+
+    Attributes:
+        names: score names, in index order
+        summaries: dict of name -> summary dict
+    """
+
+    def __init__(self, summaries: dict, fields=FIELDS):
+        self.summaries = dict(summaries)
+        self.names = list(self.summaries)
+        self.fields = fields
+        self._rendered = {}
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self.metadata = MetadataIndex([
+            {"metadata": {f: s[f] for f in fields if f in s}} for s in self.summaries.values()
+        ], fields)
+        # Index the name too, split on underscores, so "BWV 772" or "Mikrokosmos" match
+        self.keywords = BM25Index([f"{name.replace('_', ' ')}\n{self.render(name)}" for name in self.names])
+
+    def __len__(self):
+        return len(self.names)
+
+    def render(self, name: str) -> str:
+        """Cached text block for one score."""
+        if name not in self._rendered:
+            self._rendered[name] = render_summary(self.summaries[name])
+        return self._rendered[name]
+
+    def search(self, question: str, k: int = 5, filter: Optional[dict] = None) -> list[str]:
+        """Names of the ``k`` scores that best match ``question`` (and ``filter``).
+
+        Scores sharing no word with the question are left out, so an
+        unrelated question finds nothing.  A question with no searchable
+        words at all, given with a filter, lists the filter's matches.
+        """
+        filter = clean_filter(filter)
+        mask = self.metadata.mask(filter)
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+        if self.keywords.tokenize(question):
+            scores = self.keywords.scores(question, mask)[rows]
+            rows, scores = rows[scores > 0], scores[scores > 0]
+        elif filter:
+            scores = np.zeros(len(rows), dtype=np.float32)
+        else:
+            return []
+        # Stable sort keeps index order among ties (e.g. a purely filtered query)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [self.names[rows[i]] for i in order]
+
+    def context(self, question: str, score_names: Optional[list] = None, k: int = 10,
+                filter: Optional[dict] = None, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+        """Prompt context for ``question``: named scores, else the best matches, within the budget."""
+        if score_names:
+            names = [name for name in score_names if name in self._positions]
+        else:
+            names = self.search(question, k=k, filter=filter)
+        return pack_context([self.render(name) for name in names], token_budget)
@@ -0,0 +1,78 @@
+"""The similarity guide's measures: cosine similarity and Euclidean distance between rows.
+
+The guide imports both from scikit-learn, which is not one of this
+package's dependencies; these are the same computations in NumPy, taking
+and returning the same shapes (a matrix of rows in, a rows x rows matrix
+out).  ``similarity_frame`` is the guide's "every song against every
+song" table::
+
+    from encoding_music.similarity import cosine_similarity, similarity_frame
+
+    cosine_similarity([[0.402, 0.860, 0.0504]], [[0.727, 0.338, 0.0454]])[0][0]
+    table = similarity_frame(beatles_spotify, ["danceability", "energy", "valence"], label="song")
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .tracing import traced
+
+
+def _rows(X) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float64)
+    return X.reshape(1, -1) if X.ndim == 1 else X
+
+
+def cosine_similarity(X, Y=None) -> np.ndarray:
+    """Cosine of the angle between each row of ``X`` and each row of ``Y`` (default ``X``).
+
+    A row of zeros has similarity ``0`` with everything, as in scikit-learn.
+    """
+    X = _rows(X)
+    Y = X if Y is None else _rows(Y)
+
+    def unit(rows):
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        return rows / np.where(norms == 0, 1, norms)
+
+    return unit(X) @ unit(Y).T
+
+
+def euclidean_distances(X, Y=None) -> np.ndarray:
+    """Straight-line distance between each row of ``X`` and each row of ``Y`` (default ``X``)."""
+    X = _rows(X)
+    Y = X if Y is None else _rows(Y)
+    squared = (X * X).sum(axis=1)[:, None] - 2 * X @ Y.T + (Y * Y).sum(axis=1)[None, :]
+    distances = np.sqrt(np.maximum(squared, 0))
+    if Y is X:
+        # Each row is exactly zero from itself
+        np.fill_diagonal(distances, 0)
+    return distances
+
+
+METRICS = {"cosine": cosine_similarity, "euclidean": euclidean_distances}
+
+
+def normalize(df: pd.DataFrame, attributes: Iterable[str]) -> pd.DataFrame:
+    """Scale each attribute to 0-1, so that no attribute (``duration_ms``, say) outweighs the rest."""
+    values = df[list(attributes)].astype("float64")
+    spread = (values.max() - values.min()).replace(0, 1)
+    return (values - values.min()) / spread
+
+
+@traced("analyze")
+def similarity_frame(df: pd.DataFrame, attributes: Iterable[str], label: Optional[str] = None,
+                     metric: str = "cosine", scale: bool = False) -> pd.DataFrame:
+    """Every row compared with every other: a square frame indexed (both ways) by ``label``.
+
+    ``metric`` is ``"cosine"`` (higher is more similar) or ``"euclidean"``
+    (lower is more similar); ``scale`` first puts each attribute on 0-1.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {sorted(METRICS)}, not {metric!r}")
+    attributes = list(attributes)
+    values = normalize(df, attributes) if scale else df[attributes].astype("float64")
+    names = df[label] if label else df.index
+    return pd.DataFrame(METRICS[metric](values.to_numpy()), index=names, columns=names)
@@ -0,0 +1,80 @@
+"""The Spotify guide's ``spotify_tools`` helpers: audio features for playlists, users' playlists.
+
+Every function takes the caller's Spotipy client (``sp``), so this module
+does not import Spotipy itself.  Tracks that fail are reported with
+``warnings.warn`` and skipped, as the guide's ``print`` did::
+
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    from encoding_music import spotify
+
+    sp = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials(client_id, client_secret))
+    playlists = spotify.get_user_playlists("rich6833spot", sp)
+    features = spotify.get_multiple_audio_features_slowly(playlists, 2, sp)
+    spotify.audio_feature_radar(features.head(5), ["danceability", "energy", "valence"], "Five tracks").show()
+"""
+
+import time
+import warnings
+
+import pandas as pd
+
+from .tracing import traced
+
+
+@traced("fetch")
+def get_audio_features_slowly(playlist_tracks: pd.DataFrame, time_delay: float, sp) -> pd.DataFrame:
+    """Audio features of every track of a playlist (``pd.DataFrame(sp.user_playlist_tracks(...))``).
+
+    Waits ``time_delay`` seconds before each request, to stay within
+    Spotify's rate limits.
+    """
+    track_dict_list = []
+    for item in playlist_tracks["items"]:
+        track = item["track"]
+        try:
+            time.sleep(time_delay)
+            this_track_dict = {"track_id": track["id"], "track_title": track["name"],
+                               "artist_name": track["artists"][0]["name"]}
+            this_track_dict.update(sp.audio_features(track["id"])[0])
+            track_dict_list.append(this_track_dict)
+        except Exception as e:
+            warnings.warn(f"{track.get('id')}: {e}")
+    return pd.DataFrame(track_dict_list)
+
+
+def get_multiple_audio_features_slowly(playlist_dict: dict, time_delay: float, sp, playlist_delay: float = 30,
+                                       save_csv: bool = True) -> pd.DataFrame:
+    """Audio features of several playlists, ``{name: (creator_id, playlist_id)}``, in one frame.
+
+    Each playlist's name is in the ``playlist_title`` column; with
+    ``save_csv`` each is also written to ``<name>.csv`` as it completes.
+    """
+    list_of_audio_dfs = []
+    for playlist_name, (creator_id, playlist_id) in playlist_dict.items():
+        time.sleep(playlist_delay)
+        try:
+            playlist_tracks = pd.DataFrame(sp.user_playlist_tracks(creator_id, playlist_id))
+            audio_features = get_audio_features_slowly(playlist_tracks, time_delay, sp)
+            audio_features["playlist_title"] = playlist_name
+            if save_csv:
+                audio_features.to_csv(f"{playlist_name}.csv")
+            list_of_audio_dfs.append(audio_features)
+        except Exception as e:
+            warnings.warn(f"{playlist_name}: {e}")
+    return pd.concat(list_of_audio_dfs) if list_of_audio_dfs else pd.DataFrame()
+
+
+@traced("fetch")
+def get_user_playlists(user_id: str, spotify_client) -> dict:
+    """A user's public playlists as ``{name: (user_id, playlist_id)}``."""
+    playlists = spotify_client.user_playlists(user_id)
+    return {playlist["name"]: (user_id, playlist["id"]) for playlist in playlists["items"]}
+
+
+def audio_feature_radar(audio_feature_data: pd.DataFrame, feature_list, chart_title: str,
+                        label: str = "track_title"):
+    """The guide's radar chart: one trace per track (see :mod:`encoding_music.charts.radar`)."""
+    from .charts.radar import audio_feature_radar
+
+    return audio_feature_radar(audio_feature_data, feature_list, chart_title, label=label)
@@ -0,0 +1,381 @@
+"""Where a corpus run spends its time: spans, counters and peak memory, off unless asked for.
+
+The package's fetch, parse, analyze and render functions (``mei.getXML``,
+``mei.open_file``, ``networks.feature_graph``, ``networks.save_network``
+and so on) are wrapped in spans, and count the bytes they fetch, the notes
+they parse and the edges they build.  Nothing is recorded until tracing is
+turned on; until then a span is one global lookup and a shared no-op
+object (see ``python -m encoding_music.benchmarks.tracing_overhead``)::
+
+    from encoding_music import mei, tracing
+
+    with tracing.tracing(memory=True) as tracer:
+        for path in paths:
+            mei.extract_notes_simplified(mei.open_file(path))
+    print(tracer.report())                  # time per span, by stage, with counters
+    tracer.write_chrome_trace("run.json")   # open in chrome://tracing or ui.perfetto.dev
+
+Spans can be added to any code, as a decorator or a ``with`` block::
+
+    @tracing.traced("analyze")
+    def my_step(df): ...
+
+    with tracing.span("load playlists", "fetch"):
+        ...
+    tracing.count("bytes_fetched", len(body))
+
+Or trace a whole script: ``python -m encoding_music.tracing -o run.json my_corpus_run.py``.
+
+With ``memory=True`` a background thread samples the process's resident
+memory every ``interval`` seconds (and at each span's start and end), and
+each span reports the peak it saw.
+"""
+
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+STAGES = ("fetch", "parse", "analyze", "render")
+
+_tracer = None
+
+
+def _rss() -> Optional[int]:
+    """Resident memory of this process in bytes (``None`` where it cannot be read)."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current memory, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _NullSpan:
+    """What ``span`` returns while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "tid", "start", "rss")
+
+    def __init__(self, tracer, name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.tid = threading.get_ident()
+        self.tracer._stack().append(self)
+        self.rss = _rss() if self.tracer.memory else None
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.tracer._finish(self, end, exc_type)
+        return False
+
+
+class Tracer:
+    """Records spans, counters and memory samples while it is the active tracer.
+
+    Args:
+        memory: sample resident memory in a background thread
+        interval: seconds between memory samples
+    """
+
+    def __init__(self, memory: bool = False, interval: float = 0.01):
+        self.memory = memory and _rss() is not None
+        self.interval = interval
+        # (name, category, tid, start ns, end ns, args, rss at start, rss at end)
+        self.spans = []
+        self.counters = {}
+        # (ns, counter, running total), for the Chrome trace
+        self.counter_events = []
+        self.memory_times = []
+        self.memory_values = []
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self) -> "Tracer":
+        """Make this the active tracer."""
+        global _tracer
+        if _tracer is not None:
+            raise RuntimeError("tracing is already on; stop the active tracer first")
+        self.origin = time.perf_counter_ns()
+        if self.memory:
+            self._sample_memory()
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="tracing-memory", daemon=True)
+            self._sampler.start()
+        _tracer = self
+        return self
+
+    def stop(self) -> "Tracer":
+        global _tracer
+        if _tracer is self:
+            _tracer = None
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+            self._sample_memory()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _sample_memory(self):
+        self.memory_times.append(time.perf_counter_ns())
+        self.memory_values.append(_rss())
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample_memory()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self.thread_names[threading.get_ident()] = threading.current_thread().name
+        return stack
+
+    def span(self, name: str, category: str = "", **args) -> _Span:
+        return _Span(self, name, category, args)
+
+    def _finish(self, span: _Span, end: int, exc_type):
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        if exc_type is not None:
+            span.args["error"] = exc_type.__name__
+        self.spans.append((span.name, span.category, span.tid, span.start, end, span.args, span.rss,
+                           _rss() if self.memory else None))
+
+    def count(self, name: str, value=1):
+        """Add ``value`` to counter ``name``, and to the innermost open span's arguments."""
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self.counter_events.append((time.perf_counter_ns(), name, total))
+        stack = getattr(self._local, "stack", None)
+        if stack:
+            args = stack[-1].args
+            args[name] = args.get(name, 0) + value
+
+    def peak_memory(self, start: int, end: int) -> Optional[int]:
+        """Largest memory sample taken between two ``perf_counter_ns`` times."""
+        low = bisect.bisect_left(self.memory_times, start)
+        high = bisect.bisect_right(self.memory_times, end)
+        values = [value for value in self.memory_values[low:high] if value is not None]
+        return max(values) if values else None
+
+    def _self_times(self) -> list:
+        # Each span's duration minus its direct children's, per thread
+        own = [end - start for _, _, _, start, end, _, _, _ in self.spans]
+        order = sorted(range(len(self.spans)), key=lambda i: (self.spans[i][2], self.spans[i][3], -self.spans[i][4]))
+        open_spans = []
+        for i in order:
+            _, _, tid, start, end, _, _, _ = self.spans[i]
+            while open_spans and (self.spans[open_spans[-1]][2] != tid or self.spans[open_spans[-1]][4] <= start):
+                open_spans.pop()
+            if open_spans:
+                own[open_spans[-1]] -= end - start
+            open_spans.append(i)
+        return own
+
+    def summary(self) -> list:
+        """One row per span name: calls, total / self / mean / max seconds, peak memory, counters."""
+        rows = {}
+        for (name, category, _, start, end, args, rss_start, rss_end), own in zip(self.spans, self._self_times()):
+            row = rows.setdefault((category, name), {"stage": category, "span": name, "calls": 0, "total": 0.0,
+                                                     "self": 0.0, "max": 0.0, "peak_memory": None, "counters": {}})
+            seconds = (end - start) / 1e9
+            row["calls"] += 1
+            row["total"] += seconds
+            row["self"] += own / 1e9
+            row["max"] = max(row["max"], seconds)
+            if self.memory:
+                peaks = [value for value in (rss_start, rss_end, self.peak_memory(start, end)) if value is not None]
+                if peaks:
+                    row["peak_memory"] = max(peaks + [row["peak_memory"] or 0])
+            for counter in self.counters:
+                if counter in args:
+                    row["counters"][counter] = row["counters"].get(counter, 0) + args[counter]
+        for row in rows.values():
+            row["mean"] = row["total"] / row["calls"]
+        stage_order = {stage: i for i, stage in enumerate(STAGES)}
+        return sorted(rows.values(), key=lambda row: (stage_order.get(row["stage"], len(STAGES)), -row["self"]))
+
+    def report(self) -> str:
+        """The summary as a text table, followed by the counters and the run's peak memory."""
+        lines = [f"{'stage':<8} {'span':<40} {'calls':>6} {'total s':>9} {'self s':>9} {'mean ms':>9} "
+                 f"{'peak MB':>8}  counters"]
+        for row in self.summary():
+            peak = f"{row['peak_memory'] / 2 ** 20:8.1f}" if row["peak_memory"] else f"{'-':>8}"
+            counters = ", ".join(f"{name}={value:,}" for name, value in row["counters"].items())
+            lines.append(f"{row['stage'] or '-':<8} {row['span'][:40]:<40} {row['calls']:>6} {row['total']:>9.3f} "
+                         f"{row['self']:>9.3f} {row['mean'] * 1000:>9.2f} {peak}  {counters}")
+        if self.counters:
+            lines.append("counters: " + ", ".join(f"{name}={value:,}" for name, value in self.counters.items()))
+        peaks = [value for value in self.memory_values if value is not None]
+        if peaks:
+            lines.append(f"peak memory: {max(peaks) / 2 ** 20:.1f} MB")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """The trace in Chrome's Trace Event format (chrome://tracing, ui.perfetto.dev)."""
+        pid = os.getpid()
+
+        def us(ns):
+            return (ns - self.origin) / 1000
+
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for name, category, tid, start, end, args, _, _ in self.spans:
+            events.append({"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid, "ts": us(start),
+                           "dur": (end - start) / 1000, "args": args})
+        for ns, name, total in self.counter_events:
+            events.append({"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": us(ns), "args": {name: total}})
+        for ns, value in zip(self.memory_times, self.memory_values):
+            if value is not None:
+                events.append({"name": "memory", "ph": "C", "pid": pid, "tid": 0, "ts": us(ns),
+                               "args": {"MB": round(value / 2 ** 20, 2)}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path) -> Path:
+        path = Path(path)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.chrome_trace(), default=str), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+
+def active() -> Optional[Tracer]:
+    """The tracer recording now, or ``None`` while tracing is off."""
+    return _tracer
+
+
+def enable(memory: bool = False, interval: float = 0.01) -> Tracer:
+    """Start recording into a new ``Tracer`` and return it."""
+    return Tracer(memory, interval).start()
+
+
+def disable() -> Optional[Tracer]:
+    """Stop recording; returns the tracer that was active, if any."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.stop()
+    return tracer
+
+
+@contextmanager
+def tracing(memory: bool = False, interval: float = 0.01, chrome_trace=None):
+    """Record everything inside the ``with`` block; optionally write the Chrome trace at the end."""
+    tracer = enable(memory, interval)
+    try:
+        yield tracer
+    finally:
+        tracer.stop()
+        if chrome_trace:
+            tracer.write_chrome_trace(chrome_trace)
+
+
+def span(name: str, category: str = "", **args):
+    """A ``with`` block recorded as one span (a shared no-op while tracing is off)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, **args)
+
+
+def count(name: str, value=1):
+    """Add to a counter (``bytes_fetched``, ``notes_parsed``, ``edges_built``) while tracing is on."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def traced(category: str = "", name: Optional[str] = None):
+    """Decorator recording every call of a function as a span named ``module.function``."""
+    def decorate(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(label, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def main(argv: Optional[list] = None) -> int:
+    import argparse
+    import runpy
+
+    parser = argparse.ArgumentParser(prog="python -m encoding_music.tracing",
+                                     description="Run a Python script with tracing on and report where time went.")
+    parser.add_argument("-o", "--output", help="write a Chrome trace (JSON) here")
+    parser.add_argument("--memory", action="store_true", help="sample resident memory")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between memory samples")
+    parser.add_argument("script", help="the script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the script")
+    args = parser.parse_args(argv)
+
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, str(Path(args.script).resolve().parent))
+    exit_code = 0
+    with tracing(args.memory, args.interval, args.output) as tracer:
+        with tracer.span(Path(args.script).name, "script"):
+            try:
+                runpy.run_path(args.script, run_name="__main__")
+            except SystemExit as e:
+                # The script called sys.exit(): report anyway, then exit as it asked
+                exit_code = e.code
+    print(tracer.report(), file=sys.stderr)
+    if args.output:
+        print(f"Chrome trace written to {args.output}", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    # Run as a script this file is a second copy of the module; the hooks record into the package's copy
+    from encoding_music.tracing import main
+
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Benchmark runner: timing, discovery, storage and the compare exit code."""
+
+import sys
+import time
+
+from encoding_music.benchmarks import runner
+
+
+class Sleeper:
+    """A stand-in benchmark class, discovered from this module."""
+
+    params = (1, 2, 10)
+
+    def setup(self, scale):
+        self.delay = 0.002 * scale
+
+    def time_sleep(self, scale):
+        time.sleep(self.delay)
+
+    def time_small_only(self, scale):
+        if scale > 1:
+            raise NotImplementedError
+
+
+def test_measure_takes_the_median_and_loops_fast_functions():
+    slow = runner.measure(lambda: time.sleep(0.01), repeat=3)
+    assert slow["samples"] == 3 and slow["number"] == 1
+    assert 0.01 <= slow["min"] <= slow["median"] <= slow["max"] < 0.1
+
+    fast = runner.measure(lambda: None, repeat=3, min_sample=0.001)
+    assert fast["number"] > 1 and fast["median"] < 1e-4
+
+    # One call over half the time budget is the only sample
+    assert runner.measure(lambda: time.sleep(0.02), max_time=0.01)["samples"] == 1
+
+
+def test_run_names_each_benchmark_by_class_method_and_scale():
+    results = runner.run(scales=[1, 10], repeat=1, module=sys.modules[__name__], progress=None)
+    assert sorted(results, key=runner._name_key) == ["Sleeper.sleep[1x]", "Sleeper.sleep[10x]",
+                                                     "Sleeper.small_only[1x]", "Sleeper.small_only[10x]"]
+    assert results["Sleeper.sleep[10x]"]["median"] > results["Sleeper.sleep[1x]"]["median"]
+    assert results["Sleeper.small_only[10x]"] == {"skipped": "not run at this scale"}
+    assert list(runner.run("sleep", scales=[2], repeat=1, module=sys.modules[__name__], progress=None)) == [
+        "Sleeper.sleep[2x]"]
+
+
+def record(**medians):
+    return {"results": {name.replace("_", ".") + "[1x]": {"median": m} for name, m in medians.items()}}
+
+
+def test_compare_flags_changes_beyond_the_factor():
+    rows = runner.compare(record(A_same=1.0, B_slow=1.0, C_fast=1.0, D_gone=1.0),
+                          record(A_same=1.1, B_slow=1.5, C_fast=0.5, E_new=1.0), factor=1.2)
+    assert [(row[0], row[4]) for row in rows] == [("A.same[1x]", ""), ("B.slow[1x]", "slower"),
+                                                  ("C.fast[1x]", "faster"), ("D.gone[1x]", ""), ("E.new[1x]", "")]
+    assert rows[3][2] is None and rows[3][3] is None
+    assert sorted(["X.y[100x]", "X.y[2x]", "X.y[10x]"], key=runner._name_key) == ["X.y[2x]", "X.y[10x]", "X.y[100x]"]
+
+
+def test_compare_command_exits_1_on_a_slowdown(tmp_path, capsys):
+    storage = ["--machine", "ci", "--results", str(tmp_path)]
+    runner.save(record(A_x=1.0)["results"], commit="base1", machine="ci", results_dir=tmp_path)
+    runner.save(record(A_x=1.1)["results"], commit="head1", machine="ci", results_dir=tmp_path)
+    runner.save(record(A_x=2.0)["results"], commit="head2", machine="ci", results_dir=tmp_path)
+    assert runner.main(["compare", "base1", "head1", *storage]) == 0
+    assert runner.main(["compare", "base1", "head2", *storage]) == 1
+    assert "1 benchmark(s) slower" in capsys.readouterr().out
+    assert runner.main(["compare", "base1", "head2", "--factor", "3", *storage]) == 0
+
+    # Saving the same commit again merges the timings
+    runner.save({"B.y[1x]": {"median": 1.0}}, commit="base1", machine="ci", results_dir=tmp_path)
+    assert sorted(runner.load(runner.result_path("base1", "ci", tmp_path))["results"]) == ["A.x[1x]", "B.y[1x]"]
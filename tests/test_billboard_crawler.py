@@ -0,0 +1,110 @@
+"""BillboardCrawler against a saved chart-history page served on localhost."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from encoding_music.datasets.billboard_crawler import BillboardCrawler, parse_chart_history
+
+PAGE = (Path(__file__).resolve().parent / "fixtures" / "billboard_chart_history.html").read_bytes()
+
+
+class ChartServer(BaseHTTPRequestHandler):
+    """``/page`` with an ETag, ``/busy`` that answers 429 once, anything else 404."""
+
+    page = PAGE
+    etag = '"v1"'
+    busy = True
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/busy" and type(self).busy:
+            type(self).busy = False
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+        elif self.path in ("/page", "/busy"):
+            if self.headers.get("If-None-Match") == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", str(len(self.page)))
+            self.end_headers()
+            self.wfile.write(self.page)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (ChartServer,), {"requests": []})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def crawler(tmp_path, **kwargs):
+    return BillboardCrawler(tmp_path / "http", workers=2, delay=0, retries=2, timeout=5, **kwargs)
+
+
+def test_rows_match_the_guides_beautiful_soup_extraction():
+    bs4 = pytest.importorskip("bs4")
+    soup = bs4.BeautifulSoup(PAGE, "html.parser")
+    expected = []
+    for song in soup.find_all(attrs={"class": "o-chart-results-list-row"}):
+        details = song.find_all(attrs={"class": "o-chart-results-list__item"})
+        expected.append([song.h3.get_text(strip=True), song.h3.find_next("span").get_text(strip=True)]
+                        + [details[i].find_next(attrs={"class": "o-chart-results-list__item"}).get_text(strip=True)
+                           for i in range(4)])
+    assert parse_chart_history(PAGE).values.tolist() == expected
+
+
+def test_stale_page_is_revalidated_and_served_from_cache(server, tmp_path):
+    handler, base = server
+    pages = crawler(tmp_path, max_age=0)
+    assert pages.fetch(f"{base}/page") == PAGE
+    assert pages.fetch(f"{base}/page") == PAGE
+    assert handler.requests == [("/page", None), ("/page", '"v1"')]
+    assert pages.stats == {"cached": 0, "not_modified": 1, "downloaded": 1}
+
+
+def test_retry_after_is_honoured(server, tmp_path):
+    handler, base = server
+    assert crawler(tmp_path).fetch(f"{base}/busy") == PAGE
+    assert [path for path, _ in handler.requests] == ["/busy", "/busy"]
+
+
+def test_missing_page_is_listed_as_failed(server, tmp_path):
+    _, base = server
+    pages = crawler(tmp_path)
+    df = pages.crawl({"Miles Davis": f"{base}/page", "Nobody": f"{base}/missing"})
+    assert len(df) == 3
+    assert list(pages.queue.failed) == ["Nobody"]
+    assert "404" in pages.queue.failed["Nobody"]
+
+
+def test_resumed_crawl_fetches_nothing_until_pages_are_stale(server, tmp_path):
+    handler, base = server
+    urls = {"Miles Davis": f"{base}/page"}
+    first = crawler(tmp_path).crawl(urls, state=tmp_path / "crawl.json")
+    resumed = crawler(tmp_path).crawl(urls, state=tmp_path / "crawl.json")
+    assert len(handler.requests) == 1
+    assert resumed.equals(first)
+
+    # A finished page older than max_age is asked for again, and a new chart is picked up
+    handler.page = PAGE.replace(b"<span class=\"c-label\">29</span>", b"<span class=\"c-label\">30</span>")
+    handler.etag = '"v2"'
+    updated = crawler(tmp_path, max_age=0).crawl(urls, state=tmp_path / "crawl.json")
+    assert handler.requests[-1] == ("/page", '"v1"')
+    assert updated["total_weeks"].tolist() == [30, 18, 101]
@@ -0,0 +1,60 @@
+"""Typed lab-data loaders: same values as a plain read_csv, smaller frames, partitioned Parquet."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from encoding_music.datasets.billboard_spotify import (
+    BILLBOARD_SCHEMA, BILLBOARD_SPOTIFY_FOLDER, PARTITION_COLUMN, lab_data_path, load_billboard, load_spotify,
+    read_dataset, write_dataset)
+from encoding_music.datasets.schemas import Schema, apply_schema, memory_usage
+
+ARTISTS = ["Bob_Dylan", "Miles_Davis"]
+
+
+def plain(kind):
+    return pd.concat([pd.read_csv(lab_data_path(BILLBOARD_SPOTIFY_FOLDER, f"{artist}_{kind}.csv"))
+                      for artist in ARTISTS], ignore_index=True)
+
+
+def test_spotify_keeps_values_in_smaller_types():
+    default, typed = plain("Spotify"), load_spotify(ARTISTS)
+    assert len(typed) == len(default)
+    assert typed[PARTITION_COLUMN].cat.categories.tolist() == ["Bob Dylan", "Miles Davis"]
+    assert typed["energy"].dtype == "float32" and typed["duration_ms"].dtype == "int32"
+    np.testing.assert_allclose(typed["energy"], default["energy"], rtol=1e-6)
+    assert typed["duration_ms"].tolist() == default["duration_ms"].tolist()
+    assert typed["key"].astype(int).tolist() == default["key"].tolist()
+    assert memory_usage(typed) < memory_usage(default) / 2
+
+
+def test_billboard_dates_and_counts():
+    typed = load_billboard(ARTISTS)
+    assert typed["total_weeks"].tolist() == plain("Billboard")["total_weeks"].tolist()
+    assert typed["release_date"].dt.year.between(1950, pd.Timestamp.now().year).all()
+
+
+def test_schema_replaces_casts_and_keeps_missing_integers():
+    schema = Schema(dtypes={"mode": "int8", "weeks": "int16"},
+                    dates={"date": "%m.%d.%y"}, replace={"mode": {"Major": 1, "Minor": 0}})
+    df = apply_schema(pd.DataFrame({"mode": ["Major", "Minor", 1], "weeks": [3, None, "x"],
+                                    "date": ["03.14.64", "01.02.03", "bad"]}), schema)
+    assert df["mode"].tolist() == [1, 0, 1] and df["mode"].dtype == "int8"
+    assert df["weeks"].dtype == "Int16" and df["weeks"].isna().tolist() == [False, True, True]
+    assert df["date"].dt.year.tolist()[:2] == [1964, 2003] and pd.isna(df["date"].iloc[2])
+
+
+def test_partitioned_dataset_reads_back_one_artist(tmp_path):
+    pytest.importorskip("pyarrow")
+    spotify = load_spotify(ARTISTS)
+    write_dataset(spotify, tmp_path / "spotify")
+    assert sorted(path.name for path in (tmp_path / "spotify").iterdir()) == [
+        f"{PARTITION_COLUMN}=Bob%20Dylan", f"{PARTITION_COLUMN}=Miles%20Davis"]
+    dylan = read_dataset(tmp_path / "spotify", artists=["Bob Dylan"], columns=["track_name", "key", "energy"])
+    expected = spotify[spotify[PARTITION_COLUMN] == "Bob Dylan"]
+    assert dylan["track_name"].tolist() == expected["track_name"].tolist()
+    assert dylan["key"].dtype == spotify["key"].dtype
+
+    billboard = load_billboard(ARTISTS)
+    write_dataset(billboard, tmp_path / "billboard")
+    assert read_dataset(tmp_path / "billboard", schema=BILLBOARD_SCHEMA)["total_weeks"].dtype == "int16"
@@ -0,0 +1,44 @@
+"""Cantometrics code decoding against the powers-of-two definition."""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from encoding_music.datasets.cantometrics import (CODES, codes_of, decode_canto, decode_codes, unexpected_bits,
+                                                 unpack_canto)
+
+
+def test_decode_codes_matches_the_bits():
+    values = np.random.default_rng(0).integers(0, 2 ** 15, size=(50, 37))
+    decoded = decode_codes(values)
+    assert decoded.shape == (50, 37, len(CODES)) and decoded.dtype == bool
+    expected = ((values[..., None] >> CODES) & 1).astype(bool)
+    assert np.array_equal(decoded, expected)
+
+
+def test_sums_of_powers_of_two_give_back_their_codes():
+    # The guide's lookup covers one to three codes; four or more must work too
+    for count in range(1, 5):
+        for chosen in combinations(CODES.tolist(), count):
+            value = sum(2 ** code for code in chosen)
+            assert codes_of(value) == tuple(sorted(chosen, reverse=True))
+            assert CODES[decode_codes([value])[0]].tolist() == sorted(chosen)
+    assert unexpected_bits([1, 2, 2 ** 14, 20]).tolist() == [True, False, True, False]
+
+
+def test_canto_table_views_agree():
+    canto = pd.DataFrame({"song_id": [10, 11, 12], "line_2": [20, np.nan, 2 + 4 + 8 + 16],
+                          "line_10": [2, 0, 8192], "notes": ["a", "b", "c"]})
+    decoded = decode_canto(canto)
+    assert decoded.lines == ["line_2", "line_10"]
+    assert decoded.n_codes().values.tolist() == [[2, 1], [0, 0], [4, 1]]
+    assert decoded.counts().loc["line_2", 4] == 2
+    long = decoded.long()
+    assert len(long) == decoded.tensor.sum()
+    assert long[long["song_id"] == 12]["code"].tolist() == [1, 2, 3, 4, 13]
+
+    unpacked = unpack_canto(canto)
+    assert unpacked["line_2"].tolist() == [(4, 2), (), (4, 3, 2, 1)]
+    assert unpacked["line_10"].tolist() == [(1,), (), (13,)]
+    assert unpacked["notes"].tolist() == ["a", "b", "c"]
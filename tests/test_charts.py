@@ -0,0 +1,57 @@
+"""Radar chart specs, exported file names and the HTML page."""
+
+import pandas as pd
+import pytest
+
+from encoding_music.charts.radar import RadarRenderer, audio_feature_radar, radar_specs, to_html
+
+FEATURES = ["danceability", "energy", "valence"]
+TRACKS = pd.DataFrame({
+    "track_title": ["Help!", "Help!", "Yesterday"],
+    "album": ["Help!", "Help!", "Help!"],
+    "danceability": [0.5, 0.6, 0.3],
+    "energy": [0.9, 0.8, 0.2],
+    "valence": [0.7, 0.6, 0.3],
+})
+
+
+def test_radar_specs_shapes():
+    per_track = radar_specs(TRACKS, FEATURES)
+    assert list(per_track) == ["Help!", "Help! (2)", "Yesterday"]
+    trace = per_track["Yesterday"]["data"][0]
+    # The loop is closed by repeating the first feature
+    assert trace["theta"] == FEATURES + FEATURES[:1]
+    assert trace["r"] == [0.3, 0.2, 0.3, 0.3]
+
+    per_album = radar_specs(TRACKS, FEATURES, by="album", title="Album: {}")
+    assert list(per_album) == ["Help!"]
+    assert len(per_album["Help!"]["data"]) == 3
+    assert per_album["Help!"]["layout"]["title"]["text"] == "Album: Help!"
+
+
+def test_audio_feature_radar_keeps_braces_in_the_title():
+    pytest.importorskip("plotly")
+    fig = audio_feature_radar(TRACKS, FEATURES, "Songs {with} braces")
+    assert fig.layout.title.text == "Songs {with} braces"
+    assert len(fig.data) == 3
+
+
+def test_export_gives_clashing_names_their_own_files(tmp_path, monkeypatch):
+    image = tmp_path / "image.png"
+    image.write_bytes(b"png")
+    renderer = RadarRenderer(cache_dir=tmp_path / "cache", workers=1)
+    monkeypatch.setattr(renderer, "render", lambda specs: {name: image for name in specs})
+    exported = renderer.export({"Help!": {}, "Help?": {}, "help": {}, "": {}}, tmp_path / "out")
+    assert sorted(path.name for path in exported.values()) == ["Help.png", "Help_2.png", "chart.png", "help_3.png"]
+
+
+def test_to_html_includes_plotlyjs_only_when_asked(tmp_path):
+    pytest.importorskip("plotly")
+    specs = radar_specs(TRACKS, FEATURES, by="album")
+    cdn = to_html(specs, tmp_path / "cdn.html").read_text()
+    none = to_html(specs, tmp_path / "none.html", include_plotlyjs=False).read_text()
+    assert "cdn.plot.ly" in cdn
+    assert "cdn.plot.ly" not in none and len(none) < len(cdn)
+    assert "Plotly.newPlot" in none
+    with pytest.raises(ValueError):
+        to_html(specs, tmp_path / "bad.html", include_plotlyjs="yes")
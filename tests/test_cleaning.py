@@ -0,0 +1,39 @@
+"""Cleaning steps and the stage cache of ``Pipeline``."""
+
+import pandas as pd
+
+from encoding_music.datasets import DropNA, JoinLists, Pipeline, Replace
+
+
+def test_join_lists_keeps_non_string_items():
+    assert JoinLists("a")(pd.DataFrame({"a": [(1, 2), (3, 4)]}))["a"].tolist() == ["1_2", "3_4"]
+    assert JoinLists("a")(pd.DataFrame({"a": [(1, 2), "z"]}))["a"].tolist() == ["1_2", "z"]
+    assert JoinLists("a", "-")(pd.DataFrame({"a": [("x", "y"), ("z",)]}))["a"].tolist() == ["x-y", "z"]
+
+
+def test_pipeline_resumes_from_disk_and_holds_one_frame(tmp_path):
+    df = pd.DataFrame({"rank": [1, -1, 3, None], "title": ["Help!", "Yesterday", None, "Something"]})
+    steps = [DropNA(), Replace("rank", {-1: 0})]
+    expected = df.dropna().replace({"rank": {-1: 0}})
+
+    pipeline = Pipeline(steps, cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(pipeline(df), expected)
+    assert pipeline.timings["cached"].tolist() == [False, False, False]
+    assert len(list(tmp_path.glob("*.arrow"))) == 2
+
+    # A changed last step picks up after the first stage, read back from disk
+    rerun = Pipeline([steps[0], Replace("rank", {-1: 5})], cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(rerun(df), df.dropna().replace({"rank": {-1: 5}}))
+    assert rerun.timings["cached"].tolist() == [False, True, False]
+
+
+def test_pipeline_without_cache_dir_keeps_only_the_last_stage():
+    df = pd.DataFrame({"rank": [1, -1, None]})
+    pipeline = Pipeline([DropNA(), Replace("rank", {-1: 0})])
+    pipeline(df)
+    pipeline(df)
+    assert pipeline.timings["cached"].tolist() == [False, True, True]
+    # The first stage was not kept, so changing the last step starts over
+    pipeline.steps[-1] = Replace("rank", {-1: 5})
+    pipeline(df)
+    assert pipeline.timings["cached"].tolist() == [False, False, False]
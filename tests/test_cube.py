@@ -0,0 +1,80 @@
+"""CantoCube roll-ups against the guide's merge and group-by, before and after a refresh."""
+
+import numpy as np
+import pandas as pd
+
+from encoding_music.datasets.cantometrics import CODES
+from encoding_music.datasets.cube import CantoCube
+
+LINES = [f"line_{i}" for i in range(1, 6)]
+PLACES = [("Africa", "Western Africa", "Sahel", "s1"), ("Africa", "Western Africa", "Coast", "s2"),
+          ("Africa", "Eastern Africa", "Horn", "s3"), ("Oceania", "Melanesia", "Highlands", "s4"),
+          ("Oceania", "Polynesia", "Islands", "s5")]
+
+
+def tables(count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    place = np.array(PLACES, dtype=object)[rng.integers(0, len(PLACES), count)]
+    songs = pd.DataFrame(place, columns=["Region", "Division", "Subregion", "society_id"])
+    songs.insert(0, "song_id", np.arange(count))
+    songs["Genre"] = rng.choice(["Lullaby", "Dance Song", "Lullaby; Dance Song", None], size=count)
+    # One or two codes per line, and some lines not rated
+    codes = rng.choice(CODES, size=(count, len(LINES), 2))
+    values = (2 ** codes[..., 0]) | np.where(rng.random((count, len(LINES))) < 0.3, 2 ** codes[..., 1], 0)
+    values = np.where(rng.random((count, len(LINES))) < 0.1, 0, values)
+    canto = pd.DataFrame(values, columns=LINES)
+    canto.insert(0, "song_id", np.arange(count))
+    return canto, songs
+
+
+def merged(canto, songs, genre=None):
+    """The guide's way: merge on song_id, one mean code per song and line, then group."""
+    df = songs.merge(canto, on="song_id")
+    if genre is not None:
+        df = df[df["Genre"].fillna("").str.split(";").map(lambda labels: genre in [g.strip() for g in labels])]
+    for line in LINES:
+        bits = (df[line].to_numpy()[:, None] >> CODES) & 1
+        with np.errstate(invalid="ignore"):
+            df[line] = (bits * CODES).sum(axis=1) / np.where(bits.sum(axis=1), bits.sum(axis=1), np.nan)
+    return df
+
+
+def assert_means_match(cube, canto, songs, level, genre=None):
+    expected = merged(canto, songs, genre).groupby(level)[LINES].mean()
+    result = cube.means(level, genre=genre)
+    np.testing.assert_allclose(result.loc[expected.index, LINES].to_numpy(), expected.to_numpy())
+
+
+def test_means_and_counts_match_a_merge_and_groupby():
+    canto, songs = tables()
+    cube = CantoCube(canto, songs)
+    for level in ["Region", "Division", "society_id"]:
+        for genre in [None, "Lullaby", "Dance Song"]:
+            assert_means_match(cube, canto, songs, level, genre)
+
+    df = songs.merge(canto, on="song_id")
+    expected = pd.DataFrame({code: ((df["line_2"] >> code) & 1).groupby(df["Region"]).sum() for code in CODES})
+    assert cube.counts("Region", "line_2").values.tolist() == expected.values.tolist()
+    assert cube.sizes("Region").to_dict() == df["Region"].value_counts().to_dict()
+    assert cube.drill("Region", "Oceania").index.tolist() == ["Melanesia", "Polynesia"]
+
+
+def test_refresh_recomputes_changed_societies_only():
+    canto, songs = tables(seed=1)
+    cube = CantoCube(canto, songs)
+    new_canto, new_songs = canto.copy(), songs.copy()
+    new_canto.loc[new_canto["song_id"] == 3, "line_1"] = 2 ** 13
+    new_canto = new_canto[new_canto["song_id"] != 4]
+    new_songs.loc[new_songs["song_id"] == 5, "Genre"] = "Lament"
+    extra = pd.DataFrame([[999] + [2] * len(LINES)], columns=["song_id"] + LINES)
+    new_canto = pd.concat([new_canto, extra], ignore_index=True)
+    new_songs = pd.concat([new_songs, pd.DataFrame([[999, *PLACES[4], "Lament"]], columns=songs.columns)],
+                          ignore_index=True)
+
+    assert cube.refresh(new_canto, new_songs) == 4
+    assert cube.refresh(new_canto, new_songs) == 0
+    for genre in [None, "Lullaby", "Lament"]:
+        assert_means_match(cube, new_canto, new_songs, "society_id", genre)
+    rebuilt = CantoCube(new_canto, new_songs)
+    pd.testing.assert_frame_equal(cube.means("Division"), rebuilt.means("Division"))
+    assert cube.genres().to_dict() == rebuilt.genres().to_dict()
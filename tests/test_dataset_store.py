@@ -0,0 +1,63 @@
+"""DatasetStore round-trips of the Beatles lab pickles, and versioning of repeated writes."""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from encoding_music.datasets.store import DatasetStore, load_stage
+
+BEATLES = Path(__file__).resolve().parent.parent / "02_Lab_Data" / "Beatles"
+
+
+def as_objects(df):
+    """Every cell as a Python object, with None for missing values."""
+    return df.astype(object).where(df.notna(), None)
+
+
+def assert_same_frame(result, expected):
+    # Text may come back in pandas' string dtype (NaN for missing) where the pickle has object (None)
+    pd.testing.assert_frame_equal(as_objects(result), as_objects(expected), check_column_type=False)
+    for column in expected.select_dtypes(exclude="object"):
+        assert result[column].dtype == expected[column].dtype
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_pickles_round_trip(tmp_path, format):
+    store = DatasetStore(tmp_path, format=format)
+    for path in sorted(BEATLES.glob("*.pkl")):
+        expected = pd.read_pickle(path)
+        store.write(path.stem, expected, source=path)
+        assert_same_frame(store.read(path.stem), expected)
+    assert store.stages() == sorted(path.stem for path in BEATLES.glob("*.pkl"))
+    ranks = store.read("our_clean_beatles_data", columns=["Song Title", "Genre Tags"])
+    assert list(ranks.columns) == ["Song Title", "Genre Tags"]
+    assert isinstance(ranks["Genre Tags"].iloc[0], list)
+
+
+def test_identical_data_keeps_its_version(tmp_path):
+    store = DatasetStore(tmp_path, format="parquet")
+    df = pd.read_pickle(BEATLES / "beatles_data_combined_clean_tidy.pkl")
+    assert store.write("tidy", df) == 1
+    assert store.write("tidy", df.copy()) == 1
+    assert store.write("tidy", df.head(10)) == 2
+    assert len(store.read("tidy", version=1)) == len(df) and len(store.read("tidy")) == 10
+    assert store.metadata("tidy", 2)["rows"] == 10
+    with pytest.raises(KeyError):
+        store.read("tidy", version=3)
+
+
+def test_load_stage_converts_once_and_follows_the_pickle(tmp_path):
+    pickle = tmp_path / "tidy.pkl"
+    shutil.copyfile(BEATLES / "beatles_data_combined_clean_tidy.pkl", pickle)
+    first = load_stage(pickle, columns=["song"])
+    store = DatasetStore(tmp_path / "stages")
+    assert store.versions("tidy") == [1] and store.source_is_current("tidy", pickle)
+
+    load_stage(pickle)
+    assert store.versions("tidy") == [1]
+    pd.read_pickle(pickle).head(5).to_pickle(pickle)
+    assert not store.source_is_current("tidy", pickle)
+    assert len(load_stage(pickle)) == 5 < len(first)
+    assert store.versions("tidy") == [1, 2]
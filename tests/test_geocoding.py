@@ -0,0 +1,72 @@
+"""Geocoder with an offline stand-in for the remote geocoder and a temporary cache."""
+
+import threading
+
+from encoding_music.datasets.geocoding import Gazetteer, Geocoder, normalize_address
+
+
+class FakeRemote:
+    """Answers from a dict, counting every lookup; ``fail`` raises like a network error."""
+
+    name = "fake"
+
+    def __init__(self, places: dict, fail=()):
+        self.places = places
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def lookup(self, query):
+        with self._lock:
+            self.calls.append(query)
+        if query in self.fail:
+            raise ConnectionError("no route to host")
+        return self.places.get(query)
+
+
+PLACES = {"bryn mawr college": (40.0276, -75.3136), "haverford college": (40.0093, -75.3055)}
+
+
+def test_spellings_of_one_address_make_one_lookup(tmp_path):
+    remote = FakeRemote(PLACES)
+    geocoder = Geocoder(remote=[remote], cache=tmp_path / "cache.jsonl")
+    df = geocoder.geocode(["Bryn  Mawr College.", "bryn mawr college", "Bryn Mawr College", None])
+    assert remote.calls == ["bryn mawr college"]
+    assert df["latitude"].tolist()[:3] == [40.0276] * 3
+    assert df["latitude"].isna().tolist()[3]
+    assert normalize_address(" Haverford ,  PA ") == "haverford, pa"
+
+
+def test_gazetteer_answers_before_the_remote(tmp_path):
+    remote = FakeRemote(PLACES)
+    local = Gazetteer({"Haverford College": (1.0, 2.0)}, name="campus")
+    geocoder = Geocoder([local], remote=[remote], cache=tmp_path / "cache.jsonl")
+    df = geocoder.geocode(["Haverford College", "Bryn Mawr College"])
+    assert remote.calls == ["bryn mawr college"]
+    assert df["source"].tolist() == ["campus", "fake"]
+    assert geocoder.locate("haverford college") == (1.0, 2.0)
+
+
+def test_not_found_is_cached_but_errors_are_not(tmp_path):
+    cache = tmp_path / "cache.jsonl"
+    remote = FakeRemote(PLACES, fail={"haverford college"})
+    geocoder = Geocoder(remote=[remote], cache=cache)
+    geocoder.geocode(["Atlantis", "Haverford College"])
+    assert geocoder.stats["not_found"] == 1 and geocoder.stats["error"] == 1
+    assert list(geocoder.errors) == ["haverford college"]
+
+    remote = FakeRemote(PLACES)
+    again = Geocoder(remote=[remote], cache=cache)
+    df = again.geocode(["Atlantis", "Haverford College"])
+    assert remote.calls == ["haverford college"]
+    assert df["latitude"].isna().tolist() == [True, False]
+
+
+def test_second_geocoder_on_the_same_cache_makes_no_remote_calls(tmp_path):
+    cache = tmp_path / "cache.jsonl"
+    addresses = ["Bryn Mawr College", "Haverford College", "Atlantis"]
+    first = Geocoder(remote=[FakeRemote(PLACES)], cache=cache).geocode(addresses)
+    remote = FakeRemote(PLACES)
+    second = Geocoder(remote=[remote], cache=cache).geocode(addresses)
+    assert remote.calls == []
+    assert second[["latitude", "longitude"]].equals(first[["latitude", "longitude"]])
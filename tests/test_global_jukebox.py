@@ -0,0 +1,79 @@
+"""Global Jukebox snapshots from a local server: compact types and conditional downloads."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pyarrow as pa
+import pytest
+
+from encoding_music.datasets.global_jukebox import GlobalJukebox, compact_types, snapshot
+
+CANTO = b"song_id,line_1,line_2,duration,year\n1,2,8192,200000,1958\n2,20,4,185000,1961\n3,16384,,90000,1975\n"
+SONGS = "song_id,Region,Genre\n1,Africa,Lullaby\n2,Africa,Dance\xa0Song\n3,Oceania,Lullaby\n".encode()
+
+
+class JukeboxServer(BaseHTTPRequestHandler):
+    """``raw/data.csv`` and ``raw/songs.csv`` with ETags, answering ``304`` to a matching ``If-None-Match``."""
+
+    files = {"/raw/data.csv": (CANTO, '"c1"'), "/raw/songs.csv": (SONGS, '"s1"')}
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in self.files:
+            self.send_error(404)
+            return
+        body, etag = self.files[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (JukeboxServer,), {"requests": [], "files": dict(JukeboxServer.files)})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_only_code_columns_are_narrowed():
+    table = compact_types(pa.table({"song_id": [1, 2], "line_1": [2, 8192], "line_2": [4, 16],
+                                    "duration": [200000, 90], "year": [1958, 1961], "Region": ["a", "a"]}))
+    types = dict(zip(table.column_names, map(str, table.schema.types)))
+    assert types == {"song_id": "int64", "line_1": "int16", "line_2": "int8", "duration": "int64",
+                     "year": "int64", "Region": "dictionary<values=string, indices=int32, ordered=0>"}
+
+
+def test_snapshot_downloads_only_changed_tables(server, tmp_path):
+    handler, base = server
+    manifest = snapshot(tmp_path, tables=["canto", "songs"], base_url=base)
+    assert manifest["canto"]["etag"] == '"c1"' and manifest["songs"]["rows"] == 3
+    gjb = GlobalJukebox(tmp_path)
+    assert gjb.songs["Genre"].tolist() == ["Lullaby", "Dance Song", "Lullaby"]
+    assert gjb.canto["duration"].dtype == "int64" and gjb.canto["line_1"].dtype == "int16"
+
+    # Nothing changed: two 304s, and the Parquet files are left alone
+    written = (tmp_path / "canto.parquet").stat().st_mtime_ns
+    snapshot(tmp_path, tables=["canto", "songs"], base_url=base)
+    assert handler.requests[2:] == [("/raw/data.csv", '"c1"'), ("/raw/songs.csv", '"s1"')]
+    assert (tmp_path / "canto.parquet").stat().st_mtime_ns == written
+
+    # A new version of one table is downloaded and replaces the saved one
+    handler.files["/raw/songs.csv"] = (SONGS + b"4,Europe,Lament\n", '"s2"')
+    manifest = snapshot(tmp_path, tables=["canto", "songs"], base_url=base)
+    assert manifest["songs"]["rows"] == 4 and manifest["songs"]["etag"] == '"s2"'
+    assert manifest["canto"]["fetched"] <= manifest["canto"]["checked"]
+    assert GlobalJukebox(tmp_path).songs["Region"].tolist()[-1] == "Europe"
@@ -0,0 +1,78 @@
+"""LabelIndex masks, counts and crosstabs against the same questions asked of an exploded table."""
+
+import numpy as np
+import pandas as pd
+
+from encoding_music.datasets.multilabel import LabelIndex, SongLabels
+
+GENRES = ["Lullaby", "Dance Song", "Lullaby for twins", "Work Song", "Lament"]
+INSTRUMENTS = ["Drum", "Rattle", "Flute"]
+
+
+def songs(count=300, seed=0):
+    """Random songs with messy multi-label fields: stray spaces, repeats, blanks and missing values."""
+    rng = np.random.default_rng(seed)
+
+    def field(vocabulary):
+        values = []
+        for _ in range(count):
+            labels = list(rng.choice(vocabulary, size=rng.integers(0, 4)))
+            values.append(None if not labels else " ;".join(labels + [""] * rng.integers(0, 2)))
+        return values
+
+    return pd.DataFrame({"Genre": field(GENRES), "Instruments": field(INSTRUMENTS),
+                         "Region": rng.choice(["Africa", "Oceania", "Europe", None], size=count)},
+                        index=pd.RangeIndex(100, 100 + count, name="song_id"))
+
+
+def exploded(df, field):
+    """The guide's approach: (song_id, label) rows from split and explode, without blanks or repeats."""
+    long = df[field].str.split(";").explode().str.strip()
+    return long[long.fillna("") != ""].reset_index().drop_duplicates()
+
+
+def songs_with(long, label):
+    return set(long.loc[long.iloc[:, 1] == label, "song_id"])
+
+
+def test_masks_match_exploded_lookups():
+    df = songs()
+    genre = LabelIndex(df["Genre"])
+    long = exploded(df, "Genre")
+    for label in GENRES:
+        assert genre.mask(label).tolist() == df.index.isin(songs_with(long, label)).tolist()
+    both = songs_with(long, "Lullaby") & songs_with(long, "Lament")
+    assert genre.mask(["Lullaby", "Lament"], how="all").tolist() == df.index.isin(both).tolist()
+    either = songs_with(long, "Lullaby") | songs_with(long, "Lament")
+    assert genre.mask(["Lullaby", "Lament"]).tolist() == df.index.isin(either).tolist()
+    # "Lullaby" is a label, not a substring of "Lullaby for twins"
+    assert genre.mask("Lullaby").sum() < df["Genre"].str.contains("Lullaby").sum()
+    for row, song_id in enumerate(df.index[:20]):
+        assert set(genre.labels(row)) == set(long.loc[long["song_id"] == song_id, "Genre"])
+
+
+def test_counts_and_crosstab_match_exploded_groupbys():
+    df = songs(seed=1)
+    labels = SongLabels(df)
+    long = exploded(df, "Genre")
+    counts = long["Genre"].value_counts()
+    assert labels["Genre"].value_counts().sort_index().to_dict() == counts.sort_index().to_dict()
+
+    with_region = long.join(df["Region"], on="song_id")
+    expected = pd.crosstab(with_region["Genre"], with_region["Region"])
+    result = labels.crosstab("Genre", by="Region")
+    assert result.loc[expected.index, expected.columns].values.tolist() == expected.values.tolist()
+
+    # Restricted to songs with a drum
+    drum_songs = songs_with(exploded(df, "Instruments"), "Drum")
+    expected = long[long["song_id"].isin(drum_songs)]["Genre"].value_counts()
+    result = labels.value_counts("Genre", Instruments="Drum")
+    assert result[result > 0].sort_index().to_dict() == expected.sort_index().to_dict()
+    assert labels.filter(Instruments="Drum").index.tolist() == sorted(drum_songs)
+
+
+def test_to_frame_is_explode_without_repeats():
+    df = songs(seed=2)
+    frame = LabelIndex(df["Genre"]).to_frame()
+    expected = exploded(df, "Genre")
+    assert sorted(map(tuple, frame.values.tolist())) == sorted(map(tuple, expected.values.tolist()))
@@ -0,0 +1,34 @@
+"""Feature networks against the guide's pairwise comparison."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from encoding_music.networks import _close_pairs, feature_graph, unique_pairs
+
+
+def brute_force_pairs(values, threshold):
+    return {(a, b) for a in range(len(values)) for b in range(a + 1, len(values))
+            if abs(values[a] - values[b]) <= threshold}
+
+
+@pytest.mark.parametrize("threshold", [0.001, 0.005, 0.05])
+def test_close_pairs_match_a_pair_scan(threshold):
+    # Three decimals, like the Spotify features: many differences land on the threshold
+    values = np.round(np.random.default_rng(1).random(400), 3)
+    i, j = _close_pairs(values, threshold)
+    assert {tuple(sorted(pair)) for pair in zip(i.tolist(), j.tolist())} == brute_force_pairs(values, threshold)
+    assert len(i) == len(brute_force_pairs(values, threshold))
+
+
+def test_feature_graph_edges_match_the_guide():
+    pytest.importorskip("networkx")
+    df = pd.DataFrame({"song": ["a", "b", "c", "d", "a"], "danceability": [0.418, 0.423, 0.5, 0.4235, 0.9]})
+    G = feature_graph(df, "song", "danceability", 0.005, communities=False)
+    # 0.423 - 0.418 is 0.0050000000000000044 in floating point: no edge, as in the guide
+    assert sorted(tuple(sorted(edge)) for edge in G.edges()) == [("b", "d")]
+    assert G.nodes["b"]["title"] == "danceability: 0.423"
+
+
+def test_unique_pairs_ignore_order_and_self_pairs():
+    assert unique_pairs([["b", "a", "a"], ["a", "b"], ["c"]]) == [("a", "b")]
@@ -0,0 +1,119 @@
+"""Chunking, the on-disk embedding index and ingest, with the deterministic hashing embedding."""
+
+import shutil
+import time
+
+import numpy as np
+
+from encoding_music.rag import EmbeddingIndex, HashingEmbedding, file_hash, split_text
+from encoding_music.rag.ingest import ingest_files, iter_extracted
+
+WORDS = ("allegro adagio sonata fugue canon motet chorale minuet rondo scherzo "
+         "trumpet violin cello oboe flute horn timpani organ harp viola").split()
+
+
+def text(seed, words=400):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(WORDS, words))
+
+
+def test_chunks_cover_text_and_overlap():
+    document = text(0)
+    chunks = split_text(document, chunk_size=100, chunk_overlap=10)
+    assert len(chunks) > 10
+    for offset, chunk in chunks:
+        assert document[offset:offset + len(chunk)] == chunk
+        assert len(chunk) <= 100
+    for (start, chunk), (next_start, _) in zip(chunks, chunks[1:]):
+        assert start < next_start
+        assert start + len(chunk) - next_start >= 10
+    assert chunks[-1][0] + len(chunks[-1][1]) == len(document)
+
+
+def test_ingest_dedup_remove_and_reopen(tmp_path):
+    index = EmbeddingIndex(tmp_path, embed=HashingEmbedding(64), chunk_size=200, chunk_overlap=20)
+    added = index.add_document("a.pdf", text(1), {"Year": "2019"})
+    assert added > 0
+    assert index.add_document("a.pdf", text(1)) == 0
+    assert index.count == added
+
+    # The same contents under a second name are stored once but known by both names
+    assert index.add_document("copy.pdf", text(1)) == 0
+    assert index.count == added
+    assert index.remove_source("a.pdf")
+    assert len(index) == added
+    assert index.search("sonata", k=1)
+
+    # An edited file replaces its old chunks
+    index.add_document("b.pdf", text(2))
+    index.add_document("b.pdf", text(3))
+    live_sources = {index.chunks[row]["file_hash"] for row in np.flatnonzero(index.live_mask())}
+    assert live_sources == {index.sources["copy.pdf"], index.sources["b.pdf"]}
+
+    reopened = EmbeddingIndex(tmp_path, embed=HashingEmbedding(64), chunk_size=200, chunk_overlap=20)
+    assert reopened.sources == index.sources
+    assert len(reopened) == len(index)
+    query = "fugue canon trumpet"
+    assert [hit["row"] for hit in reopened.search(query, k=3)] == [hit["row"] for hit in index.search(query, k=3)]
+
+    assert reopened.remove_source("copy.pdf")
+    reopened.compact()
+    assert reopened.count == len(reopened)
+    assert {chunk["file_hash"] for chunk in reopened.chunks} == {reopened.sources["b.pdf"]}
+    assert not reopened.remove_source("a.pdf")
+
+
+def read_text_pages(path):
+    return [path.read_text()]
+
+
+def test_ingest_files_reports_missing_files_and_records_copies(tmp_path):
+    (tmp_path / "a.txt").write_text(text(4))
+    (tmp_path / "copy.txt").write_text(text(4))
+    index = EmbeddingIndex(tmp_path / "index", embed=HashingEmbedding(64))
+    report = ingest_files(index, [tmp_path / "a.txt", tmp_path / "missing.txt"],
+                          workers=1, read_pages=read_text_pages)
+    assert report.files == 1
+    assert [source for source, _ in report.failed] == ["missing.txt"]
+
+    report = ingest_files(index, [tmp_path / "a.txt", tmp_path / "copy.txt"],
+                          workers=1, read_pages=read_text_pages)
+    assert (report.files, report.skipped) == (0, 2)
+    reopened = EmbeddingIndex(tmp_path / "index", embed=HashingEmbedding(64))
+    assert reopened.sources["copy.txt"] == reopened.sources["a.txt"]
+
+
+def slow_text_pages(path):
+    """Reads a text file slowly, leaving a marker so the test can see which files a worker opened."""
+    time.sleep(0.1)
+    (path.parent / "opened").mkdir(exist_ok=True)
+    (path.parent / "opened" / path.name).touch()
+    if path.name.startswith("bad"):
+        raise ValueError("not a PDF")
+    return [path.read_text()]
+
+
+def test_pool_skips_known_files_in_the_parent_and_cancels_on_stop(tmp_path):
+    for i in range(12):
+        (tmp_path / f"{i:02}.txt").write_text(text(10 + i))
+    (tmp_path / "bad.txt").write_text("x")
+    known = {file_hash(tmp_path / "00.txt"), file_hash(tmp_path / "01.txt")}
+
+    paths = sorted(tmp_path.glob("*.txt"))
+    extracted = {item.source: item for item in iter_extracted(paths, known_hashes=known, workers=2,
+                                                              read_pages=slow_text_pages)}
+    assert sorted(extracted) == [path.name for path in paths]
+    assert extracted["00.txt"].skipped and extracted["01.txt"].skipped
+    assert extracted["bad.txt"].error == "ValueError: not a PDF"
+    opened = sorted(path.name for path in (tmp_path / "opened").iterdir())
+    assert "00.txt" not in opened and "01.txt" not in opened and len(opened) == 11
+    assert extracted["05.txt"].chunks == split_text(text(15))
+
+    # Stopping after the first file leaves the rest of the queue unread
+    shutil.rmtree(tmp_path / "opened")
+    start = time.perf_counter()
+    files = iter_extracted(paths[2:], workers=2, read_pages=slow_text_pages)
+    next(files)
+    files.close()
+    assert len(list((tmp_path / "opened").iterdir())) < 8
+    assert time.perf_counter() - start < 0.8
@@ -0,0 +1,33 @@
+"""ScoreCache with a stand-in parser, so no score is actually parsed."""
+
+import threading
+import time
+
+from encoding_music.scores import cache as cache_module
+from encoding_music.scores.cache import ScoreCache
+
+
+def test_each_score_parses_once_and_scores_parse_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "freeze", lambda stream: b"frozen")
+    parsed = []
+
+    def slow_parse(path):
+        parsed.append(path)
+        time.sleep(0.2)
+        return path
+
+    cache = ScoreCache(cache_dir=None, parser=slow_parse)
+    paths = [tmp_path / f"duo_{i}.mei" for i in range(4)]
+    for path in paths:
+        path.write_text("<mei/>")
+    threads = [threading.Thread(target=cache.get, args=(path,)) for path in paths for _ in range(3)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(parsed) == sorted(str(path.resolve()) for path in paths)
+    assert (cache.misses, cache.hits) == (4, 8)
+    # Four parses side by side, not one after another
+    assert time.perf_counter() - start < 0.6
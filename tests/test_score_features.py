@@ -0,0 +1,51 @@
+"""Feature sidecars: contents checked against music21, and refreshed only when the score changes."""
+
+import json
+import os
+import shutil
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from encoding_music.scores import features as features_module
+from encoding_music.scores.features import FeatureStore, build_features, compute_features, sidecar_path
+
+DUOS = Path(__file__).resolve().parent.parent / "02_Lab_Data" / "Duos_For_Intervals"
+
+
+def test_pitch_histogram_matches_music21():
+    music21 = pytest.importorskip("music21")
+    path = DUOS / "Bach_BWV_0772.mei"
+    score = music21.converter.parse(str(path))
+    # A chord counts as one note per pitch
+    pitches = Counter(pitch.midi for note in score.recurse().notes for pitch in note.pitches)
+    features = compute_features(path)
+    assert {int(p): c for p, c in features["total"]["pitches"].items()} == pitches
+    assert features["total"]["notes"] == sum(voice["notes"] for voice in features["voices"].values())
+    assert sum(features["total"]["pitch_classes"]) == features["total"]["notes"]
+    assert features["measures"] == len(score.parts[0].getElementsByClass("Measure"))
+
+
+def test_sidecars_survive_a_new_mtime_but_not_an_edit(tmp_path, monkeypatch):
+    score = tmp_path / "Bach_BWV_0772.mei"
+    shutil.copyfile(DUOS / score.name, score)
+    assert build_features(tmp_path) == {"written": 1, "fresh": 0}
+    assert build_features(tmp_path) == {"written": 0, "fresh": 1}
+
+    # A checkout that only touches the file keeps the sidecar
+    os.utime(score, ns=(0, 0))
+    store = FeatureStore(tmp_path)
+    computed = []
+    monkeypatch.setattr(features_module, "read_score",
+                        lambda path, _read=features_module.read_score: computed.append(path) or _read(path))
+    notes = store.note_counts("Bach_BWV_0772")
+    assert computed == []
+
+    # Removing the last note is noticed and the sidecar is rewritten
+    text = score.read_text()
+    end = text.rindex("<note ")
+    score.write_text(text[:end] + text[text.index("/>", end) + 2:])
+    assert sum(store.note_counts("Bach_BWV_0772").values()) == sum(notes.values()) - 1
+    assert len(computed) == 1
+    assert json.loads(sidecar_path(score).read_text())["source"]["size"] == score.stat().st_size
@@ -0,0 +1,43 @@
+"""Score summaries and the BM25 score search over them."""
+
+from pathlib import Path
+
+from encoding_music.scores.mei import read_score, title_key
+from encoding_music.scores.retrieval import ScoreIndex
+
+DUOS = Path(__file__).resolve().parent.parent / "02_Lab_Data" / "Duos_For_Intervals"
+
+SUMMARIES = {
+    "Bartok_Mikrokosmos_024": {"composer": "Bartok, Bela", "common_intervals": ["M2", "m2", "P1"]},
+    "Bartok_Mikrokosmos_026": {"composer": "Bartok, Bela", "common_intervals": ["m3", "M2", "P4"]},
+    "Bach_BWV_0772": {"composer": "Bach, Johann Sebastian", "key": "C major"},
+    "Morley_1595_09_In_nets_of_golden": {"composer": "Morley, Thomas", "title": "In nets of golden"},
+}
+
+
+def test_stop_words_do_not_outrank_content_words():
+    scores = ScoreIndex(SUMMARIES)
+    assert scores.search("Bartok duos with lots of seconds", k=2) == ["Bartok_Mikrokosmos_024",
+                                                                      "Bartok_Mikrokosmos_026"]
+    assert scores.search("In nets of golden", k=1) == ["Morley_1595_09_In_nets_of_golden"]
+
+
+def test_filter_narrows_search():
+    scores = ScoreIndex(SUMMARIES)
+    assert scores.search("C major", filter={"composer": "Bach, Johann Sebastian"}) == ["Bach_BWV_0772"]
+    assert scores.search("Bartok", filter={"composer": "Morley, Thomas"}) == []
+    assert scores.search("", filter={"composer": "Morley, Thomas"}) == ["Morley_1595_09_In_nets_of_golden"]
+
+
+def test_unrelated_question_finds_nothing():
+    scores = ScoreIndex(SUMMARIES)
+    assert scores.search("zzz quux") == []
+    assert scores.context("zzz quux") == ""
+
+
+def test_minor_invention_keeps_its_key():
+    # The file says key.mode="major" like every duo; the title is right
+    assert read_score(DUOS / "Bach_BWV_0775.mei")["key"] == "D minor"
+    assert read_score(DUOS / "Bartok_Mikrokosmos_024.mei")["key"] == "3 sharps"
+    assert title_key("Invention No. 5 in E-flat major") == "Eb major"
+    assert title_key("Mikrokosmos No. 103: Minor and Major") is None
@@ -0,0 +1,57 @@
+"""Survey loading: the content-hash cache key, the Parquet snapshot and the remote refresh."""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+SOUNDMAP = Path(__file__).resolve().parents[1] / "06_SoundMap"
+sys.path.insert(0, str(SOUNDMAP))
+
+import sound_map_data  # noqa: E402
+from sound_map_data import data_version, read_csv, read_survey, refresh_from_remote  # noqa: E402
+
+
+@pytest.fixture
+def survey(tmp_path):
+    path = tmp_path / "bicomap.csv"
+    shutil.copyfile(sound_map_data.LOCAL_CSV, path)
+    return path
+
+
+def test_version_changes_only_with_the_content(survey, tmp_path):
+    version = data_version(survey)
+    copy = tmp_path / "copy.csv"
+    shutil.copyfile(survey, copy)
+    assert data_version(copy) == version
+    with open(survey, "a") as f:
+        f.write(",,Haverford,,,,40.0,-75.3,,,,,,,,,,,\n")
+    assert data_version(survey) != version
+
+
+def test_snapshot_is_used_only_while_it_matches_the_csv(survey, tmp_path):
+    pytest.importorskip("pyarrow")
+    parquet = sound_map_data.write_parquet_snapshot(survey, tmp_path / "bicomap.parquet")
+    expected = read_csv(survey)
+    from_snapshot = read_survey(survey, parquet)
+    assert from_snapshot.equals(expected)
+    assert from_snapshot["volume"].dtype == "float32" and from_snapshot["campus"].dtype == "category"
+
+    # A stale snapshot is ignored in favour of the edited CSV
+    survey.write_text(survey.read_text().replace("Health and Wellness Building lobby", "The Well"))
+    assert read_survey(survey, parquet)["location"].iloc[0] == "The Well"
+
+
+def test_refresh_writes_the_cache_copy_and_never_the_bundled_csv(survey, tmp_path):
+    bundled = data_version(sound_map_data.LOCAL_CSV)
+    cached = tmp_path / "cache" / "bicomap.csv"
+    assert not refresh_from_remote(sound_map_data.LOCAL_CSV.as_uri(), cached)
+    assert not cached.exists()
+
+    with open(survey, "a") as f:
+        f.write(",,Haverford,,,,40.0,-75.3,,,,,,,,,,,\n")
+    assert refresh_from_remote(survey.as_uri(), cached)
+    assert len(read_csv(cached)) == len(read_csv(survey))
+    assert data_version(sound_map_data.LOCAL_CSV) == bundled
+    assert list(cached.parent.iterdir()) == [cached]
@@ -0,0 +1,38 @@
+"""FilterIndex masks against the same filters written as pandas expressions."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+SOUNDMAP = Path(__file__).resolve().parents[1] / "06_SoundMap"
+sys.path.insert(0, str(SOUNDMAP))
+
+from sound_map_filters import build_filter_index  # noqa: E402
+
+SURVEY = pd.read_csv(SOUNDMAP / "bicomap.csv")
+
+
+def pandas_purposes(df, selected):
+    labels = df["purpose"].fillna("").str.split(";").map(lambda parts: {p.strip().capitalize() for p in parts})
+    return labels.map(lambda row: bool(row & set(selected))).to_numpy()
+
+
+def test_purpose_and_range_masks_match_pandas():
+    index = build_filter_index(SURVEY)
+    selected = ["Academic", "Social"]
+    volume = pd.to_numeric(SURVEY["volume"], errors="coerce")
+    pitch = pd.to_numeric(SURVEY["pitch"], errors="coerce")
+    expected = pandas_purposes(SURVEY, selected) & volume.between(2, 5).to_numpy() & (pitch >= 4).to_numpy()
+
+    mask = index.mask(selected, {"volume": (2, 5), "pitch": (4, index.ranges["pitch"][1])})
+    assert 0 < mask.sum() < len(SURVEY)
+    assert mask.tolist() == expected.tolist()
+    assert index.filter(selected).index.tolist() == pandas_purposes(SURVEY, selected).nonzero()[0].tolist()
+
+
+def test_untouched_filters_keep_every_row():
+    index = build_filter_index(SURVEY)
+    assert index.mask(index.purposes, dict(index.ranges)).all()
+    assert not index.purpose_mask(["No such purpose"]).any()
+    assert "Incidental" in index.purposes and "incidental" not in index.purposes
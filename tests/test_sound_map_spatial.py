@@ -0,0 +1,63 @@
+"""SpatialIndex nearest and radius queries against a brute-force scan of the projected points."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOUNDMAP = Path(__file__).resolve().parents[1] / "06_SoundMap"
+sys.path.insert(0, str(SOUNDMAP))
+
+from sound_map_spatial import build_spatial_index  # noqa: E402
+
+SURVEY = pd.read_csv(SOUNDMAP / "bicomap.csv")
+
+
+def brute_force(index, lat, lon, mask=None):
+    """Distances in metres from (lat, lon) to every row, inf where missing or masked out."""
+    x, y = index.project(lat, lon)
+    distances = np.full(len(SURVEY), np.inf)
+    distances[index.rows] = np.hypot(index.x - x, index.y - y)
+    if mask is not None:
+        distances[~mask] = np.inf
+    return distances
+
+
+def clicks(count=200, seed=0):
+    """Random points in and around the survey's bounding box."""
+    rng = np.random.default_rng(seed)
+    lat, lon = SURVEY["latitude"], SURVEY["longitude"]
+    return zip(rng.uniform(lat.min() - 0.01, lat.max() + 0.01, count),
+               rng.uniform(lon.min() - 0.01, lon.max() + 0.01, count))
+
+
+def test_nearest_matches_brute_force():
+    index = build_spatial_index(SURVEY, cell_size=25)
+    mask = np.arange(len(SURVEY)) % 3 != 0
+    for lat, lon in clicks():
+        for row_mask in (None, mask):
+            distances = brute_force(index, lat, lon, row_mask)
+            row = index.nearest(lat, lon, mask=row_mask)
+            assert distances[row] == distances.min()
+            within_30 = index.nearest(lat, lon, max_distance=30, mask=row_mask)
+            assert (within_30 is None) == (distances.min() > 30)
+
+
+def test_within_matches_brute_force():
+    index = build_spatial_index(SURVEY)
+    for lat, lon in clicks(50, seed=1):
+        for radius in (20, 150, 2000):
+            distances = brute_force(index, lat, lon)
+            rows, found = index.within_with_distances(lat, lon, radius)
+            expected = np.flatnonzero(distances <= radius)
+            assert sorted(rows.tolist()) == expected.tolist()
+            assert np.all(np.diff(found) >= 0)
+            assert index.within(lat, lon, radius).tolist() == rows.tolist()
+
+
+def test_click_on_a_marker_finds_that_recording():
+    index = build_spatial_index(SURVEY)
+    row = SURVEY.index[10]
+    lat, lon = SURVEY.loc[row, ["latitude", "longitude"]]
+    assert brute_force(index, lat, lon)[index.nearest(lat, lon, max_distance=1)] == 0
@@ -0,0 +1,56 @@
+"""Tile summaries against a pandas groupby over the same tile coordinates."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOUNDMAP = Path(__file__).resolve().parents[1] / "06_SoundMap"
+sys.path.insert(0, str(SOUNDMAP))
+
+from sound_map_filters import build_filter_index  # noqa: E402
+from sound_map_tiles import build_tile_pyramid, tile_bounds, tile_coordinates  # noqa: E402
+
+INDEX = build_filter_index(pd.read_csv(SOUNDMAP / "bicomap.csv"))
+
+
+def groupby_summary(df, zoom):
+    """The summary ``aggregate`` should produce, written as a pandas groupby."""
+    df = df.dropna(subset=["latitude", "longitude"]).copy()
+    df["tile_x"], df["tile_y"] = tile_coordinates(df["latitude"], df["longitude"], zoom)
+    grouped = df.groupby(["tile_x", "tile_y"])
+    expected = grouped.agg(count=("latitude", "size"), latitude=("latitude", "mean"),
+                           longitude=("longitude", "mean"), mean_volume=("volume", "mean"))
+    purposes = pd.DataFrame(INDEX.purpose_matrix[df.index], index=df.index, columns=INDEX.purposes)
+    expected["purpose_Academic"] = purposes.groupby([df["tile_x"], df["tile_y"]])["Academic"].sum()
+    return expected.reset_index()
+
+
+def test_aggregate_matches_groupby():
+    pyramid = build_tile_pyramid(INDEX, zooms=[12, 16, 18])
+    mask = INDEX.purpose_mask(["Social"])
+    for zoom in pyramid.zooms:
+        for row_mask in (None, mask):
+            df = INDEX.df if row_mask is None else INDEX.df[row_mask]
+            expected = groupby_summary(df, zoom)
+            result = pyramid.aggregate(zoom, mask=row_mask)[expected.columns]
+            assert result["count"].sum() == len(df.dropna(subset=["latitude"]))
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False, atol=1e-6)
+
+
+def test_tiles_in_view_keep_only_visible_tiles():
+    pyramid = build_tile_pyramid(INDEX, zooms=[17])
+    everything = pyramid.aggregate(17)
+    tile = everything.loc[everything["count"].idxmax()]
+    south, west, north, east = tile_bounds(tile["tile_x"], tile["tile_y"], 17)
+    assert south < tile["latitude"] < north and west < tile["longitude"] < east
+
+    # Shrink the tile's bounds slightly so neighbouring tiles are not touched
+    inset = 1e-7
+    view = pyramid.tiles_in_view(17, south + inset, west + inset, north - inset, east - inset)
+    assert view[["tile_x", "tile_y", "count"]].values.tolist() == [[tile["tile_x"], tile["tile_y"], tile["count"]]]
+
+    mask = np.zeros(len(INDEX), dtype=bool)
+    assert pyramid.tiles_in_view(17, south, west, north, east, mask=mask).empty
+    assert pyramid.nearest_zoom(25) == 17
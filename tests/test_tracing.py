@@ -0,0 +1,73 @@
+"""Tracer self-time across nested spans and threads, counters, and the script runner's exit code."""
+
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from encoding_music import tracing
+from encoding_music.tracing import Tracer
+
+
+def spans(tracer, *rows):
+    """Record finished spans directly: (name, tid, start ns, end ns)."""
+    for name, tid, start, end in rows:
+        tracer.spans.append((name, "analyze", tid, start, end, {}, None, None))
+
+
+def test_self_time_subtracts_only_direct_children():
+    tracer = Tracer()
+    spans(tracer,
+          ("child", 1, 10, 40), ("grandchild", 1, 15, 25), ("outer", 1, 0, 100), ("second child", 1, 50, 60),
+          # Another thread overlapping in time is not nested inside "outer"
+          ("worker", 2, 20, 90), ("worker step", 2, 30, 35))
+    self_times = dict(zip([row[0] for row in tracer.spans], tracer._self_times()))
+    assert self_times == {"outer": 60, "child": 20, "grandchild": 10, "second child": 10,
+                          "worker": 65, "worker step": 5}
+    assert sum(self_times.values()) == 100 + 70
+
+
+def test_nested_spans_and_counters_are_recorded():
+    assert tracing.span("off") is tracing._NULL_SPAN
+
+    @tracing.traced("parse", name="parse")
+    def parse():
+        time.sleep(0.01)
+        tracing.count("notes_parsed", 5)
+
+    with tracing.tracing() as tracer:
+        with tracing.span("outer", "analyze"):
+            parse()
+            parse()
+            worker = threading.Thread(target=parse)
+            worker.start()
+            worker.join()
+    assert tracing.active() is None
+
+    rows = {row["span"]: row for row in tracer.summary()}
+    assert rows["parse"]["calls"] == 3
+    assert rows["parse"]["counters"] == {"notes_parsed": 15}
+    assert tracer.counters == {"notes_parsed": 15}
+    # The worker thread's parse is not a child of "outer", so outer keeps it as its own time
+    children = sum(end - start for name, _, tid, start, end, *_ in tracer.spans
+                   if name == "parse" and tid == threading.get_ident())
+    assert rows["outer"]["self"] == pytest.approx(rows["outer"]["total"] - children / 1e9)
+    assert [row["stage"] for row in tracer.summary()] == ["parse", "analyze"]
+    events = tracer.chrome_trace()["traceEvents"]
+    assert sum(event["ph"] == "X" for event in events) == 4
+
+
+@pytest.mark.parametrize("body, code", [("x = 1", 0), ("import sys\nsys.exit(3)", 3), ("raise SystemExit", None)])
+def test_main_returns_the_scripts_exit_code(tmp_path, monkeypatch, capsys, body, code):
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    script = tmp_path / "run.py"
+    script.write_text("from encoding_music import tracing\n"
+                      "with tracing.span('inside', 'analyze'):\n    pass\n" + body + "\n")
+    output = tmp_path / "run.json"
+    assert tracing.main(["-o", str(output), str(script), "--flag"]) == code
+    assert "inside" in capsys.readouterr().err
+    names = [event["name"] for event in json.loads(output.read_text())["traceEvents"]]
+    assert "run.py" in names and "inside" in names